@@ -1,6 +1,6 @@
 # app.py revisado e completo - EL POSTADOR
 from flask import Flask, render_template, redirect, url_for, request
-from models import db, login_manager, Plan
+from models import db, login_manager, listar_planos
 from routes.auth import auth_bp
 from routes.dashboard import dashboard_bp
 from routes.payments import payments_bp
@@ -27,6 +27,22 @@ if database_url and database_url.startswith("postgres://"):
 app.config['SQLALCHEMY_DATABASE_URI'] = database_url
 app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
 
+# Pool de conexões por processo. Com workers gthread cada thread segura uma
+# conexão durante o request: DB_POOL_SIZE deve ser >= GUNICORN_THREADS.
+# Total no Postgres ~ workers x (pool + overflow) + scheduler (ver docs/servidor_web.md).
+# pool_recycle/pre_ping descartam conexões derrubadas pelo servidor ou proxy.
+opcoes_engine = {
+    'pool_pre_ping': True,
+    'pool_recycle': int(os.environ.get('DB_POOL_RECYCLE', 1800)),
+}
+if database_url and not database_url.startswith('sqlite'):
+    opcoes_engine.update(
+        pool_size=int(os.environ.get('DB_POOL_SIZE', os.environ.get('GUNICORN_THREADS', 8))),
+        max_overflow=int(os.environ.get('DB_MAX_OVERFLOW', 4)),
+        pool_timeout=int(os.environ.get('DB_POOL_TIMEOUT', 10)),
+    )
+app.config['SQLALCHEMY_ENGINE_OPTIONS'] = opcoes_engine
+
 # --- CONFIGURAÇÕES DE E-MAIL (SMTP GMAIL) ---
 # Aqui estava o erro: as chaves precisam estar no app.config
 app.config['MAIL_SERVER'] = os.environ.get('MAIL_SERVER', 'smtp.gmail.com')
@@ -41,6 +57,18 @@ db.init_app(app)
 login_manager.init_app(app)
 mail = Mail(app) # Agora o mail lerá as configurações acima corretamente
 
+# Grava o uso de APIs (tokens/imagens) em lote, em segundo plano
+from services.credit_service import iniciar_flush_periodico
+iniciar_flush_periodico(app)
+
+# Perfil de banco por request (headers X-DB-*, log e /admin/db-profiler)
+from services.profiler_service import init_profiler
+init_profiler(app)
+
+# Métricas Prometheus em /metrics (agregadas entre workers e scheduler)
+from services.metrics_service import init_metrics
+init_metrics(app)
+
 # --- REGISTRO DE BLUEPRINTS ---
 app.register_blueprint(auth_bp)
 app.register_blueprint(dashboard_bp)
@@ -53,7 +81,7 @@ app.register_blueprint(teste_bp, url_prefix='/teste')
 
 @app.route('/')
 def index():
-    planos_db = Plan.query.order_by(Plan.id.asc()).all()
+    planos_db = listar_planos()
     return render_template('landing.html', planos=planos_db)
 
 if __name__ == '__main__':
@@ -0,0 +1,213 @@
+"""
+Servidores falsos (locais) para benchmark: Groq/OpenAI (chat + imagens) e a
+REST API do WordPress. Latência e taxa de erro são configuráveis por serviço,
+para medir o throughput do pipeline sem depender de nenhum serviço externo.
+"""
+import json
+import random
+import struct
+import threading
+import time
+import zlib
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+def gerar_png(tamanho_bytes, semente=42):
+    """
+    PNG RGB válido com cerca de tamanho_bytes: ruído sobre um degradê, que o
+    zlib quase não comprime. O Pillow abre e otimiza como uma foto real.
+    """
+    lado = max(1, int((tamanho_bytes / 3) ** 0.5))
+    rng = random.Random(semente)
+    linhas = bytearray()
+    for y in range(lado):
+        linhas.append(0)  # Filtro "None" da linha
+        base = y * 255 // lado
+        linhas.extend((base + b) & 0xFF for b in rng.randbytes(lado * 3))
+
+    def chunk(tipo, dados):
+        return struct.pack(">I", len(dados)) + tipo + dados + struct.pack(">I", zlib.crc32(tipo + dados))
+
+    cabecalho = struct.pack(">IIBBBBB", lado, lado, 8, 2, 0, 0, 0)  # 8 bits, RGB
+    return (b"\x89PNG\r\n\x1a\n" + chunk(b"IHDR", cabecalho)
+            + chunk(b"IDAT", zlib.compress(bytes(linhas), 1)) + chunk(b"IEND", b""))
+
+ARTIGO_HTML = """<html><head><title>Artigo de teste</title></head><body>
+<nav>menu</nav><h1>Tendências de marketing digital</h1>
+{paragrafos}
+<footer>rodapé</footer></body></html>"""
+
+
+class ServiceConfig:
+    """Comportamento de um serviço falso: latência (s), jitter (s) e taxas de erro."""
+
+    def __init__(self, latency=0.05, jitter=0.0, error_rate=0.0, rate_limit_rate=0.0):
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.rate_limit_rate = rate_limit_rate
+
+    def esperar(self):
+        atraso = self.latency + random.uniform(0, self.jitter)
+        if atraso > 0:
+            time.sleep(atraso)
+
+    def sortear_erro(self):
+        sorteio = random.random()
+        if sorteio < self.rate_limit_rate:
+            return 429
+        if sorteio < self.rate_limit_rate + self.error_rate:
+            return 500
+        return None
+
+
+class FakeServers:
+    """Sobe um único servidor HTTP local que responde pelos três provedores."""
+
+    def __init__(self, llm=None, image=None, wordpress=None, download=None, image_bytes=300_000):
+        self.configs = {
+            "llm": llm or ServiceConfig(),
+            "image": image or ServiceConfig(),
+            "wordpress": wordpress or ServiceConfig(),
+            "download": download or ServiceConfig(latency=0.01),
+        }
+        self.image_bytes = image_bytes
+        self.png = gerar_png(image_bytes)
+        self.contadores = {}
+        self._lock = threading.Lock()
+        self._next_id = 1000
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", 0), self._handler())
+        self.httpd.daemon_threads = True
+        self.thread = None
+
+    @property
+    def base_url(self):
+        host, port = self.httpd.server_address
+        return f"http://{host}:{port}"
+
+    def start(self):
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def _contar(self, chave):
+        with self._lock:
+            self.contadores[chave] = self.contadores.get(chave, 0) + 1
+
+    def _novo_id(self):
+        with self._lock:
+            self._next_id += 1
+            return self._next_id
+
+    def _handler(self):
+        servidor = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, *args):
+                pass
+
+            def _ler_corpo(self):
+                if self.headers.get("Transfer-Encoding", "").lower() == "chunked":
+                    dados = b""
+                    while True:
+                        tamanho = int(self.rfile.readline().strip() or b"0", 16)
+                        if tamanho == 0:
+                            self.rfile.readline()
+                            return dados
+                        dados += self.rfile.read(tamanho)
+                        self.rfile.readline()
+                tamanho = int(self.headers.get("Content-Length") or 0)
+                return self.rfile.read(tamanho) if tamanho else b""
+
+            def _responder(self, status, corpo, content_type="application/json"):
+                if not isinstance(corpo, bytes):
+                    corpo = json.dumps(corpo).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(corpo)))
+                self.end_headers()
+                self.wfile.write(corpo)
+
+            def _servico(self):
+                if self.path.startswith("/openai/v1/chat") or self.path.startswith("/v1/chat"):
+                    return "llm"
+                if self.path.startswith("/v1/images"):
+                    return "image"
+                if self.path.startswith("/wp-json"):
+                    return "wordpress"
+                return "download"
+
+            def _simular(self):
+                servico = self._servico()
+                config = servidor.configs[servico]
+                config.esperar()
+                erro = config.sortear_erro()
+                servidor._contar(f"{servico}:{erro or 'ok'}")
+                if erro:
+                    self._responder(erro, {"error": {"message": f"erro simulado {erro}", "type": "server_error"}})
+                    return None
+                return servico
+
+            def do_GET(self):
+                if not self._simular():
+                    return
+                if self.path.startswith("/wp-json/wp/v2/users/me"):
+                    self._responder(200, {"id": 1, "name": "admin"})
+                elif self.path.startswith("/img/"):
+                    self._responder(200, servidor.png, "image/png")
+                elif self.path.startswith("/artigo/"):
+                    paragrafos = "\n".join(
+                        f"<p>Parágrafo {i}: estratégias de SEO, redes sociais e conteúdo para blogs crescerem.</p>"
+                        for i in range(40)
+                    )
+                    self._responder(200, ARTIGO_HTML.format(paragrafos=paragrafos).encode(), "text/html; charset=utf-8")
+                else:
+                    self._responder(404, {"code": "rest_no_route"})
+
+            def do_POST(self):
+                corpo = self._ler_corpo()
+                servico = self._simular()
+                if not servico:
+                    return
+                if servico == "llm":
+                    self._responder(200, self._chat(json.loads(corpo or b"{}")))
+                elif servico == "image":
+                    self._responder(200, {"created": int(time.time()), "data": [{"url": f"{servidor.base_url}/img/{servidor._novo_id()}.png"}]})
+                elif self.path.startswith("/wp-json/wp/v2/media"):
+                    self._responder(201, {"id": servidor._novo_id(), "bytes": len(corpo)})
+                elif self.path.startswith("/wp-json/wp/v2/posts"):
+                    post_id = servidor._novo_id()
+                    self._responder(201, {"id": post_id, "link": f"{servidor.base_url}/?p={post_id}"})
+                else:
+                    self._responder(404, {"code": "rest_no_route"})
+
+            def _chat(self, payload):
+                mensagens = payload.get("messages", [])
+                texto = " ".join(str(m.get("content", "")) for m in mensagens)
+                if (payload.get("response_format") or {}).get("type") == "json_object":
+                    if "'titulos'" in texto:
+                        conteudo = json.dumps({"titulos": [f"Título de teste {i}" for i in range(5)]})
+                    elif "'content'" in texto:
+                        conteudo = json.dumps({"title": "Título reescrito", "content": "<p>Conteúdo reescrito.</p>"})
+                    else:
+                        conteudo = json.dumps({"titulo": "Título de teste"})
+                else:
+                    conteudo = "<h2>Artigo gerado</h2>" + "<p>Texto do artigo de benchmark.</p>" * 30
+                prompt_tokens = len(texto) // 4
+                completion_tokens = len(conteudo) // 4
+                return {
+                    "id": f"chatcmpl-{servidor._novo_id()}",
+                    "object": "chat.completion",
+                    "created": int(time.time()),
+                    "model": payload.get("model", "fake"),
+                    "choices": [{"index": 0, "message": {"role": "assistant", "content": conteudo}, "finish_reason": "stop"}],
+                    "usage": {"prompt_tokens": prompt_tokens, "completion_tokens": completion_tokens,
+                              "total_tokens": prompt_tokens + completion_tokens},
+                }
+
+        return Handler
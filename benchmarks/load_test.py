@@ -0,0 +1,196 @@
+"""
+Teste de carga do servidor web (gunicorn) com usuários simultâneos.
+
+Sobe o app com o gunicorn duas vezes sobre o mesmo banco SQLite temporário:
+  - antes:  worker sync, 1 worker (o antigo supervisord.conf)
+  - depois: gunicorn.conf.py (gthread; workers/threads pelas variáveis de ambiente)
+Cada usuário virtual faz login e repete, até o fim da rodada:
+  - GET /dashboard                    (página rápida: só banco)
+  - POST /sites/update-auth/<id>      (valida credenciais no WordPress falso, --wp-latency s)
+na proporção --slow-ratio. Para cada quantidade de usuários mede req/s e
+p50/p99 das páginas rápidas; a capacidade é o maior número de usuários com
+p99 rápido abaixo de --slo.
+
+Uso:
+    python benchmarks/load_test.py --users 1,5,10,20 --duration 10 --wp-latency 1.0
+    python benchmarks/load_test.py --configs depois --users 50   # só a configuração nova
+
+Os resultados vão para benchmarks/results/load-<timestamp>.json.
+"""
+import argparse
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime
+
+import requests
+
+RAIZ = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+RESULTS_DIR = os.path.join(RAIZ, "benchmarks", "results")
+sys.path.insert(0, RAIZ)
+
+from benchmarks.fake_servers import FakeServers, ServiceConfig
+from benchmarks.run_benchmark import _percentil, _round
+
+SENHA = "carga123"
+CONFIGURACOES = {
+    # O gunicorn lê ./gunicorn.conf.py sozinho: os valores do "antes" vão explícitos
+    "antes": ["--worker-class", "sync", "--workers", "1", "--threads", "1", "--bind", "127.0.0.1:{porta}"],
+    "depois": ["-c", os.path.join(RAIZ, "gunicorn.conf.py"), "--bind", "127.0.0.1:{porta}"],
+}
+
+
+def _porta_livre():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def preparar_banco(tmpdir, n_usuarios, wp_url):
+    """Cria o banco com um usuário/blog por usuário virtual. Devolve [(email, blog_id)]."""
+    from werkzeug.security import generate_password_hash
+    from app import app
+    from models import db, Plan, User, Blog
+
+    contas = []
+    with app.app_context():
+        db.create_all()
+        plano = Plan(name="Carga", max_sites=5, posts_per_day=10)
+        db.session.add(plano)
+        db.session.flush()
+        senha = generate_password_hash(SENHA, method="scrypt")
+        for i in range(n_usuarios):
+            user = User(name=f"carga{i}", email=f"carga{i}@example.com", password=senha, plan_id=plano.id, credits=100)
+            db.session.add(user)
+            db.session.flush()
+            blog = Blog(user_id=user.id, site_name=f"Blog {i}", wp_url=wp_url, wp_user="admin", wp_app_password="senha")
+            db.session.add(blog)
+            db.session.flush()
+            contas.append((user.email, blog.id))
+        db.session.commit()
+    return contas
+
+
+def subir_gunicorn(config, env):
+    porta = _porta_livre()
+    args = [a.format(porta=porta) for a in CONFIGURACOES[config]]
+    processo = subprocess.Popen([sys.executable, "-m", "gunicorn", *args, "app:app"], cwd=RAIZ, env=env,
+                                stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    base = f"http://127.0.0.1:{porta}"
+    for _ in range(100):
+        try:
+            requests.get(f"{base}/login", timeout=1)
+            return processo, base
+        except requests.RequestException:
+            time.sleep(0.2)
+    processo.kill()
+    raise RuntimeError(f"gunicorn ({config}) não subiu")
+
+
+def usuario_virtual(base, conta, fim, proporcao_lenta, wp_url, amostras, trava):
+    email, blog_id = conta
+    sessao = requests.Session()
+    sessao.post(f"{base}/login", data={"email": email, "password": SENHA}, timeout=60)
+    while time.perf_counter() < fim:
+        lenta = random.random() < proporcao_lenta
+        inicio = time.perf_counter()
+        try:
+            if lenta:
+                r = sessao.post(f"{base}/sites/update-auth/{blog_id}", allow_redirects=False, timeout=60,
+                                data={"wp_url": wp_url, "wp_user": "admin", "wp_app_password": "senha"})
+            else:
+                r = sessao.get(f"{base}/dashboard", allow_redirects=False, timeout=60)
+            ok = r.status_code < 400
+        except requests.RequestException:
+            ok = False
+        with trava:
+            amostras.append(("lenta" if lenta else "rapida", time.perf_counter() - inicio, ok))
+
+
+def rodada(base, contas, duracao, proporcao_lenta, wp_url):
+    amostras, trava = [], threading.Lock()
+    fim = time.perf_counter() + duracao
+    threads = [threading.Thread(target=usuario_virtual, args=(base, c, fim, proporcao_lenta, wp_url, amostras, trava))
+               for c in contas]
+    inicio = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    total = time.perf_counter() - inicio
+
+    rapidas = [d for tipo, d, _ in amostras if tipo == "rapida"]
+    lentas = [d for tipo, d, _ in amostras if tipo == "lenta"]
+    return {
+        "usuarios": len(contas),
+        "requests": len(amostras),
+        "lentas": len(lentas),
+        "erros": sum(1 for *_, ok in amostras if not ok),
+        "req_por_s": round(len(amostras) / total, 2),
+        "rapida_p50_s": _round(_percentil(rapidas, 50)),
+        "rapida_p99_s": _round(_percentil(rapidas, 99)),
+        "lenta_p50_s": _round(_percentil(lentas, 50)),
+        "lenta_p99_s": _round(_percentil(lentas, 99)),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", default="1,5,10,20", help="quantidades de usuários simultâneos")
+    parser.add_argument("--duration", type=float, default=10, help="segundos por rodada")
+    parser.add_argument("--wp-latency", type=float, default=1.0)
+    parser.add_argument("--slow-ratio", type=float, default=0.1, help="fração de requests que validam no WordPress")
+    parser.add_argument("--slo", type=float, default=0.5, help="p99 máximo (s) das páginas rápidas")
+    parser.add_argument("--configs", default="antes,depois")
+    parser.add_argument("--no-save", action="store_true")
+    args = parser.parse_args()
+    quantidades = [int(q) for q in args.users.split(",")]
+
+    servidores = FakeServers(wordpress=ServiceConfig(args.wp_latency)).start()
+    tmpdir = tempfile.mkdtemp(prefix="autoblog-load-")
+    os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(tmpdir, 'load.db')}"
+    os.environ.setdefault("FLASK_SECRET_KEY", "carga")
+    os.environ["PROMETHEUS_MULTIPROC_DIR"] = os.path.join(tmpdir, "metrics")
+    os.environ["NO_PROXY"] = "127.0.0.1,localhost"
+    contas = preparar_banco(tmpdir, max(quantidades), servidores.base_url)
+
+    resultado = {
+        "executado_em": datetime.utcnow().isoformat(timespec="seconds"),
+        "parametros": vars(args),
+        "configuracoes": {},
+    }
+    for config in args.configs.split(","):
+        processo, base = subir_gunicorn(config, dict(os.environ))
+        try:
+            rodadas = [rodada(base, contas[:n], args.duration, args.slow_ratio, servidores.base_url) for n in quantidades]
+        finally:
+            processo.terminate()
+            processo.wait(timeout=30)
+        dentro = [r["usuarios"] for r in rodadas if r["rapida_p99_s"] is not None and r["rapida_p99_s"] <= args.slo and not r["erros"]]
+        resultado["configuracoes"][config] = {"rodadas": rodadas, "capacidade_usuarios": max(dentro, default=0)}
+
+    servidores.stop()
+
+    print(f"\n{'config':<8} {'users':>5} {'reqs':>6} {'erros':>5} {'req/s':>7} {'rápida p50':>11} {'rápida p99':>11} {'lenta p99':>10}")
+    for config, dados in resultado["configuracoes"].items():
+        for r in dados["rodadas"]:
+            print(f"{config:<8} {r['usuarios']:>5} {r['requests']:>6} {r['erros']:>5} {r['req_por_s']:>7} "
+                  f"{r['rapida_p50_s'] or 0:>11} {r['rapida_p99_s'] or 0:>11} {r['lenta_p99_s'] or 0:>10}")
+        print(f"{config:<8} capacidade (p99 rápido <= {args.slo}s): {dados['capacidade_usuarios']} usuários")
+
+    if not args.no_save:
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        caminho = os.path.join(RESULTS_DIR, "load-" + datetime.utcnow().strftime("%Y%m%d-%H%M%S") + ".json")
+        with open(caminho, "w", encoding="utf-8") as f:
+            json.dump(resultado, f, indent=2, ensure_ascii=False)
+        print(f"\nResultado salvo em {caminho}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,257 @@
+"""
+Benchmark offline do pipeline de publicação.
+
+Sobe os servidores falsos (Groq/OpenAI/WordPress), cria um banco SQLite
+temporário com N blogs e M ideias por blog e mede:
+  - publish_content_flow  (IA -> imagem -> WordPress, post a post)
+  - loop do scheduler     (check_and_enqueue_auto_posts + processar_fila_de_postagem)
+  - sync_sources_logic    (Radar: scraping + resumo)
+
+Uso:
+    python benchmarks/run_benchmark.py --blogs 5 --ideas 4 --llm-latency 0.2 --error-rate 0.05
+    python benchmarks/run_benchmark.py --compare        # compara com o último resultado salvo
+
+Os resultados vão para benchmarks/results/<timestamp>.json.
+"""
+import argparse
+import glob
+import json
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+RAIZ = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+RESULTS_DIR = os.path.join(RAIZ, "benchmarks", "results")
+sys.path.insert(0, RAIZ)
+
+from benchmarks.fake_servers import FakeServers, ServiceConfig
+
+
+def _percentil(valores, p):
+    if not valores:
+        return None
+    ordenados = sorted(valores)
+    idx = min(int(round(p / 100 * (len(ordenados) - 1))), len(ordenados) - 1)
+    return ordenados[idx]
+
+
+class Medidor:
+    """Acumula latências e consultas SQL de um cenário."""
+
+    def __init__(self, nome, engine):
+        self.nome = nome
+        self.latencias = []
+        self.sucessos = 0
+        self.consultas = 0
+        self._engine = engine
+
+    def _contar(self, *args, **kwargs):
+        self.consultas += 1
+
+    def __enter__(self):
+        from sqlalchemy import event
+        event.listen(self._engine, "before_cursor_execute", self._contar)
+        self.inicio = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        from sqlalchemy import event
+        self.duracao = time.perf_counter() - self.inicio
+        event.remove(self._engine, "before_cursor_execute", self._contar)
+
+    def medir(self, funcao, *args):
+        inicio = time.perf_counter()
+        resultado = funcao(*args)
+        self.latencias.append(time.perf_counter() - inicio)
+        return resultado
+
+    def resultado(self):
+        total = len(self.latencias)
+        return {
+            "operacoes": total,
+            "sucessos": self.sucessos,
+            "duracao_s": round(self.duracao, 3),
+            "ops_por_s": round(total / self.duracao, 3) if self.duracao else None,
+            "p50_s": _round(_percentil(self.latencias, 50)),
+            "p99_s": _round(_percentil(self.latencias, 99)),
+            "consultas_sql": self.consultas,
+            "consultas_por_op": round(self.consultas / total, 1) if total else None,
+        }
+
+
+def _round(valor):
+    return round(valor, 4) if valor is not None else None
+
+
+def configurar_ambiente(servidores, tmpdir):
+    """Aponta os SDKs e o app para os servidores falsos e o banco temporário."""
+    os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(tmpdir, 'bench.db')}"
+    os.environ.setdefault("FLASK_SECRET_KEY", "benchmark")
+    os.environ["GROQ_API_KEY"] = "fake"
+    os.environ["GROQ_BASE_URL"] = servidores.base_url      # SDK groq
+    os.environ["GROQ_API_BASE"] = servidores.base_url      # langchain-groq
+    os.environ["OPENAI_API_KEY"] = "fake"
+    os.environ["OPENAI_BASE_URL"] = f"{servidores.base_url}/v1"
+    os.environ["RADAR_INDEX_DIR"] = os.path.join(tmpdir, "radar_index")
+    os.environ["PROMETHEUS_MULTIPROC_DIR"] = os.path.join(tmpdir, "metrics")
+    os.environ["NO_PROXY"] = "127.0.0.1,localhost"
+    os.environ["PLANNER_CATCHUP_HOURS"] = "48"
+    # O scheduler grava scheduler.log no diretório atual
+    os.chdir(tmpdir)
+
+
+def popular_banco(db, n_blogs, m_ideias, wp_url):
+    from models import Plan, User, Blog, ContentIdea, ContentSource
+
+    plano = Plan(name="Bench", max_sites=n_blogs, posts_per_day=999, has_images=True, has_radar=True)
+    db.session.add(plano)
+    db.session.flush()
+
+    for b in range(n_blogs):
+        user = User(name=f"bench{b}", email=f"bench{b}@example.com", password="x", plan_id=plano.id, credits=10_000)
+        db.session.add(user)
+        db.session.flush()
+        blog = Blog(
+            user_id=user.id, site_name=f"Blog {b}", wp_url=wp_url, wp_user="admin",
+            wp_app_password="senha", macro_themes="marketing digital, SEO",
+            posts_per_day=m_ideias, schedule_time="00:00",
+        )
+        db.session.add(blog)
+        db.session.flush()
+        for i in range(m_ideias):
+            db.session.add(ContentIdea(blog_id=blog.id, title=f"Ideia {i} do blog {b}", status="draft"))
+        db.session.add(ContentSource(blog_id=blog.id, source_url=f"{wp_url}/artigo/{b}", source_type="blog"))
+    db.session.commit()
+
+
+def cenario_publish_flow(app, db):
+    from models import Blog, ContentIdea
+    from services.content_service import publish_content_flow
+
+    with app.app_context(), Medidor("publish_content_flow", db.engine) as m:
+        for blog in Blog.query.all():
+            ideia = ContentIdea.query.filter_by(blog_id=blog.id, status="draft").first()
+            if not ideia:
+                continue
+            ok, _ = m.medir(publish_content_flow, ideia, blog.owner)
+            ideia.status = "completed" if ok else "failed"
+            db.session.commit()
+            m.sucessos += int(ok)
+    return m.resultado()
+
+
+def cenario_scheduler(app, db):
+    import scheduler
+    from models import ContentIdea
+
+    with app.app_context(), Medidor("scheduler", db.engine) as m:
+        ja_publicadas = ContentIdea.query.filter_by(status="completed").count()
+        # Os slots do dia ficam espalhados em 24h: o enfileirador "anda" um dia
+        # à frente para todos vencerem de uma vez (PLANNER_CATCHUP_HOURS=48)
+        scheduler.planejar_horarios()
+        amanha = datetime.utcnow() + timedelta(days=1)
+        while True:
+            scheduler.check_and_enqueue_auto_posts(amanha)
+            pendentes = ContentIdea.query.filter_by(status="pending").count()
+            if not pendentes:
+                break
+            for _ in range(pendentes):
+                m.medir(scheduler.processar_fila_de_postagem)
+        m.sucessos = ContentIdea.query.filter_by(status="completed").count() - ja_publicadas
+    return m.resultado()
+
+
+def cenario_radar(app, db):
+    from models import ContentSource
+    from services.content_service import sync_sources_logic
+    from services.scraper_service import extrair_texto_da_url
+
+    with app.app_context(), Medidor("sync_sources_logic", db.engine) as m:
+        for fonte in ContentSource.query.all():
+            m.sucessos += m.medir(sync_sources_logic, [fonte], extrair_texto_da_url)
+    return m.resultado()
+
+
+def comparar(atual, anterior):
+    print(f"\nComparação com {anterior.get('executado_em')}:")
+    for cenario, dados in atual["cenarios"].items():
+        antes = anterior.get("cenarios", {}).get(cenario)
+        if not antes:
+            continue
+        linhas = []
+        for chave in ("ops_por_s", "p50_s", "p99_s", "consultas_por_op"):
+            a, d = antes.get(chave), dados.get(chave)
+            if a and d is not None:
+                linhas.append(f"{chave}: {a} -> {d} ({(d - a) / a * 100:+.1f}%)")
+        print(f"  {cenario:<22} " + " | ".join(linhas))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--blogs", type=int, default=5)
+    parser.add_argument("--ideas", type=int, default=4)
+    parser.add_argument("--llm-latency", type=float, default=0.05)
+    parser.add_argument("--image-latency", type=float, default=0.1)
+    parser.add_argument("--wp-latency", type=float, default=0.03)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0)
+    parser.add_argument("--scenarios", default="publish,scheduler,radar")
+    parser.add_argument("--compare", action="store_true", help="compara com o último resultado salvo")
+    parser.add_argument("--no-save", action="store_true")
+    args = parser.parse_args()
+
+    servidores = FakeServers(
+        llm=ServiceConfig(args.llm_latency, args.llm_latency / 2, args.error_rate, args.rate_limit_rate),
+        image=ServiceConfig(args.image_latency, args.image_latency / 2, args.error_rate, args.rate_limit_rate),
+        wordpress=ServiceConfig(args.wp_latency, args.wp_latency / 2, args.error_rate),
+    ).start()
+
+    tmpdir = tempfile.mkdtemp(prefix="autoblog-bench-")
+    configurar_ambiente(servidores, tmpdir)
+
+    from app import app
+    from models import db
+
+    with app.app_context():
+        db.create_all()
+        popular_banco(db, args.blogs, args.ideas, servidores.base_url)
+
+    cenarios = {
+        "publish": ("publish_content_flow", cenario_publish_flow),
+        "scheduler": ("scheduler", cenario_scheduler),
+        "radar": ("sync_sources_logic", cenario_radar),
+    }
+    resultado = {
+        "executado_em": datetime.utcnow().isoformat(timespec="seconds"),
+        "parametros": vars(args),
+        "cenarios": {},
+    }
+    for chave in args.scenarios.split(","):
+        nome, funcao = cenarios[chave.strip()]
+        resultado["cenarios"][nome] = funcao(app, db)
+
+    resultado["chamadas_servidores_falsos"] = servidores.contadores
+    servidores.stop()
+
+    print(f"\n{'cenário':<22} {'ops':>5} {'ok':>5} {'ops/s':>8} {'p50(s)':>8} {'p99(s)':>8} {'SQL/op':>7}")
+    for nome, r in resultado["cenarios"].items():
+        print(f"{nome:<22} {r['operacoes']:>5} {r['sucessos']:>5} {r['ops_por_s'] or 0:>8} "
+              f"{r['p50_s'] or 0:>8} {r['p99_s'] or 0:>8} {r['consultas_por_op'] or 0:>7}")
+
+    anteriores = sorted(glob.glob(os.path.join(RESULTS_DIR, "*.json")))
+    if args.compare and anteriores:
+        with open(anteriores[-1], encoding="utf-8") as f:
+            comparar(resultado, json.load(f))
+
+    if not args.no_save:
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        caminho = os.path.join(RESULTS_DIR, datetime.utcnow().strftime("%Y%m%d-%H%M%S") + ".json")
+        with open(caminho, "w", encoding="utf-8") as f:
+            json.dump(resultado, f, indent=2, ensure_ascii=False)
+        print(f"\nResultado salvo em {caminho}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,42 @@
+# Configuração do gunicorn (supervisord: gunicorn -c gunicorn.conf.py app:app)
+#
+# O trabalho pesado (publicação, imagens, Spy Writer) roda no scheduler; o web
+# passa a maior parte do tempo esperando I/O: banco e chamadas curtas ao
+# WordPress (validação de credenciais, até 15 s). Com o worker "sync" um
+# request desses travava todos os outros; com "gthread" cada worker atende
+# GUNICORN_THREADS requests ao mesmo tempo.
+#
+# Dimensionamento (detalhes em docs/servidor_web.md):
+#   workers = núcleos (a parte de CPU - templates, JSON - não passa do GIL)
+#   threads = 8 por worker (requests esperando I/O)
+#   DB_POOL_SIZE >= threads
+import os
+import multiprocessing
+
+bind = os.environ.get("GUNICORN_BIND", "0.0.0.0:5000")
+worker_class = os.environ.get("GUNICORN_WORKER_CLASS", "gthread")  # gthread | gevent (pip install gevent) | sync
+workers = int(os.environ.get("WEB_CONCURRENCY", max(2, multiprocessing.cpu_count())))
+threads = int(os.environ.get("GUNICORN_THREADS", 8))
+worker_connections = int(os.environ.get("GUNICORN_WORKER_CONNECTIONS", 200))  # Só gevent
+timeout = int(os.environ.get("GUNICORN_TIMEOUT", 60))
+graceful_timeout = 30
+keepalive = 5
+# Recicla workers aos poucos (vazamentos de memória de libs de terceiros)
+max_requests = int(os.environ.get("GUNICORN_MAX_REQUESTS", 2000))
+max_requests_jitter = 200
+accesslog = "-"
+errorlog = "-"
+# Sem isto o root logger fica sem handler nos workers e os logs da aplicação
+# (ex.: autoblog.db, perfil de banco por request) somem. O gunicorn mescla este
+# dicionário com o padrão dele; seus próprios loggers não mudam.
+logconfig_dict = {
+    "root": {"level": "WARNING", "handlers": ["console"]},
+    "loggers": {
+        "autoblog": {"level": os.environ.get("APP_LOG_LEVEL", "INFO"), "handlers": ["console"], "propagate": False},
+    },
+}
+
+def child_exit(server, worker):
+    # Métricas Prometheus em modo multiprocess: descarta os gauges do worker que saiu
+    from prometheus_client import multiprocess
+    multiprocess.mark_process_dead(worker.pid)
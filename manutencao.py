@@ -1,5 +1,9 @@
 from app import app
-from models import db, ContentIdea
+from models import db, ContentIdea, PostLog, Blog, Plan, UserDailyUsage
+from datetime import datetime, timedelta
+from sqlalchemy import inspect, text
+from services.stats_service import atualizar_rollup, STATS_DIAS_GRAFICO
+from services.queue_service import PESOS_PADRAO
 
 def limpar_ideias_corrompidas():
     # Isso cria o 'contexto' que o Flask pediu no erro
@@ -23,5 +27,106 @@ def limpar_ideias_corrompidas():
         else:
             print("✨ Nada para limpar! Todas as ideias estão vinculadas a um site.")
 
+def atualizar_esquema():
+    """
+    Cria tabelas novas e adiciona colunas que existem nos models mas ainda
+    não existem no banco (não temos Alembic; create_all não altera tabelas).
+    """
+    with app.app_context():
+        db.create_all()
+        inspetor = inspect(db.engine)
+
+        for tabela in db.metadata.sorted_tables:
+            existentes = {c['name'] for c in inspetor.get_columns(tabela.name)}
+            for coluna in tabela.columns:
+                if coluna.name in existentes:
+                    continue
+                tipo = coluna.type.compile(dialect=db.engine.dialect)
+                ddl = f'ALTER TABLE "{tabela.name}" ADD COLUMN "{coluna.name}" {tipo}'
+                if coluna.default is not None and coluna.default.is_scalar:
+                    valor = coluna.default.arg
+                    if isinstance(valor, bool):
+                        valor = 'TRUE' if valor else 'FALSE'
+                    elif isinstance(valor, str):
+                        valor = f"'{valor}'"
+                    ddl += f" DEFAULT {valor}"
+                print(f"🛠️ {ddl}")
+                with db.engine.begin() as conn:
+                    conn.execute(text(ddl))
+
+            # Índices novos em tabelas que já existiam (ex.: paginação por data)
+            indices = {i['name'] for i in inspetor.get_indexes(tabela.name)}
+            for indice in tabela.indexes:
+                if indice.name not in indices:
+                    print(f"🛠️ CREATE INDEX {indice.name}")
+                    with db.engine.begin() as conn:
+                        indice.create(bind=conn)
+
+        print("✅ Esquema do banco atualizado.")
+
+def recalcular_uso_diario(dias=2):
+    """
+    Reconstrói o contador user_daily_usage a partir do PostLog para os últimos
+    dias (UTC). Rodar no deploy que cria a tabela para não zerar o limite do dia.
+    """
+    with app.app_context():
+        inicio = datetime.utcnow().date() - timedelta(days=dias - 1)
+        dia = db.func.date(PostLog.posted_at)
+        linhas = db.session.query(
+            Blog.user_id,
+            dia,
+            db.func.count(PostLog.id),
+            db.func.sum(db.case((PostLog.status == 'Publicado', 1), else_=0))
+        ).join(Blog, PostLog.blog_id == Blog.id).filter(PostLog.posted_at >= inicio).group_by(Blog.user_id, dia).all()
+
+        UserDailyUsage.query.filter(UserDailyUsage.day >= inicio).delete(synchronize_session=False)
+        for user_id, dia_post, posts, publicados in linhas:
+            if isinstance(dia_post, str):  # SQLite devolve DATE() como texto
+                dia_post = datetime.strptime(dia_post, "%Y-%m-%d").date()
+            db.session.add(UserDailyUsage(user_id=user_id, day=dia_post, posts=posts, published=publicados or 0))
+        db.session.commit()
+        print(f"✅ Contador diário recalculado ({len(linhas)} linhas).")
+
+def recalcular_estatisticas(dias=STATS_DIAS_GRAFICO):
+    """
+    Preenche daily_stats para os últimos dias (o scheduler só mantém ontem e hoje).
+    Rodar no deploy que cria a tabela para os gráficos não começarem vazios.
+    """
+    with app.app_context():
+        linhas = atualizar_rollup(dias=dias)
+        print(f"✅ Estatísticas diárias recalculadas ({dias} dias, {linhas} linhas).")
+
+def definir_pesos_da_fila():
+    """
+    Planos que ganharam as colunas da fila com o padrão (1/1) recebem os pesos
+    de PESOS_PADRAO pelo nome. Valores já ajustados no admin não são tocados.
+    """
+    with app.app_context():
+        for plano in Plan.query.filter(Plan.name.in_(PESOS_PADRAO)):
+            peso, simultaneos = PESOS_PADRAO[plano.name]
+            if (plano.queue_weight or 1) == 1 and (plano.max_concurrent_posts or 1) == 1:
+                plano.queue_weight, plano.max_concurrent_posts = peso, simultaneos
+        db.session.commit()
+        print("✅ Pesos da fila de publicação definidos.")
+
+def preencher_entrada_na_fila():
+    """
+    Ideias que já estavam na fila quando a coluna enqueued_at foi criada: até
+    então o enfileiramento sobrescrevia o created_at, que vira a data de entrada.
+    """
+    with app.app_context():
+        preenchidas = ContentIdea.query.filter(
+            ContentIdea.status.in_(['pending', 'processing']),
+            ContentIdea.enqueued_at.is_(None)
+        ).update({"enqueued_at": ContentIdea.created_at}, synchronize_session=False)
+        db.session.commit()
+        print(f"✅ {preenchidas} ideia(s) da fila com data de entrada preenchida.")
+
 if __name__ == "__main__":
-    limpar_ideias_corrompidas()
\ No newline at end of file
+    # Primeiro o esquema: as consultas abaixo já usam as colunas novas
+    atualizar_esquema()
+    recalcular_uso_diario()
+    recalcular_estatisticas()
+    definir_pesos_da_fila()
+    preencher_entrada_na_fila()
+    limpar_ideias_corrompidas()
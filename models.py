@@ -1,4 +1,10 @@
+import os
+import time
 from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy import event
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import selectinload, make_transient_to_detached, defer, query_expression
+from sqlalchemy.orm.attributes import set_committed_value
 from datetime import datetime, date
 from flask_login import UserMixin, LoginManager
 from itsdangerous import URLSafeTimedSerializer as Serializer
@@ -7,10 +13,45 @@ from flask import current_app
 db = SQLAlchemy()
 login_manager = LoginManager()
 
+# Cache de planos por processo: mudam raramente e só pelo admin.edit_plan
+# (que chama invalidar_cache_planos). O TTL cobre os outros workers/scheduler.
+PLAN_CACHE_TTL = float(os.environ.get("PLAN_CACHE_TTL", 60))
+_cache_planos = {"expira": 0.0, "planos": {}}
+
+def planos_em_cache():
+    """{id: Plan} com cópias desanexadas da sessão (somente leitura)."""
+    if _cache_planos["expira"] > time.monotonic():
+        return _cache_planos["planos"]
+
+    planos = {}
+    for plano in Plan.query.order_by(Plan.id.asc()).all():
+        copia = Plan(**{c.key: getattr(plano, c.key) for c in Plan.__table__.columns})
+        make_transient_to_detached(copia)
+        planos[copia.id] = copia
+
+    _cache_planos["planos"] = planos
+    _cache_planos["expira"] = time.monotonic() + PLAN_CACHE_TTL
+    return planos
+
+def listar_planos():
+    """Planos ordenados por id, do cache (landing, pricing, selects do admin)."""
+    return list(planos_em_cache().values())
+
+def invalidar_cache_planos():
+    _cache_planos["expira"] = 0.0
+
 @login_manager.user_loader
 def load_user(user_id):
-    from models import User
-    return db.session.get(User, int(user_id))
+    # Sites vêm junto (selectinload) e o plano sai do cache do processo:
+    # templates e checagens de limite não disparam mais lazy loads.
+    user = db.session.execute(
+        db.select(User).options(selectinload(User.sites)).where(User.id == int(user_id))
+    ).scalar_one_or_none()
+    if user is not None and user.plan_id is not None:
+        plano = planos_em_cache().get(user.plan_id)
+        if plano is not None:
+            set_committed_value(user, "plan", plano)
+    return user
 
 class User(db.Model, UserMixin):
     id = db.Column(db.Integer, primary_key=True)
@@ -23,7 +64,7 @@ class User(db.Model, UserMixin):
     is_demo = db.Column(db.Boolean, default=False)
     plan_id = db.Column(db.Integer, db.ForeignKey('plans.id'), nullable=False, default=1)
     plan = db.relationship('Plan', back_populates='users')
-    created_at = db.Column(db.DateTime, default=db.func.now())
+    created_at = db.Column(db.DateTime, default=db.func.now(), index=True)
     sites = db.relationship('Blog', backref='owner', lazy=True)
 
     @property
@@ -42,23 +83,17 @@ class User(db.Model, UserMixin):
     def has_credits(self):
         return self.credits > 0
 
-    def consume_credit(self, amount=1):
-        if self.credits >= amount:
-            self.credits -= amount
-            db.session.commit()
-            return True
-        return False
+    def consume_credit(self, amount=1, reason="consumo", ref=None):
+        # Débito atômico no banco (UPDATE ... WHERE credits >= n) + registro no extrato
+        from services.credit_service import movimentar_creditos
+        return movimentar_creditos(self, -amount, reason, ref) is not None
     
-    def increase_credit(self, amount=1):
+    def increase_credit(self, amount=1, reason="credito", ref=None):
+        from services.credit_service import movimentar_creditos
         try:
-            # 1. Usa o operador de adição para aumentar o saldo
-            self.credits += amount
-            
-            # 2. Salva a alteração no banco de dados
-            db.session.commit()
-            return True
+            return movimentar_creditos(self, amount, reason, ref) is not None
         except Exception as e:
-            # 3. Se houver erro (ex: banco fora do ar), desfaz a alteração pendente
+            # Se houver erro (ex: banco fora do ar), desfaz a alteração pendente
             db.session.rollback()
             print(f"Erro ao adicionar créditos: {e}")
             return False
@@ -72,13 +107,8 @@ class User(db.Model, UserMixin):
         limites = self.get_plan_limits()
         posts_permitidos = limites.get('posts_por_dia', 1)
         
-        # Conta quantos logs de sucesso existem para hoje
-        hoje = date.today()
-        posts_feitos_hoje = PostLog.query.join(Blog).filter(
-            Blog.user_id == self.id,
-            db.func.date(PostLog.posted_at) == hoje,
-            PostLog.status == 'Publicado'
-        ).count()
+        # Conta quantos logs de sucesso existem para hoje (contador diário)
+        _, posts_feitos_hoje = posts_do_dia(self.id)
         
         return posts_feitos_hoje < posts_permitidos
     
@@ -117,15 +147,7 @@ class User(db.Model, UserMixin):
         if limite_diario >= 999:
             return False, limite_diario, 0
 
-        hoje = date.today()
-        
-        # Importação local do PostLog e Blog para evitar erro de importação circular
-        from models import PostLog, Blog 
-        
-        post_count = PostLog.query.join(Blog).filter(
-            Blog.user_id == self.id,
-            db.func.date(PostLog.posted_at) == hoje
-        ).count()
+        post_count, _ = posts_do_dia(self.id)
 
         return post_count >= limite_diario, limite_diario, post_count
 
@@ -145,6 +167,9 @@ class Plan(db.Model):
     permite_img = db.Column(db.String(50), default="Não") # "Sim" ou "Não" para o texto do card
     support_type = db.Column(db.String(100), default="Comunidade") # "Comunidade", "WhatsApp", etc.
     is_public = db.Column(db.Boolean, default=True) # Para esconder o VIP se quiser
+    # Fila de publicação: peso na divisão justa entre usuários e posts simultâneos por usuário
+    queue_weight = db.Column(db.Integer, default=1)
+    max_concurrent_posts = db.Column(db.Integer, default=1)
     users = db.relationship('User', back_populates='plan')
 
 class Blog(db.Model):
@@ -165,7 +190,7 @@ class Blog(db.Model):
     posts_per_day = db.Column(db.Integer, default=1)      # Adicionado
     schedule_time = db.Column(db.String(10), default='09:00') # Adicionado
     default_category = db.Column(db.String(100), nullable=True) # Adicionado
-    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)
     
     # Relacionamentos
     logs = db.relationship('PostLog', backref='blog', lazy=True, cascade="all, delete-orphan")
@@ -179,8 +204,12 @@ class ContentIdea(db.Model):
     featured_image_id = db.Column(db.Integer, nullable=True)
     is_manual = db.Column(db.Boolean, default=False)
     is_posted = db.Column(db.Boolean, default=False)
-    created_at = db.Column(db.DateTime, default=datetime.utcnow)
-    status = db.Column(db.String(20), default='draft') # draft, pending, completed, failed
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)
+    status = db.Column(db.String(20), default='draft', index=True) # draft, pending, processing, completed, failed
+    claimed_at = db.Column(db.DateTime, nullable=True) # Quando um worker pegou a ideia para publicar
+    enqueued_at = db.Column(db.DateTime, nullable=True, index=True) # Quando entrou na fila (pending), UTC
+    priority = db.Column(db.Integer, default=0, index=True) # > 0: pedido do usuário, vai pela faixa rápida
+    prepared_at = db.Column(db.DateTime, nullable=True) # Quando o texto/imagem foram pré-gerados (ver pregen_service)
     
     # RELAÇÃO CORRIGIDA:
     # Usamos backref='ideas' aqui e MAIS EM LUGAR NENHUM (remova do Blog se houver algo parecido)
@@ -194,7 +223,80 @@ class PostLog(db.Model):
     wp_post_id = db.Column(db.Integer)
     post_url = db.Column(db.String(500))
     status = db.Column(db.String(50)) # 'Publicado' ou 'Erro'
-    posted_at = db.Column(db.DateTime, default=datetime.utcnow)
+    posted_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)
+
+class CreditTransaction(db.Model):
+    """Extrato de créditos (só inserção): cada débito, crédito ou estorno vira uma linha."""
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False, index=True)
+    amount = db.Column(db.Integer, nullable=False)          # Negativo = débito
+    balance_after = db.Column(db.Integer, nullable=False)   # Saldo logo após a movimentação
+    reason = db.Column(db.String(50), nullable=False)       # Ex: 'Post-IA', 'Spy Writer', 'estorno', 'plano'
+    ref = db.Column(db.String(100), nullable=True)          # Referência livre (ideia, pagamento...)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+class UserDailyUsage(db.Model):
+    """Posts por usuário e dia (UTC), incrementado a cada PostLog gravado."""
+    __tablename__ = 'user_daily_usage'
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), primary_key=True)
+    day = db.Column(db.Date, primary_key=True)
+    posts = db.Column(db.Integer, default=0, nullable=False)       # Todos os PostLogs do dia
+    published = db.Column(db.Integer, default=0, nullable=False)   # Só os com status 'Publicado'
+
+# Cache curto (por processo) das leituras do contador diário
+USAGE_CACHE_TTL = float(os.environ.get("USAGE_CACHE_TTL", 5))
+_cache_uso_diario = {}
+
+@event.listens_for(PostLog, "after_insert")
+def _contar_post_do_dia(mapper, connection, target):
+    """Incrementa o contador na mesma transação do PostLog (upsert atômico)."""
+    user_id = connection.execute(db.select(Blog.user_id).where(Blog.id == target.blog_id)).scalar()
+    if user_id is None:
+        return
+
+    dia = (target.posted_at or datetime.utcnow()).date()
+    publicado = 1 if target.status == 'Publicado' else 0
+    tabela = UserDailyUsage.__table__
+    dialetos = {"postgresql": postgresql.insert, "sqlite": sqlite.insert}
+
+    if connection.dialect.name in dialetos:
+        stmt = dialetos[connection.dialect.name](tabela).values(user_id=user_id, day=dia, posts=1, published=publicado)
+        connection.execute(stmt.on_conflict_do_update(
+            index_elements=[tabela.c.user_id, tabela.c.day],
+            set_={"posts": tabela.c.posts + 1, "published": tabela.c.published + publicado}
+        ))
+    else:
+        atualizados = connection.execute(
+            tabela.update()
+            .where(tabela.c.user_id == user_id, tabela.c.day == dia)
+            .values(posts=tabela.c.posts + 1, published=tabela.c.published + publicado)
+        ).rowcount
+        if not atualizados:
+            connection.execute(tabela.insert().values(user_id=user_id, day=dia, posts=1, published=publicado))
+
+    _cache_uso_diario.pop((user_id, dia), None)
+
+def posts_do_dia(user_id, dia=None):
+    """
+    (posts, publicados) do usuário no dia (UTC; padrão: hoje).
+    Leitura pela chave primária, com cache de USAGE_CACHE_TTL segundos.
+    """
+    dia = dia or datetime.utcnow().date()
+    chave = (user_id, dia)
+    item = _cache_uso_diario.get(chave)
+    if item and item[0] > time.monotonic():
+        return item[1]
+
+    linha = db.session.execute(
+        db.select(UserDailyUsage.posts, UserDailyUsage.published)
+        .where(UserDailyUsage.user_id == user_id, UserDailyUsage.day == dia)
+    ).first()
+    valores = (linha.posts, linha.published) if linha else (0, 0)
+
+    if len(_cache_uso_diario) > 10000:
+        _cache_uso_diario.clear()
+    _cache_uso_diario[chave] = (time.monotonic() + USAGE_CACHE_TTL, valores)
+    return valores
 
 class ContentSource(db.Model):
     id = db.Column(db.Integer, primary_key=True)
@@ -214,6 +316,8 @@ class CapturedContent(db.Model):
     url = db.Column(db.String(500), nullable=True)
     title = db.Column(db.String(200))
     content_summary = db.Column(db.Text)
+    # Prévia do resumo calculada no SQL (ver radar.radar); None se a query não pedir
+    resumo_curto = query_expression()
     is_processed = db.Column(db.Boolean, default=False)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     source = db.relationship('ContentSource', backref=db.backref('captures', lazy=True))
@@ -224,7 +328,107 @@ class ApiUsage(db.Model):
     api_name = db.Column(db.String(50), nullable=False)  # Ex: 'Groq', 'OpenAI'
     feature = db.Column(db.String(50), nullable=False)   # Ex: 'Generate Ideas', 'Post-IA'
     tokens_used = db.Column(db.Integer, default=0)
-    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    # Uso real reportado pelo provedor (Groq/OpenAI)
+    model = db.Column(db.String(100), nullable=True)
+    prompt_tokens = db.Column(db.Integer, default=0)
+    completion_tokens = db.Column(db.Integer, default=0)
+    images = db.Column(db.Integer, default=0)
+    idea_id = db.Column(db.Integer, nullable=True, index=True) # Para custo por post
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)
 
     # Relacionamento para facilitar consultas no admin
-    user = db.relationship('User', backref=db.backref('api_usages', lazy=True))
\ No newline at end of file
+    user = db.relationship('User', backref=db.backref('api_usages', lazy=True))
+
+
+class TraceSpan(db.Model):
+    """Etapa cronometrada de uma publicação (um trace por tentativa de publicar uma ideia)."""
+    id = db.Column(db.Integer, primary_key=True)
+    trace_id = db.Column(db.String(32), nullable=False, index=True)
+    idea_id = db.Column(db.Integer, nullable=True, index=True)
+    name = db.Column(db.String(100), nullable=False)   # Ex: 'publish', 'llm.artigo', 'wordpress.media'
+    depth = db.Column(db.Integer, default=0)           # Nível de aninhamento (para o waterfall)
+    start_ms = db.Column(db.Integer, default=0)        # Início relativo ao começo do trace
+    duration_ms = db.Column(db.Integer, default=0)
+    status = db.Column(db.String(20), default='ok')    # ok, error
+    info = db.Column(db.String(255), nullable=True)    # Detalhe curto (status HTTP, modelo, erro)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+class DailyStat(db.Model):
+    """
+    Agregado diário (UTC) para o painel admin, mantido pelo scheduler.
+    Uma linha por (dia, métrica). Ex: 'users.new', 'posts.Publicado',
+    'tokens.Groq', e os retratos do dia 'users.total', 'blogs.total', 'mrr.cents'.
+    """
+    __tablename__ = 'daily_stats'
+    day = db.Column(db.Date, primary_key=True)
+    metric = db.Column(db.String(60), primary_key=True)
+    value = db.Column(db.BigInteger, default=0, nullable=False)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+class ImageLibrary(db.Model):
+    """Imagens destacadas já enviadas ao WordPress de um blog, para reaproveitar em prompts parecidos."""
+    __tablename__ = 'image_library'
+    id = db.Column(db.Integer, primary_key=True)
+    blog_id = db.Column(db.Integer, db.ForeignKey('blog.id'), nullable=False, index=True)
+    prompt = db.Column(db.Text, nullable=False)                 # Prompt visual que gerou a imagem
+    simhash = db.Column(db.BigInteger, nullable=False)          # Assinatura de 64 bits do prompt
+    wp_media_id = db.Column(db.Integer, nullable=False)
+    uses = db.Column(db.Integer, default=1, nullable=False)     # Quantos posts já usaram a imagem
+    last_used_at = db.Column(db.DateTime, default=datetime.utcnow)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+class PostSlot(db.Model):
+    """
+    Horário de publicação planejado de um blog, em UTC (ver slot_service).
+    Um por (blog, dia local, posição); vira 'enqueued' quando uma ideia é
+    colocada na fila, 'skipped' sem ideia disponível e 'missed' se venceu há
+    mais tempo que a janela de recuperação.
+    """
+    __tablename__ = 'post_slot'
+    __table_args__ = (
+        db.UniqueConstraint('blog_id', 'local_date', 'position', name='uq_post_slot_dia'),
+        db.Index('ix_post_slot_status_slot_at', 'status', 'slot_at'),
+    )
+    id = db.Column(db.Integer, primary_key=True)
+    blog_id = db.Column(db.Integer, db.ForeignKey('blog.id'), nullable=False, index=True)
+    local_date = db.Column(db.Date, nullable=False)      # Dia no fuso do blog
+    position = db.Column(db.Integer, nullable=False)     # 0..posts_per_day-1
+    nominal_at = db.Column(db.DateTime, nullable=True)   # Horário pedido pelo blog (UTC), antes do espalhamento
+    slot_at = db.Column(db.DateTime, nullable=False)     # Quando publicar (UTC)
+    status = db.Column(db.String(20), default='planned', nullable=False)  # planned, enqueued, skipped, missed
+    idea_id = db.Column(db.Integer, nullable=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+class QueueShare(db.Model):
+    """Crédito (deficit) de cada usuário no round-robin ponderado da fila (ver queue_service)."""
+    __tablename__ = 'queue_share'
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), primary_key=True)
+    deficit = db.Column(db.Float, default=0.0, nullable=False)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+class BackgroundJob(db.Model):
+    """Trabalho pesado pedido pela interface e executado pelos workers do scheduler (ver job_service)."""
+    __tablename__ = 'background_job'
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False, index=True)
+    kind = db.Column(db.String(30), nullable=False)                 # manual_post, spy_writer
+    status = db.Column(db.String(20), default='queued', index=True)  # queued, running, done, failed
+    payload = db.Column(db.Text)                                     # JSON com os parâmetros
+    result = db.Column(db.Text)                                      # JSON com o resultado (ex.: texto reescrito)
+    message = db.Column(db.String(500))
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    started_at = db.Column(db.DateTime, nullable=True)
+    finished_at = db.Column(db.DateTime, nullable=True)
+
+# --- PERFIS DE CARREGAMENTO PARA LISTAS ---
+# Colunas Text grandes que as listagens não exibem. Nas listas elas ficam
+# adiadas (defer); se algum detalhe acessar o atributo, ele é carregado sob demanda.
+TEXTOS_LONGOS = {
+    PostLog: ("content",),
+    ContentIdea: ("context_insight", "full_content"),
+    CapturedContent: ("content_summary",),
+}
+
+def sem_textos_longos(model):
+    """Opções de query para listas: query.options(*sem_textos_longos(PostLog))."""
+    return [defer(getattr(model, coluna)) for coluna in TEXTOS_LONGOS[model]]
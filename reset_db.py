@@ -10,10 +10,10 @@ def force_db_reset():
         db.create_all()
         
         print("2. Criando Planos...")
-        starter = Plan(name='Starter', max_sites=1, posts_per_day=1, price=0.0, has_images=False)
-        lite    = Plan(name='Lite',    max_sites=1, posts_per_day=2, price=47.0, has_images=True)
-        pro     = Plan(name='Pro',     max_sites=3, posts_per_day=15, price=97.0, has_images=True)
-        vip     = Plan(name='VIP',     max_sites=15, posts_per_day=50, price=397.0, has_images=True)
+        starter = Plan(name='Starter', max_sites=1, posts_per_day=1, price=0.0, has_images=False, queue_weight=1, max_concurrent_posts=1)
+        lite    = Plan(name='Lite',    max_sites=1, posts_per_day=2, price=47.0, has_images=True, queue_weight=2, max_concurrent_posts=1)
+        pro     = Plan(name='Pro',     max_sites=3, posts_per_day=15, price=97.0, has_images=True, queue_weight=4, max_concurrent_posts=2)
+        vip     = Plan(name='VIP',     max_sites=15, posts_per_day=50, price=397.0, has_images=True, queue_weight=8, max_concurrent_posts=3)
         db.session.add_all([starter, lite, pro, vip])
         db.session.commit()
         
@@ -1,7 +1,11 @@
 from flask import Blueprint, render_template, redirect, url_for, flash, request
 from flask_login import login_required, current_user
-from models import db, Plan, User, Blog, PostLog
-from datetime import datetime, timedelta
+from models import db, Plan, User, ContentIdea, invalidar_cache_planos, listar_planos
+from sqlalchemy.orm import joinedload
+from services.profiler_service import get_perfis_recentes, get_resumo_por_nome, SLOW_QUERY_MS
+from services.trace_service import listar_traces_recentes, carregar_trace
+from services.pagination_service import paginar_request
+from services.stats_service import resumo_painel
 
 admin_bp = Blueprint('admin', __name__, url_prefix='/admin')
 
@@ -16,23 +20,11 @@ def ensure_admin():
 @admin_bp.route('/dashboard')
 @login_required
 def admin_dashboard():
-    # Estatísticas básicas
-    total_users = User.query.count()
-    total_blogs = Blog.query.count()
-    
-    # Posts de hoje
-    hoje = datetime.utcnow().date()
-    posts_today = PostLog.query.filter(db.func.date(PostLog.posted_at) == hoje).count()
-    
-    # Usuários recentes (últimos 7 dias)
-    uma_semana_atras = datetime.utcnow() - timedelta(days=7)
-    new_users_week = User.query.filter(User.created_at >= uma_semana_atras).count()
+    # Números e séries vêm do rollup diário (daily_stats), com cache de 1 minuto
+    stats = resumo_painel()
+    latest_users = User.query.options(joinedload(User.plan)).order_by(User.created_at.desc()).limit(5).all()
 
-    return render_template('admin/dashboard.html', 
-                         total_users=total_users, 
-                         total_blogs=total_blogs, 
-                         posts_today=posts_today,
-                         new_users_week=new_users_week)
+    return render_template('admin/dashboard.html', stats=stats, latest_users=latest_users)
 
 @admin_bp.route('/plans')
 @login_required
@@ -53,6 +45,8 @@ def edit_plan(id):
         plan.max_sites = int(request.form.get('max_sites', 1))
         plan.posts_per_day = int(request.form.get('posts_per_day', 1))
         plan.credits_monthly = int(request.form.get('credits_monthly', 0))
+        plan.queue_weight = max(1, int(request.form.get('queue_weight', 1)))
+        plan.max_concurrent_posts = max(1, int(request.form.get('max_concurrent_posts', 1)))
         
         # Novos campos de exibição e IA
         plan.ia_principal = request.form.get('ia_principal', 'Llama 3 (Quick)')
@@ -64,6 +58,7 @@ def edit_plan(id):
         plan.is_public = True if request.form.get('is_public') else False
         
         db.session.commit()
+        invalidar_cache_planos()
         flash(f"Plano {plan.name} atualizado com sucesso!", "success")
     except Exception as e:
         db.session.rollback()
@@ -75,9 +70,9 @@ def edit_plan(id):
 @login_required
 def list_users():
     """Lista todos os usuários e permite alteração de planos."""
-    users = User.query.order_by(User.created_at.desc()).all()
-    plans = Plan.query.all()
-    return render_template('admin/users.html', users=users, plans=plans)
+    users = paginar_request(User.query, User.created_at, User.id)
+    plans = listar_planos()
+    return render_template('admin/users.html', users=users, plans=plans, total_users=User.query.count())
 
 @admin_bp.route('/user/<int:id>/set-plan', methods=['POST'])
 @login_required
@@ -114,4 +109,32 @@ def toggle_admin(id):
     status = "promovido a Admin" if user.is_admin else "removido de Admin"
     flash(f"Usuário {user.email} foi {status}.", "success")
     
-    return redirect(url_for('admin.list_users'))
\ No newline at end of file
+    return redirect(url_for('admin.list_users'))
+
+@admin_bp.route('/db-profiler')
+@login_required
+def db_profiler():
+    """Queries por request (todos os workers) e por job do scheduler: resumo por nome e execuções recentes."""
+    return render_template('admin/db_profiler.html',
+                         resumo=get_resumo_por_nome(),
+                         recentes=get_perfis_recentes(50),
+                         slow_ms=SLOW_QUERY_MS)
+
+@admin_bp.route('/traces')
+@login_required
+def traces():
+    """Últimas publicações com trace (span raiz de cada tentativa)."""
+    return render_template('admin/traces.html', traces=listar_traces_recentes())
+
+@admin_bp.route('/traces/<trace_id>')
+@login_required
+def trace_detail(trace_id):
+    """Waterfall das etapas de uma publicação."""
+    spans = carregar_trace(trace_id)
+    if not spans:
+        flash("Trace não encontrado.", "danger")
+        return redirect(url_for('admin.traces'))
+
+    total_ms = max(max(s.start_ms + s.duration_ms for s in spans), 1)
+    idea = ContentIdea.query.get(spans[0].idea_id) if spans[0].idea_id else None
+    return render_template('admin/trace_detail.html', spans=spans, total_ms=total_ms, idea=idea, trace_id=trace_id)
@@ -1,10 +1,30 @@
 from flask import render_template, request, redirect, url_for, flash, Blueprint, jsonify
 from flask_login import login_required, current_user
-from models import db, Blog, ContentIdea, PostLog
+from models import db, Blog, ContentIdea, PostLog, BackgroundJob, sem_textos_longos
 from services import content_service
+from services.credit_service import contexto_uso, estornar_creditos
+from services.pagination_service import paginar_request
+from services.queue_service import PRIORIDADE_NORMAL, PRIORIDADE_INTERATIVA
+from services.job_service import criar_job, salvar_upload, job_para_json
+from datetime import datetime
 
 content_bp = Blueprint('content', __name__)
 
+def _job_do_usuario(job_id):
+    """Job do usuário logado (404 para o de outro usuário)."""
+    return BackgroundJob.query.filter_by(id=job_id, user_id=current_user.id).first_or_404()
+
+def _ideia_do_usuario(idea_id):
+    """Ideia de um blog do usuário logado (404 para a de outro usuário)."""
+    return ContentIdea.query.join(Blog, ContentIdea.blog_id == Blog.id)\
+        .filter(ContentIdea.id == idea_id, Blog.user_id == current_user.id).first_or_404()
+
+def _responder_job(job, endpoint):
+    """Cliente JSON recebe 202 com a URL de status; o formulário volta para a página acompanhando o job."""
+    if request.accept_mimetypes.best == 'application/json':
+        return jsonify({**job_para_json(job), "status_url": url_for('content.job_status', job_id=job.id)}), 202
+    return redirect(url_for(endpoint, job=job.id))
+
 # Rota para gerar ideias via IA (Groq)
 @content_bp.route('/generate-ideas', methods=['POST'])
 @login_required
@@ -19,11 +39,9 @@ def generate_ideas():
     blog = Blog.query.filter_by(id=site_id, user_id=current_user.id).first_or_404()
     
     # Executa a lógica de geração de títulos/insights
-    count = content_service.generate_ideas_logic(blog)
-
-    # Registro de consumo de API para controle financeiro
-    from services.credit_service import log_api_usage
-    log_api_usage(current_user.id, "Groq", "Generate Ideas", tokens=500) 
+    # (o consumo real de tokens é registrado pelo ai_service para controle financeiro)
+    with contexto_uso(current_user.id, "Generate Ideas"):
+        count = content_service.generate_ideas_logic(blog)
     
     if count > 0:
         flash(f'{count} novas ideias geradas para {blog.site_name}!', 'success')
@@ -37,7 +55,7 @@ def generate_ideas():
 @login_required
 def delete_idea(idea_id):
     if not getattr(current_user, 'is_demo', False):
-        idea = ContentIdea.query.get_or_404(idea_id)
+        idea = _ideia_do_usuario(idea_id)
         db.session.delete(idea)
         db.session.commit()
         flash('Ideia removida.', 'info')
@@ -47,29 +65,30 @@ def delete_idea(idea_id):
 @content_bp.route('/publish-idea/<int:idea_id>', methods=['POST'])
 @login_required
 def publish_idea(idea_id):
-    # 1. Busca a ideia e valida dono (Segurança adicional)
-    idea = ContentIdea.query.get_or_404(idea_id)
+    # 1. Busca a ideia e valida dono (antes do limite e do débito)
+    idea = _ideia_do_usuario(idea_id)
     
     # Debug inicial
     print(f"🔍 [DEBUG] Tentando enfileirar ideia ID: {idea.id} | Status Atual: {idea.status}")
 
-    # 2. Validação de Créditos
-    if not current_user.consume_credit(1):
-        print(f"❌ [DEBUG] Falha: Usuário {current_user.id} sem créditos.")
-        flash("Saldo insuficiente! Recarregue seus créditos.", "danger")
-        return redirect(url_for('content.brainstorm'))
-
-    # 3. Validação de Limites do Plano
+    # 2. Validação de Limites do Plano (antes do débito: evita debitar e estornar)
     reached, limit, current = current_user.reached_daily_limit(is_ai_post=True)
     if reached:
-        current_user.increase_credit(1) # Estorno imediato
         print(f"❌ [DEBUG] Falha: Limite diário atingido ({current}/{limit}).")
         flash(f"Limite diário atingido ({current}/{limit}).", "danger")
         return redirect(url_for('content.brainstorm'))
 
+    # 3. Validação de Créditos (débito atômico)
+    if not current_user.consume_credit(1, reason="Post-IA", ref=f"idea:{idea.id}"):
+        print(f"❌ [DEBUG] Falha: Usuário {current_user.id} sem créditos.")
+        flash("Saldo insuficiente! Recarregue seus créditos.", "danger")
+        return redirect(url_for('content.brainstorm'))
+
     try:
         # 4. Envio para a Fila (Mudança de Status)
         idea.status = 'pending'
+        idea.priority = PRIORIDADE_INTERATIVA  # Pedido do usuário: faixa rápida
+        idea.enqueued_at = datetime.utcnow()   # Ordem da fila e métrica enqueue -> publish
         
         # Forçamos a expiração para garantir que o SQLAlchemy veja a mudança
         db.session.add(idea) 
@@ -82,6 +101,7 @@ def publish_idea(idea_id):
         
     except Exception as e:
         db.session.rollback()
+        estornar_creditos(current_user, 1, "Post-IA", ref=f"idea:{idea.id}")
         print(f"🔥 [DEBUG ERRO] Falha ao atualizar banco: {str(e)}")
         flash("Erro ao enviar para a fila. Tente novamente.", "danger")
 
@@ -99,6 +119,10 @@ def manual_post():
         action = request.form.get('action_type') # 'queue' ou 'now'
         image_file = request.files.get('image')
 
+        if not Blog.query.filter_by(id=site_id, user_id=current_user.id).first():
+            flash("Site não encontrado.", "danger")
+            return render_template('manual_post.html', blogs=blogs, job=None)
+
         # Se o usuário optar por usar a fila do Worker
         if action == 'queue':
             nova_ideia = ContentIdea(
@@ -106,6 +130,8 @@ def manual_post():
                 title=title,
                 context_insight=content,
                 status='pending',
+                priority=PRIORIDADE_INTERATIVA,
+                enqueued_at=datetime.utcnow(),
                 is_posted=False
             )
             db.session.add(nova_ideia)
@@ -113,16 +139,14 @@ def manual_post():
             flash("Post manual adicionado à fila de processamento.", "success")
             return redirect(url_for('content.post_report'))
 
-        # Publicação imediata (Síncrona)
-        success, message = content_service.process_manual_post(
-            current_user, site_id, title, content, action, image_file
-        )
-        if success:
-            flash(message, "success")
-            return redirect(url_for('content.post_report'))
-        flash(message, "danger")
-        
-    return render_template('manual_post.html', blogs=blogs)
+        # Publicação imediata / rascunho no WP: upload e POST rodam nos workers do scheduler
+        job = criar_job(current_user.id, "manual_post", site_id=site_id, title=title, content=content,
+                        action=action, imagem=salvar_upload(image_file))
+        return _responder_job(job, 'content.manual_post')
+
+    job_id = request.args.get('job', type=int)
+    job = _job_do_usuario(job_id) if job_id else None
+    return render_template('manual_post.html', blogs=blogs, job=job)
 
 # SPY WRITER (IA + Fila)
 @content_bp.route('/spy-writer', methods=['GET', 'POST'])
@@ -137,12 +161,17 @@ def spy_writer():
             site_id = request.form.get('site_id')
             title = request.form.get('title')
             content = request.form.get('content')
+            if not Blog.query.filter_by(id=site_id, user_id=current_user.id).first():
+                flash("Site não encontrado.", "danger")
+                return render_template('spy_writer.html', processed_content=None, blogs=blogs, job=None)
             
             nova_ideia = ContentIdea(
                 blog_id=site_id,
                 title=title,
                 context_insight=content,
-                status='pending'
+                status='pending',
+                priority=PRIORIDADE_INTERATIVA,
+                enqueued_at=datetime.utcnow()
             )
             db.session.add(nova_ideia)
             db.session.commit()
@@ -153,61 +182,80 @@ def spy_writer():
         reached, _, _ = current_user.reached_daily_limit(is_ai_post=True)
         if reached:
             flash("Limite diário atingido.", "warning")
-            return render_template('spy_writer.html', processed_content=None, blogs=blogs)
+            return render_template('spy_writer.html', processed_content=None, blogs=blogs, job=None)
 
-        if not current_user.consume_credit(2):
+        url = request.form.get('url')
+        if not current_user.consume_credit(2, reason="Spy Writer", ref=url):
             flash("Créditos insuficientes.", "danger")
-            return render_template('spy_writer.html', processed_content=None, blogs=blogs)
+            return render_template('spy_writer.html', processed_content=None, blogs=blogs, job=None)
 
-        url = request.form.get('url')
+        # Scraping + reescrita rodam nos workers; depois de criado, o estorno em caso de falha fica com o job
         try:
-            processed = content_service.analyze_spy_link(url, getattr(current_user, 'is_demo', False))
-            if processed:
-                from services.credit_service import log_api_usage
-                log_api_usage(current_user.id, "Groq/Scraper", "Spy Writer", tokens=1500)
-                flash("Conteúdo processado! Você pode editar abaixo ou enviar direto para a fila.", "success")
-            else:
-                current_user.increase_credit(2)
-                flash("Não foi possível extrair dados desta URL.", "danger")
+            job = criar_job(current_user.id, "spy_writer", url=url)
         except Exception as e:
-            current_user.increase_credit(2)
-            flash(f"Erro no processamento: {str(e)}", "danger")
+            db.session.rollback()
+            estornar_creditos(current_user, 2, "Spy Writer", ref=url)
+            print(f"🔥 [DEBUG ERRO] Falha ao criar job do Spy Writer: {str(e)}")
+            flash("Erro ao iniciar o processamento. Tente novamente.", "danger")
+            return render_template('spy_writer.html', processed_content=None, blogs=blogs, job=None)
+        return _responder_job(job, 'content.spy_writer')
+
+    job_id = request.args.get('job', type=int)
+    job = _job_do_usuario(job_id) if job_id else None
+    if job and job.status == 'done':
+        processed = job_para_json(job)["result"]
+    return render_template('spy_writer.html', processed_content=processed, blogs=blogs, job=job)
 
-    return render_template('spy_writer.html', processed_content=processed, blogs=blogs)
+@content_bp.route('/jobs/<int:job_id>')
+@login_required
+def job_status(job_id):
+    """Status de um job em segundo plano (consultado pela página a cada segundo)."""
+    return jsonify(job_para_json(_job_do_usuario(job_id)))
 
 # Relatório de Postagens
 @content_bp.route('/post-report')
 @login_required
 def post_report():
-    logs = PostLog.query.join(Blog).filter(Blog.user_id == current_user.id).order_by(PostLog.posted_at.desc()).all()
+    site_id = request.args.get('site_id', type=int)
+    logs = content_service.get_post_reports(current_user.id, site_id,
+                                            cursor=request.args.get('cursor'),
+                                            per_page=request.args.get('per_page'))
     return render_template('post_report.html', logs=logs)
 
 # Rotas de utilidade para créditos (API interna)
 @content_bp.route('/consome/<int:quantidade>')
 @login_required
 def consome_creditos(quantidade):
-    if current_user.consume_credit(quantidade):
+    if current_user.consume_credit(quantidade, reason="api interna"):
         return jsonify({"status": "sucesso", "saldo_atual": current_user.credits}), 200
     return jsonify({"status": "erro", "mensagem": "Saldo insuficiente"}), 400
 
 @content_bp.route('/aumenta/<int:quantidade>')
 @login_required
 def aumenta_creditos(quantidade):
-    current_user.increase_credit(quantidade)
+    current_user.increase_credit(quantidade, reason="api interna")
     return jsonify({"status": "sucesso", "saldo_atual": current_user.credits}), 200
 
 # --- TELA 1: BRAINSTORM (IDEIAS) ---
 @content_bp.route('/brainstorm')
+@login_required
 def brainstorm():
     # Apenas ideias que ainda não foram para a fila
-    ideas = ContentIdea.query.filter_by(status='draft').join(Blog).filter(Blog.user_id == current_user.id).all()
+    query = ContentIdea.query.filter_by(status='draft').join(Blog).filter(Blog.user_id == current_user.id)\
+        .options(*sem_textos_longos(ContentIdea))
+    ideas = paginar_request(query, ContentIdea.created_at, ContentIdea.id)
     return render_template('ideas/brainstorm.html', ideas=ideas)
 
 # --- TELA 2: FILA (AGUARDANDO) ---
 @content_bp.route('/queue')
+@login_required
 def queue():
-    # O que o scheduler vai processar em breve
-    pending = ContentIdea.query.filter(ContentIdea.status.in_(['pending', 'processing'])).all()
+    # O que o scheduler vai processar em breve (só do usuário logado, mais antigos primeiro)
+    query = ContentIdea.query.join(Blog).filter(
+        Blog.user_id == current_user.id,
+        ContentIdea.status.in_(['pending', 'processing'])
+    ).options(*sem_textos_longos(ContentIdea))
+    pending = paginar_request(query, ContentIdea.enqueued_at, ContentIdea.id, crescente=True)
     return render_template('ideas/queue.html', pending=pending)
 
 # --- TELA 3: POSTS EFETIVADOS (Ajustado) ---
@@ -215,9 +263,10 @@ def queue():
 @login_required
 def published():
     # Filtra apenas o que já foi postado com sucesso via scheduler
-    posts = ContentIdea.query.filter_by(status='completed')\
+    query = ContentIdea.query.filter_by(status='completed')\
         .join(Blog).filter(Blog.user_id == current_user.id)\
-        .order_by(ContentIdea.created_at.desc()).all()
+        .options(*sem_textos_longos(ContentIdea))
+    posts = paginar_request(query, ContentIdea.created_at, ContentIdea.id)
     
     return render_template('ideas/published.html', posts=posts)
 
@@ -227,8 +276,10 @@ def published():
 @login_required
 def cancel_queue_item(idea_id):
     """ Tira o item da fila e volta para o Banco de Ideias (Draft) """
-    idea = ContentIdea.query.get_or_404(idea_id)
+    idea = _ideia_do_usuario(idea_id)
     idea.status = 'draft'
+    idea.priority = PRIORIDADE_NORMAL  # Se voltar pela automação, não usa a faixa rápida
+    idea.enqueued_at = None
     db.session.commit()
     flash(f"Agendamento de '{idea.title}' cancelado. Ele voltou para o Banco de Ideias.", "info")
     return redirect(url_for('content.queue'))
@@ -238,11 +289,14 @@ def cancel_queue_item(idea_id):
 def clear_queue():
     """ Remove TODOS os itens que estão pendentes na fila do usuário """
     pending_items = ContentIdea.query.filter_by(status='pending')\
-        .join(Blog).filter(Blog.user_id == current_user.id).all()
+        .join(Blog).filter(Blog.user_id == current_user.id)\
+        .options(*sem_textos_longos(ContentIdea)).all()
     
     count = 0
     for item in pending_items:
         item.status = 'draft'
+        item.priority = PRIORIDADE_NORMAL
+        item.enqueued_at = None
         count += 1
     
     db.session.commit()
@@ -1,6 +1,6 @@
 from flask import render_template, request, Blueprint
 from flask_login import login_required, current_user
-from models import db, Blog, PostLog, Plan, ContentIdea
+from models import db, Blog, PostLog, Plan, ContentIdea, posts_do_dia, listar_planos, sem_textos_longos
 from datetime import datetime
 
 dashboard_bp = Blueprint('dashboard', __name__)
@@ -22,21 +22,19 @@ def dashboard_view():
     
     # Busca logs recentes de todos os sites do usuário
     logs_recentes = PostLog.query.join(Blog).filter(Blog.user_id == current_user.id)\
+        .options(*sem_textos_longos(PostLog))\
         .order_by(PostLog.posted_at.desc()).limit(5).all()
 
-    # Contagem de posts realizados hoje
-    hoje = datetime.utcnow().date()
-    posts_hoje = PostLog.query.join(Blog).filter(
-        Blog.user_id == current_user.id,
-        db.func.date(PostLog.posted_at) == hoje
-    ).count()
+    # Contagem de posts realizados hoje (contador diário, sem COUNT no PostLog)
+    posts_hoje, _ = posts_do_dia(current_user.id)
 
     # NOVAS MÉTRICAS PARA A HOME:
-    ideias_rascunho = ContentIdea.query.filter_by(status='draft').join(Blog).filter(Blog.user_id == current_user.id).count()
-    na_fila = ContentIdea.query.filter_by(status='pending').join(Blog).filter(Blog.user_id == current_user.id).count()
+    ideias_rascunho = db.session.query(db.func.count(ContentIdea.id)).join(Blog).filter(ContentIdea.status == 'draft', Blog.user_id == current_user.id).scalar()
+    na_fila = db.session.query(db.func.count(ContentIdea.id)).join(Blog).filter(ContentIdea.status == 'pending', Blog.user_id == current_user.id).scalar()
     
     # Pega o próximo post que o scheduler vai processar
     proximo_post = ContentIdea.query.filter_by(status='pending').join(Blog)\
+        .options(*sem_textos_longos(ContentIdea))\
         .filter(Blog.user_id == current_user.id).order_by(ContentIdea.created_at.asc()).first()
 
     return render_template('dashboard.html',
@@ -55,7 +53,7 @@ def pricing():
     """Rota de preços que envia a lista de planos para o template."""
     # Busca todos os planos cadastrados no banco de dados
     # Isso envia uma LISTA de objetos, resolvendo o erro do .items()
-    planos = Plan.query.order_by(Plan.id.asc()).all()
+    planos = listar_planos()
     
     return render_template('pricing.html', 
                            user=current_user, 
@@ -65,7 +63,8 @@ def pricing():
 @login_required
 def post_reports2():
     # Busca os logs de postagem apenas dos sites que pertencem ao usuário logado
-    reports = PostLog.query.join(Blog).filter(Blog.user_id == current_user.id).order_by(PostLog.created_at.desc()).all()
+    reports = PostLog.query.join(Blog).filter(Blog.user_id == current_user.id)\
+        .options(*sem_textos_longos(PostLog)).order_by(PostLog.created_at.desc()).all()
     return render_template('reports.html', reports=reports)
 
 @dashboard_bp.route('/reports3')
@@ -74,7 +73,7 @@ def reports3():
     # Buscamos os logs filtrando pelos blogs que pertencem ao usuário atual
     user_reports = PostLog.query.join(Blog).filter(
         Blog.user_id == current_user.id
-    ).order_by(PostLog.posted_at.desc()).limit(50).all()
+    ).options(*sem_textos_longos(PostLog)).order_by(PostLog.posted_at.desc()).limit(50).all()
     
     return render_template('reports.html', reports=user_reports)
 
@@ -86,7 +85,7 @@ def reports():
         # Verifique se o nome no seu model é 'posted_at' ou 'created_at'
         user_reports = PostLog.query.join(Blog).filter(
             Blog.user_id == current_user.id
-        ).order_by(PostLog.posted_at.desc()).limit(50).all() # Usar .id.desc() é um fallback seguro
+        ).options(*sem_textos_longos(PostLog)).order_by(PostLog.posted_at.desc()).limit(50).all() # Usar .id.desc() é um fallback seguro
         
         return render_template('reports.html', reports=user_reports)
     except Exception as e:
@@ -108,7 +108,7 @@ def webhook():
                 if user and plan:
                     user.plan_id = plan.id
                     # Adiciona os créditos definidos no banco para este plano
-                    adicionar_creditos(user.id, plan.credits_monthly)
+                    adicionar_creditos(user.id, plan.credits_monthly, motivo="plano", ref=f"stripe:{session.get('id')}")
                     db.session.commit()
                     send_payment_confirmation_email(user.email, plan)
     
@@ -1,7 +1,8 @@
 from flask import render_template, request, redirect, url_for, flash, Blueprint
 from flask_login import login_required, current_user
-from models import db, Blog, ContentSource
+from models import db, Blog, ContentSource, CapturedContent
 from services import content_service
+from services.credit_service import contexto_uso, estornar_creditos
 from services.scraper_service import extrair_texto_da_url
 from sqlalchemy.orm import joinedload # Adicione este import no topo
 
@@ -10,19 +11,19 @@ radar_bp = Blueprint('radar', __name__)
 @radar_bp.route('/radar')
 @login_required
 def radar():
-    # Usamos joinedload para trazer os insights (captures) de uma vez só
-    query = ContentSource.query.options(joinedload(ContentSource.captures)).join(Blog).filter(Blog.user_id == current_user.id)
+    # Usamos joinedload para trazer os insights (captures) de uma vez só.
+    # Do resumo vêm só os 250 primeiros caracteres (calculados no banco).
+    captures = joinedload(ContentSource.captures)
+    query = ContentSource.query.options(
+        captures.defer(CapturedContent.content_summary),
+        captures.with_expression(CapturedContent.resumo_curto, db.func.substr(CapturedContent.content_summary, 1, 250))
+    ).join(Blog).filter(Blog.user_id == current_user.id)
     
     site_id = request.args.get('site_id', type=int)
     if site_id:
         query = query.filter(ContentSource.blog_id == site_id)
         
     fontes = query.order_by(ContentSource.created_at.desc()).all()
-    
-    # DEBUG: Remova isso após testar. Ajuda a ver no terminal se o dado existe.
-    for f in fontes:
-        print(f"Fonte: {f.source_url} | Insights encontrados: {len(f.captures)}")
-        
     return render_template('radar.html', fontes=fontes)
 
 @radar_bp.route('/add-source', methods=['POST'])
@@ -55,16 +56,18 @@ def sync_radar():
         return redirect(url_for('radar.radar'))
 
     # REGRA 4: Sincronização consome crédito
-    if not current_user.consume_credit(1):
+    if not current_user.consume_credit(1, reason="Radar Sync"):
         flash("Saldo insuficiente para sincronizar o Radar.", "danger")
         return redirect(url_for('radar.radar'))
 
     fontes = ContentSource.query.join(Blog).filter(Blog.user_id == current_user.id).all()
     if not fontes:
+        estornar_creditos(current_user, 1, "Radar Sync")
         flash("Adicione uma fonte primeiro!", "warning")
         return redirect(url_for('radar.radar'))
 
-    novos = content_service.sync_sources_logic(fontes, extrair_texto_da_url)
+    with contexto_uso(current_user.id, "Radar Sync"):
+        novos = content_service.sync_sources_logic(fontes, extrair_texto_da_url)
     flash(f"Radar atualizado! {novos} novas análises geradas.", "success")
     return redirect(url_for('radar.radar'))
 
@@ -81,7 +84,9 @@ def delete_source(source_id):
 @login_required
 def approve_insight(insight_id):
     """Rota que transforma um insight em uma ideia de post real."""
-    if content_service.convert_radar_insight_to_idea(insight_id):
+    with contexto_uso(current_user.id, "Radar Insight"):
+        convertido = content_service.convert_radar_insight_to_idea(insight_id)
+    if convertido:
         flash("Insight aprovado! Ele agora aparece na sua lista de Ideias.", "success")
     else:
         flash("Erro ao processar insight.", "danger")
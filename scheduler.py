@@ -3,10 +3,21 @@ import schedule
 import logging
 import sys
 import io
-from datetime import datetime, date
+import threading
+from datetime import datetime
 from app import app
-from models import db, Blog, ContentIdea
+from models import db
 from services.content_service import publish_content_flow
+from services.profiler_service import perfilar_job
+from services.metrics_service import ENQUEUE_TO_PUBLISH_SECONDS, PUBLISH_TOTAL
+from services.trace_service import limpar_traces_antigos
+from services.stats_service import atualizar_rollup
+from services.pregen_service import pre_gerar_conteudos, PREGEN_POLL_SECONDS
+from services.slot_service import planejar_slots, enfileirar_slots_vencidos
+from services.radar_index_service import reconstruir_indices_ausentes
+from services.queue_service import (reivindicar_proxima, reivindicar_prioritaria,
+                                    QUEUE_FAST_WORKERS, QUEUE_FAST_POLL_SECONDS)
+from services.job_service import processar_jobs, limpar_jobs, JOB_WORKERS, JOB_POLL_SECONDS
 
 # Ajuste de codificação para evitar erros de Emoji no Windows
 if sys.platform == "win32":
@@ -22,81 +33,147 @@ logging.basicConfig(
     ]
 )
 
-def check_and_enqueue_auto_posts():
+def planejar_horarios(agora=None):
+    """Materializa os slots de publicação de hoje/amanhã de cada blog (fuso do blog, UTC no banco)."""
+    with app.app_context():
+        criados = planejar_slots(agora)
+        if criados:
+            logging.info(f"🗓️ [AGENDADOR] {criados} slot(s) de publicação planejado(s)")
+
+def check_and_enqueue_auto_posts(agora=None):
     """
     SISTEMA DE DECISÃO:
-    Varre os blogs e move ideias de 'draft' para 'pending' conforme o horário.
+    Move uma ideia de 'draft' para 'pending' para cada slot vencido,
+    recuperando os que venceram com o scheduler parado.
     """
     with app.app_context():
-        hoje = date.today()
-        agora_hora = datetime.now().strftime("%H:%M")
+        enfileiradas = enfileirar_slots_vencidos(agora)
+        if enfileiradas:
+            logging.info(f"🤖 [AGENDADOR] {enfileiradas} ideia(s) enfileirada(s) pelos slots")
+
+def _publicar_tarefa(tarefa, faixa):
+    """Publica uma ideia já marcada como 'processing' e grava o resultado."""
+    try:
+        sucesso, mensagem = publish_content_flow(tarefa, tarefa.blog.owner)
         
-        logging.info(f"🕒 Verificando cronogramas (Hora atual: {agora_hora})...")
+        if sucesso:
+            tarefa.status = 'completed'
+            tarefa.is_posted = True
+            if tarefa.enqueued_at:
+                ENQUEUE_TO_PUBLISH_SECONDS.labels(lane=faixa).observe((datetime.utcnow() - tarefa.enqueued_at).total_seconds())
+        else:
+            tarefa.status = 'failed'
+        PUBLISH_TOTAL.labels(result=tarefa.status).inc()
+            # Opcional: registrar a mensagem de erro no PostLog
         
-        blogs = Blog.query.all()
-        for blog in blogs:
-            # Verifica se atingiu o horário configurado pelo usuário
-            if agora_hora >= blog.schedule_time:
-                
-                # Conta quantos posts já foram enfileirados ou feitos hoje
-                posts_hoje = ContentIdea.query.filter(
-                    ContentIdea.blog_id == blog.id,
-                    db.func.date(ContentIdea.created_at) == hoje,
-                    ContentIdea.status.in_(['pending', 'completed'])
-                ).count()
-
-                if posts_hoje < (blog.posts_per_day or 1):
-                    # Seleciona a próxima ideia 'draft' disponível
-                    proxima = ContentIdea.query.filter_by(
-                        blog_id=blog.id, 
-                        status='draft',
-                        is_posted=False
-                    ).order_by(ContentIdea.created_at.asc()).first()
-
-                    if proxima:
-                        logging.info(f"🤖 [AGENDADOR] Ativando post: '{proxima.title}' para o blog {blog.site_name}")
-                        proxima.status = 'pending'
-                        proxima.created_at = datetime.now() # Atualiza para contar no limite de hoje
-                        db.session.commit()
+        db.session.commit()
+    except Exception as e:
+        db.session.rollback()
+        PUBLISH_TOTAL.labels(result='error').inc()
+        tarefa.status = 'failed' # Libera a fila em caso de erro grave
+        db.session.commit()
 
 def processar_fila_de_postagem():
     with app.app_context():
-        # Pegamos apenas um por vez, o mais antigo
-        tarefa = ContentIdea.query.filter_by(status='pending', is_posted=False).first()
+        # Um por vez, dividindo a fila entre os usuários pelo peso do plano.
+        # A ideia já volta como 'processing' (bloqueio antes do trabalho pesado)
+        tarefa = reivindicar_proxima()
+
+        if tarefa:
+            _publicar_tarefa(tarefa, 'bulk')
 
+def processar_faixa_rapida():
+    """Um ciclo da faixa rápida: publica uma ideia prioritária, se houver. Devolve se publicou."""
+    with app.app_context():
+        tarefa = reivindicar_prioritaria()
         if tarefa:
-            # BLOQUEIO PREVENTIVO: Mudamos o status ANTES de começar o trabalho pesado
-            tarefa.status = 'processing' 
-            db.session.commit()
-            
-            try:
-                sucesso, mensagem = publish_content_flow(tarefa, tarefa.blog.owner)
-                
-                if sucesso:
-                    tarefa.status = 'completed'
-                    tarefa.is_posted = True
-                else:
-                    tarefa.status = 'failed'
-                    # Opcional: registrar a mensagem de erro no PostLog
-                
-                db.session.commit()
-            except Exception as e:
-                db.session.rollback()
-                tarefa.status = 'failed' # Libera a fila em caso de erro grave
-                db.session.commit()
+            logging.info(f"⚡ [FILA] Publicando pedido do usuário: '{tarefa.title}'")
+            _publicar_tarefa(tarefa, 'fast')
+        return tarefa is not None
+
+def processar_job_em_segundo_plano():
+    """Um ciclo dos workers de jobs (publicação manual imediata, Spy Writer). Devolve se executou."""
+    with app.app_context():
+        return processar_jobs()
+
+def _loop(ciclo, intervalo):
+    """Roda `ciclo` sem parar; dorme `intervalo` segundos quando não houve trabalho."""
+    while True:
+        try:
+            if not ciclo():
+                time.sleep(intervalo)
+        except Exception as e:
+            logging.error(f"❌ [WORKER] Erro em {ciclo.__name__}: {e}")
+            time.sleep(intervalo)
+
+def iniciar_workers():
+    """Sobe os workers reservados (faixa rápida, jobs e pré-geração), fora do loop do schedule."""
+    for i in range(QUEUE_FAST_WORKERS):
+        threading.Thread(target=_loop, args=(processar_faixa_rapida, QUEUE_FAST_POLL_SECONDS),
+                         name=f"faixa-rapida-{i}", daemon=True).start()
+    for i in range(JOB_WORKERS):
+        threading.Thread(target=_loop, args=(processar_job_em_segundo_plano, JOB_POLL_SECONDS),
+                         name=f"jobs-{i}", daemon=True).start()
+    threading.Thread(target=_loop, args=(perfilar_job(pre_gerar), PREGEN_POLL_SECONDS),
+                     name="pre-geracao", daemon=True).start()
+
+def limpar_jobs_antigos():
+    """Falha jobs travados e apaga os finalizados há mais de JOB_RETENTION_DAYS."""
+    with app.app_context():
+        travados, removidos = limpar_jobs()
+        logging.info(f"🧹 Jobs: {travados} travado(s) encerrado(s), {removidos} antigo(s) removido(s)")
+
+def limpar_traces():
+    """Apaga spans de publicação mais antigos que TRACE_RETENTION_DAYS."""
+    with app.app_context():
+        removidos = limpar_traces_antigos()
+        logging.info(f"🧹 Traces antigos removidos: {removidos} spans")
+
+def atualizar_estatisticas():
+    """Recalcula o rollup diário do painel admin (ontem e hoje)."""
+    with app.app_context():
+        atualizar_rollup()
+
+def indexar_radar():
+    """Constrói o índice vetorial dos blogs com capturas e sem índice (a busca não constrói no request)."""
+    with app.app_context():
+        construidos = reconstruir_indices_ausentes()
+        if construidos:
+            logging.info(f"🔎 [RADAR] {construidos} índice(s) construído(s)")
+
+def pre_gerar():
+    """Prepara texto/imagem das ideias que vencem nas próximas horas (com a fila ociosa). Devolve quantas."""
+    with app.app_context():
+        feitas = pre_gerar_conteudos()
+        if feitas:
+            logging.info(f"🧠 Ideias pré-geradas neste ciclo: {feitas}")
+        return feitas
 
 # --- DEFINIÇÃO DOS CICLOS ---
 
 # 1. Tenta processar a fila a cada 30 segundos
-schedule.every(30).seconds.do(processar_fila_de_postagem)
+schedule.every(30).seconds.do(perfilar_job(processar_fila_de_postagem))
+
+# 2. Enfileira os slots vencidos (a cada minuto: o atraso máximo de um post agendado)
+schedule.every(1).minutes.do(perfilar_job(check_and_enqueue_auto_posts))
+schedule.every(10).minutes.do(perfilar_job(planejar_horarios))
+
+# 3. Limpeza diária dos traces de publicação e dos jobs em segundo plano
+schedule.every().day.at("03:30").do(perfilar_job(limpar_traces))
+schedule.every(10).minutes.do(perfilar_job(limpar_jobs_antigos))
+
+# 4. Rollup das estatísticas do painel admin (só os dias abertos)
+schedule.every(1).minutes.do(perfilar_job(atualizar_estatisticas))
 
-# 2. Tenta agendar novos posts a cada 5 minutos (evita duplicatas no mesmo minuto)
-schedule.every(2).minutes.do(check_and_enqueue_auto_posts)
+# 5. Índices do Radar que ainda não existem
+schedule.every(10).minutes.do(perfilar_job(indexar_radar))
 
 if __name__ == "__main__":
     logging.info("=== 🤖 SISTEMA DE AUTOMAÇÃO AUTOBLOG INICIADO ===")
+    iniciar_workers()
     
     # Roda uma verificação inicial ao ligar
+    planejar_horarios()
     check_and_enqueue_auto_posts()
     
     try:
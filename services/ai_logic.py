@@ -1,28 +1,33 @@
-import os
-from groq import Groq
 from dotenv import load_dotenv
 from models import CapturedContent, ContentSource, db
 from services.scraper_service import extrair_texto_da_url
+from services.radar_index_service import buscar_insights_relevantes, reconstruir_indice_blog
+from services.credit_service import contexto_uso
+from services.token_service import truncar_por_tokens, RADAR_CONTEXT_TOKENS
+from services.ai_service import groq_chat_completion
 
 load_dotenv()
-def get_groq_client():
-    return Groq(api_key=os.environ.get("GROQ_API_KEY"))
 
-def preparar_contexto_brainstorm(site):
-    """Lê a memória do Radar para injetar no Gerador de Ideias."""
+def preparar_contexto_brainstorm(site, consulta=None, k=5):
+    """Lê a memória do Radar para injetar no Gerador de Ideias.
+
+    Busca no índice vetorial do blog os k insights mais próximos da consulta
+    (por padrão, os temas do blog). Sem índice ou sem match, usa os mais recentes.
+    """
     contexto = f"Temas principais do blog: {site.macro_themes}\n"
     
-    # Busca capturas vinculadas ao site através da fonte
-    conteudos_recentes = CapturedContent.query.join(ContentSource).filter(
-        ContentSource.blog_id == site.id
-    ).order_by(CapturedContent.created_at.desc()).limit(5).all()
+    conteudos = buscar_insights_relevantes(site.id, consulta or site.macro_themes, k)
+    if not conteudos:
+        conteudos = CapturedContent.query.join(ContentSource).filter(
+            ContentSource.blog_id == site.id
+        ).order_by(CapturedContent.created_at.desc()).limit(k).all()
     
-    if conteudos_recentes:
-        contexto += "\nTendências recentes detectadas no Radar para inspiração:\n"
-        for item in conteudos_recentes:
+    if conteudos:
+        contexto += "\nTendências detectadas no Radar para inspiração:\n"
+        for item in conteudos:
             # Tenta pegar o título ou usa um fallback
             titulo = item.title if item.title else "Conteúdo Recente"
-            contexto += f"- {titulo}: {item.summary[:200]}...\n"
+            contexto += f"- {titulo}: {(item.content_summary or '')[:200]}...\n"
             
     return contexto
 
@@ -30,6 +35,7 @@ def processar_radar_automatico():
     """Motor de captura automática acionado pelo Scheduler."""
     # Buscamos todas as fontes cadastradas
     fontes = ContentSource.query.all()
+    blogs_atualizados = set()
     
     for fonte in fontes:
         try:
@@ -37,15 +43,13 @@ def processar_radar_automatico():
             conteudo_bruto = extrair_texto_da_url(fonte.source_url)
             
             if conteudo_bruto:
-                # IA processa o resumo
-                groq_client = get_groq_client()
-                completion = groq_client.chat.completions.create(
-                    model="llama-3.1-70b-specdec",
-                    messages=[
+                # IA processa o resumo (custo atribuído ao dono do blog)
+                contexto = truncar_por_tokens(conteudo_bruto, RADAR_CONTEXT_TOKENS)
+                with contexto_uso(fonte.blog.user_id, "Radar Automático"):
+                    completion = groq_chat_completion("resumo", [
                         {"role": "system", "content": "Você é um analista de conteúdo. Resuma o texto em 3 tópicos curtos e identifique se é Educativo, Notícia ou Venda."},
-                        {"role": "user", "content": conteudo_bruto[:4000]}
-                    ]
-                )
+                        {"role": "user", "content": contexto}
+                    ])
                 
                 resumo = completion.choices[0].message.content
                 
@@ -55,10 +59,10 @@ def processar_radar_automatico():
                     site_id=fonte.blog_id, # Importante para o vínculo com o site
                     url=fonte.source_url,
                     title=f"Captura Automática: {fonte.source_url.split('/')[-1]}",
-                    summary=resumo,
-                    analysis="Processado via Scheduler"
+                    content_summary=resumo
                 )
                 db.session.add(nova_captura)
+                blogs_atualizados.add(fonte.blog_id)
                 print(f"Sucesso ao processar: {fonte.source_url}")
             
             # Commit por fonte para evitar perda de progresso se uma falhar
@@ -66,4 +70,10 @@ def processar_radar_automatico():
             
         except Exception as e:
             db.session.rollback()
-            print(f"Erro ao processar {fonte.source_url}: {e}")
\ No newline at end of file
+            print(f"Erro ao processar {fonte.source_url}: {e}")
+
+    for blog_id in blogs_atualizados:
+        try:
+            reconstruir_indice_blog(blog_id)
+        except Exception as e:
+            print(f"Erro ao reindexar Radar do blog {blog_id}: {e}")
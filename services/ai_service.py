@@ -1,38 +1,147 @@
 import os
+import re
+import threading
+from groq import Groq
 from langchain_groq import ChatGroq
+from pydantic import BaseModel, Field, ValidationError
 from dotenv import load_dotenv
 from flask_login import current_user
+from services.credit_service import registrar_uso, registrar_uso_completion
+from services.token_service import preparar_prompt, contar_tokens, registrar_tamanho_prompt
+from services.model_router_service import executar_com_failover
+from services.metrics_service import STRUCTURED_OUTPUT_TOTAL
 
 load_dotenv()
 
-def generate_text(prompt, system_prompt="Você é um assistente especialista em SEO.", quick=False):
+def _conta_demo():
+    return hasattr(current_user, 'email') and current_user.email == "demo@wpautoblog.com"
+
+def generate_text(prompt, system_prompt="Você é um assistente especialista em SEO.", quick=False, json_mode=False, task=None):
     # TRAVA DE SEGURANÇA PARA CONTA DEMO
-    if hasattr(current_user, 'email') and current_user.email == "demo@wpautoblog.com":
+    if _conta_demo():
         return "Este é um exemplo de texto gerado automaticamente pela IA para o usuário de demonstração."
-    
-    # Busca os novos nomes de variáveis do seu .env otimizado
-    model_name = os.environ.get("GROQ_MODEL_QUICK") if quick else os.environ.get("GROQ_MODEL_MAIN")
-    
-    if not model_name:
-        print("❌ Erro: Modelo Groq não configurado no .env")
-        return None
 
-    llm = ChatGroq(
-        temperature=0.7,
-        model_name=model_name,
-        groq_api_key=os.environ.get("GROQ_API_KEY")
-    )
-    
-    try:
-        response = llm.invoke([
+    # O roteador escolhe o modelo pela tarefa (quick=True mantém o comportamento antigo)
+    task = task or ("titulos" if quick else "artigo")
+
+    # JSON mode da Groq: o modelo é obrigado a responder um objeto JSON válido
+    model_kwargs = {"response_format": {"type": "json_object"}} if json_mode else {}
+
+    def _chamar(model_name, timeout):
+        llm = ChatGroq(
+            temperature=0.7,
+            model_name=model_name,
+            groq_api_key=os.environ.get("GROQ_API_KEY"),
+            model_kwargs=model_kwargs,
+            timeout=timeout,
+            max_retries=0  # Quem tenta de novo é o roteador, em outro modelo
+        )
+        # Orçamento de tokens: apara o prompt se não couber na janela do modelo
+        prompt_final, _ = preparar_prompt(prompt, system_prompt, model_name)
+        return llm.invoke([
             ("system", system_prompt),
-            ("user", prompt)
+            ("user", prompt_final)
         ])
+
+    try:
+        response, model_name = executar_com_failover(task, _chamar)
+        usage = getattr(response, "usage_metadata", None) or {}
+        registrar_uso(
+            "Groq",
+            model=model_name,
+            prompt_tokens=usage.get("input_tokens", 0),
+            completion_tokens=usage.get("output_tokens", 0)
+        )
         return response.content
     except Exception as e:
         print(f"❌ Erro LangChain/Groq: {e}")
         return None
 
+_groq_client = None
+_groq_lock = threading.Lock()
+
+def get_groq_client():
+    # Workers com threads: sem o lock, duas primeiras chamadas simultâneas criariam dois clientes
+    global _groq_client
+    if _groq_client is None:
+        with _groq_lock:
+            if _groq_client is None:
+                _groq_client = Groq(api_key=os.environ.get("GROQ_API_KEY"), max_retries=0)
+    return _groq_client
+
+def groq_chat_completion(task, messages, **kwargs):
+    """Chamada direta ao SDK da Groq passando pelo roteador de modelos (com failover)."""
+    def _chamar(model_name, timeout):
+        registrar_tamanho_prompt(model_name, sum(contar_tokens(m["content"], model_name) for m in messages))
+        return get_groq_client().chat.completions.create(
+            model=model_name, messages=messages, timeout=timeout, **kwargs
+        )
+
+    completion, model_name = executar_com_failover(task, _chamar)
+    registrar_uso_completion("Groq", completion, model=model_name)
+    return completion
+
 def criar_prompt_visual(titulo_post):
     prompt = f"Descreva uma cena fotográfica realista para o post: {titulo_post}. Sem textos."
-    return generate_text(prompt, system_prompt="Você é um diretor de arte.", quick=True)
\ No newline at end of file
+    return generate_text(prompt, system_prompt="Você é um diretor de arte.", task="prompt_visual")
+
+# --- SAÍDA ESTRUTURADA (JSON + PYDANTIC) ---
+
+class IdeiasSchema(BaseModel):
+    titulos: list[str] = Field(description="Lista de títulos de posts, sem numeração nem aspas")
+
+class TituloSchema(BaseModel):
+    titulo: str = Field(description="Título do post, sem aspas")
+
+class ReescritaSchema(BaseModel):
+    title: str = Field(description="Novo título do artigo")
+    content: str = Field(description="Novo conteúdo do artigo em HTML simples")
+
+def _contar(schema, resultado):
+    STRUCTURED_OUTPUT_TOTAL.labels(schema=schema.__name__, result=resultado).inc()
+
+def _extrair_json(texto):
+    """Remove cercas de markdown e texto extra em volta do objeto JSON."""
+    texto = re.sub(r"^```(?:json)?|```$", "", (texto or "").strip(), flags=re.MULTILINE).strip()
+    inicio, fim = texto.find("{"), texto.rfind("}")
+    return texto[inicio:fim + 1] if inicio != -1 and fim > inicio else texto
+
+def generate_structured(prompt, schema, system_prompt="Você é um assistente especialista em SEO.", quick=False, max_repairs=1, task=None):
+    """
+    Pede à IA uma resposta no formato do schema (pydantic) e devolve o objeto validado.
+    Só faz nova chamada (prompt de reparo) quando o JSON vier inválido.
+    Retorna None se nem o reparo resolver (ou para a conta demo, que não chama a IA).
+    """
+    # O texto fixo da conta demo não é JSON: sem isso gastaria uma chamada de reparo à toa
+    if _conta_demo():
+        return None
+
+    schema_json = schema.model_json_schema()
+    system = (
+        f"{system_prompt}\n"
+        f"Responda SOMENTE com um objeto JSON válido que siga este JSON Schema: {schema_json}"
+    )
+
+    resposta = generate_text(prompt, system_prompt=system, quick=quick, json_mode=True, task=task)
+    for tentativa in range(max_repairs + 1):
+        if resposta is None:
+            break
+        try:
+            resultado = schema.model_validate_json(_extrair_json(resposta))
+            _contar(schema, "repaired" if tentativa else "ok")
+            return resultado
+        except ValidationError as e:
+            if tentativa == max_repairs:
+                break
+            print(f"⚠️ Saída da IA fora do schema {schema.__name__}, pedindo reparo...")
+            reparo = (
+                f"A resposta abaixo não segue o JSON Schema pedido.\n"
+                f"Erros: {e.errors(include_url=False)}\n"
+                f"Resposta original:\n{resposta}\n\n"
+                f"Corrija e devolva apenas o JSON válido."
+            )
+            resposta = generate_text(reparo, system_prompt=system, quick=quick, json_mode=True, task=task)
+
+    _contar(schema, "failed")
+    print(f"❌ Não foi possível obter JSON válido para {schema.__name__}")
+    return None
@@ -1,16 +1,22 @@
 import requests
 from requests.auth import HTTPBasicAuth
-from models import db, ContentIdea, PostLog, Blog, CapturedContent, ApiUsage
-from services.ai_service import generate_text
+from models import db, ContentIdea, PostLog, Blog, CapturedContent, ApiUsage, sem_textos_longos
+from services.ai_service import generate_text, generate_structured, groq_chat_completion, IdeiasSchema, TituloSchema, ReescritaSchema
+from services.credit_service import contexto_uso
+from services.token_service import truncar_por_tokens, RADAR_CONTEXT_TOKENS, SPY_CONTEXT_TOKENS
 from services.scraper_service import extrair_texto_da_url
+from services.ai_logic import preparar_contexto_brainstorm
+from services.radar_index_service import buscar_insights_relevantes, reconstruir_indice_blog
+from services.metrics_service import medir_etapa, contar_chamada, RADAR_FETCH_SECONDS
+from services.trace_service import iniciar_trace, span
+from services.pagination_service import paginar
+import time
 import os
 from datetime import datetime, date
 from dotenv import load_dotenv
-from groq import Groq
 from bs4 import BeautifulSoup
 
 load_dotenv()
-model_name = os.environ.get("GROQ_MODEL_QUICK", "llama-3.3-70b-versatile")
 
 # Proteção para serviços de imagem
 try:
@@ -19,39 +25,39 @@ except ImportError:
     processar_imagem_featured = None
     upload_manual_image = None
 
-def get_groq_client():
-    return Groq(api_key=os.environ.get("GROQ_API_KEY"))
-
 # --- BUSCAS E RELATÓRIOS ---
-def get_filtered_ideas(user_id, site_id=None):
-    query = ContentIdea.query.join(Blog).filter(Blog.user_id == user_id, ContentIdea.is_posted == False)
+def get_filtered_ideas(user_id, site_id=None, cursor=None, per_page=None):
+    """Ideias ainda não postadas, mais novas primeiro, uma página por vez."""
+    query = ContentIdea.query.join(Blog).filter(Blog.user_id == user_id, ContentIdea.is_posted == False)\
+        .options(*sem_textos_longos(ContentIdea))
     if site_id:
         query = query.filter(ContentIdea.blog_id == site_id)
-    return query.order_by(ContentIdea.created_at.desc()).all()
+    return paginar(query, ContentIdea.created_at, ContentIdea.id, cursor=cursor, per_page=per_page)
 
-def get_post_reports(user_id, site_id=None):
-    query = PostLog.query.join(Blog).filter(Blog.user_id == user_id)
+def get_post_reports(user_id, site_id=None, cursor=None, per_page=None):
+    """Histórico de posts, mais recentes primeiro, uma página por vez."""
+    query = PostLog.query.join(Blog).filter(Blog.user_id == user_id).options(*sem_textos_longos(PostLog))
     if site_id:
         query = query.filter(PostLog.blog_id == site_id)
-    return query.order_by(PostLog.posted_at.desc()).all()
+    return paginar(query, PostLog.posted_at, PostLog.id, cursor=cursor, per_page=per_page)
 
 # --- FLUXO DO RADAR (INSIGHTS) ---
 def sync_sources_logic(fontes, scraper_func):
     """Extrai conteúdo das fontes e gera insights analíticos."""
-    groq_client = get_groq_client()
     contador = 0
+    blogs_atualizados = set()
     
     for fonte in fontes:
+        inicio = time.perf_counter()
         texto_real = scraper_func(fonte.source_url)
+        RADAR_FETCH_SECONDS.labels(result="ok" if texto_real else "empty").observe(time.perf_counter() - inicio)
         if texto_real:
             try:
-                response = groq_client.chat.completions.create(
-                    model=model_name,
-                    messages=[
-                        {"role": "system", "content": "Analise o texto e extraia os 3 pontos mais importantes para um post. Responda em texto simples."},
-                        {"role": "user", "content": texto_real[:4000]}
-                    ]
-                )
+                contexto = truncar_por_tokens(texto_real, RADAR_CONTEXT_TOKENS)
+                response = groq_chat_completion("resumo", [
+                    {"role": "system", "content": "Analise o texto e extraia os 3 pontos mais importantes para um post. Responda em texto simples."},
+                    {"role": "user", "content": contexto}
+                ])
                 
                 nova_captura = CapturedContent(
                     source_id=fonte.id, 
@@ -61,30 +67,32 @@ def sync_sources_logic(fontes, scraper_func):
                     content_summary=response.choices[0].message.content
                 )
                 db.session.add(nova_captura)
+                blogs_atualizados.add(fonte.blog_id)
                 contador += 1
             except Exception as e:
                 print(f"Erro no Radar para {fonte.source_url}: {e}")
     
     db.session.commit()
+
+    # Mantém o índice vetorial do Radar em dia para o Brainstorm e os artigos
+    for blog_id in blogs_atualizados:
+        try:
+            reconstruir_indice_blog(blog_id)
+        except Exception as e:
+            print(f"Erro ao reindexar Radar do blog {blog_id}: {e}")
     return contador
 
 def convert_radar_insight_to_idea(insight_id):
     """Ponte: Transforma Insight em Título SEO + Contexto para a Fila."""
     insight = CapturedContent.query.get_or_404(insight_id)
-    groq_client = get_groq_client()
 
-    prompt = (
-        f"Transforme este resumo em um título de post atraente e SEO: '{insight.content_summary}'. "
-        "Retorne apenas o título, sem aspas."
-    )
+    prompt = f"Transforme este resumo em um título de post atraente e SEO: '{insight.content_summary}'."
 
     try:
-        res = groq_client.chat.completions.create(
-            model=model_name,
-            messages=[{"role": "user", "content": prompt}],
-            temperature=0.8
-        )
-        titulo_gerado = res.choices[0].message.content.strip().replace('"', '')
+        resultado = generate_structured(prompt, TituloSchema, task="titulos")
+        if not resultado or not resultado.titulo.strip():
+            return False
+        titulo_gerado = resultado.titulo.strip()
 
         nova_ideia = ContentIdea(
             title=titulo_gerado,
@@ -110,14 +118,14 @@ def _gerar_texto_do_artigo(idea):
     else:
         prompt = f"Escreva um artigo de blog completo sobre: {idea.title}"
     
-    return generate_text(prompt)
+    return generate_text(prompt, task="artigo")
 
 def _obter_imagem_destacada(idea):
     """Subfunção 2: Cuida apenas da lógica de imagem."""
     wp_image_id = idea.featured_image_id
     if not wp_image_id and processar_imagem_featured:
         auth = HTTPBasicAuth(idea.blog.wp_user, idea.blog.wp_app_password)
-        wp_image_id = processar_imagem_featured(idea.title, idea.blog.wp_url, auth)
+        wp_image_id = processar_imagem_featured(idea.title, idea.blog.wp_url, auth, blog_id=idea.blog_id)
     return wp_image_id
 
 def publish_content_flow(idea, user):
@@ -210,7 +218,7 @@ def process_manual_post(user, site_id, title, content, action, image_file=None):
 
 # --- 1. SUBFUNÇÕES DE APOIO (ATOMICIDADE) ---
 
-def gerar_conteudo_ia(titulo, contexto=None):
+def gerar_conteudo_ia(titulo, contexto=None, blog_id=None):
     """Responsabilidade: Apenas conversar com a IA e retornar o texto."""
     if contexto:
         prompt = (
@@ -220,9 +228,16 @@ def gerar_conteudo_ia(titulo, contexto=None):
     else:
         prompt = f"Escreva um artigo de blog completo sobre: {titulo}"
 
+    # Insights do Radar mais próximos do título, quando o blog tiver índice
+    if blog_id:
+        relevantes = buscar_insights_relevantes(blog_id, titulo, k=3)
+        if relevantes:
+            prompt += "\n\nReferências recentes do Radar (use se fizerem sentido):\n"
+            prompt += "\n".join(f"- {(c.content_summary or '')[:300]}" for c in relevantes)
+
     try:
         # Chama a sua função de serviço de IA existente
-        conteudo = generate_text(prompt)
+        conteudo = generate_text(prompt, task="artigo")
         return conteudo
     except Exception as e:
         print(f">>> [ERRO IA] Falha ao gerar texto: {e}")
@@ -234,7 +249,7 @@ def preparar_imagem_post(idea):
     if not wp_image_id and processar_imagem_featured:
         try:
             auth = HTTPBasicAuth(idea.blog.wp_user, idea.blog.wp_app_password)
-            wp_image_id = processar_imagem_featured(idea.title, idea.blog.wp_url, auth)
+            wp_image_id = processar_imagem_featured(idea.title, idea.blog.wp_url, auth, blog_id=idea.blog_id)
         except Exception as e:
             print(f">>> [AVISO IMAGEM] Falha ao processar imagem: {e}")
     return wp_image_id
@@ -261,17 +276,37 @@ def publish_content_flow(idea, user_id):
     if getattr(user_id, 'is_demo', False):
         return True, "Modo Demo ativo."
 
-    # PASSO 1: Geração de Texto
-    conteudo_post = gerar_conteudo_ia(idea.title, idea.context_insight)
+    # Todo uso de IA/imagem daqui em diante é atribuído a este post,
+    # e cada etapa vira um span no trace da ideia (ver /admin/traces)
+    with contexto_uso(idea.blog.user_id, "Post-IA", idea_id=idea.id), iniciar_trace(idea.id):
+        with span("publish", info=idea.title[:100]) as s:
+            sucesso, mensagem = _executar_publicacao(idea, user_id)
+            if not sucesso:
+                s["status"], s["info"] = "error", mensagem
+            return sucesso, mensagem
+
+def _executar_publicacao(idea, user_id):
+    """Etapas do fluxo de publicação (texto, imagem e envio ao WordPress)."""
+
+    # PASSO 1: Geração de Texto (já feita se a ideia foi pré-gerada, ver pregen_service)
+    conteudo_post = idea.full_content if idea.prepared_at else None
+    if not conteudo_post:
+        with medir_etapa("llm"), span("llm.artigo") as s:
+            conteudo_post = gerar_conteudo_ia(idea.title, idea.context_insight, blog_id=idea.blog_id)
+            if not conteudo_post:
+                s["status"] = "error"
     if not conteudo_post:
         return False, "Erro: A IA não conseguiu gerar o texto."
 
     # PASSO 2: Imagem Destacada
-    wp_image_id = preparar_imagem_post(idea)
+    with medir_etapa("image"), span("image") as s:
+        wp_image_id = preparar_imagem_post(idea)
+        s["info"] = f"media_id={wp_image_id}"
 
     # PASSO 3: Envio ao WordPress
     try:
-        response = _send_to_wp(idea.blog, idea.title, conteudo_post, wp_image_id)
+        with medir_etapa("wordpress"):
+            response = _send_to_wp(idea.blog, idea.title, conteudo_post, wp_image_id)
         
         if response and response.status_code in [200, 201]:
             data = response.json()
@@ -295,23 +330,20 @@ def generate_ideas_logic(blog):
         print("❌ Erro: Objeto Blog inválido passado para o serviço.")
         return 0
 
-    client = get_groq_client()
-    
-    # Prompt usando os dados do blog validado
+    # Prompt usando os dados do blog validado + insights relevantes do Radar
+    contexto = preparar_contexto_brainstorm(blog)
     prompt = f"""
     Como um estrategista de conteúdo para o site {blog.site_name}, 
-    gere 5 títulos de posts originais baseados nestes temas: {blog.macro_themes}.
-    Retorne apenas os títulos, um por linha sem numerações ou marcações: apenas os títulos.
+    gere 5 títulos de posts originais baseados neste contexto:
+    {contexto}
+    Os títulos devem vir sem numerações, aspas ou marcações.
     """
 
     try:
-        response = client.chat.completions.create(
-            messages=[{"role": "user", "content": prompt}],
-            model=model_name,
-        )
-        
-        raw_output = response.choices[0].message.content.strip()
-        titulos = [t.strip() for t in raw_output.split('\n') if t.strip()]
+        resultado = generate_structured(prompt, IdeiasSchema, task="titulos")
+        if not resultado:
+            return 0
+        titulos = [t.strip() for t in resultado.titulos if t.strip()]
         
         count = 0
         for t in titulos:
@@ -363,24 +395,12 @@ def analyze_spy_link(url, is_demo=False):
     if not raw_content:
         return None
 
-    # --- INTEGRAÇÃO COM IA (ai_service.py) ---
-    # Criamos um prompt para a IA reescrever o conteúdo
-    prompt_ia = f"Reescreva o seguinte artigo de forma original e otimizada para SEO:\n\nTítulo: {raw_title}\nConteúdo: {raw_content}"
-    
-    # Usamos a função do seu ficheiro ai_service.py
-    reescrita = generate_text(
-        prompt=prompt_ia, 
-        system_prompt="Você é um redator experiente. Transforme o conteúdo fornecido em um post de blog único em português.",
-        quick=False
-    )
-
-    if not reescrita:
-        return {"title": raw_title, "content": raw_content} # Fallback se a IA falhar
+    # Limita o artigo ao orçamento de tokens do Spy Writer (corte no fim de frase)
+    raw_content = truncar_por_tokens(raw_content, SPY_CONTEXT_TOKENS)
 
-    return {
-        "title": raw_title, 
-        "content": reescrita
-    }
+    # --- INTEGRAÇÃO COM IA (ai_service.py) ---
+    # Reescrita estruturada: novo título + conteúdo (fallback para o original se a IA falhar)
+    return rephrase_content_with_ai(raw_title, raw_content)
 
 def rephrase_content_with_ai(title, content):
     """
@@ -394,21 +414,21 @@ def rephrase_content_with_ai(title, content):
     
     Título Original: {title}
     Conteúdo: {content}
-    
-    Retorne apenas o novo Título e o novo Conteúdo.
     """
     
     try:
-        # Aqui entra a sua lógica atual de chamada à Groq
-        # chat_completion = client.chat.completions.create(...)
-        
-        # Simulação de retorno da IA
-        new_title = f"[REESCRITO] {title}"
-        new_content = f"Este é o conteúdo processado pela IA baseado no original...\n\n{content[:200]}..." 
-        
+        resultado = generate_structured(
+            prompt,
+            ReescritaSchema,
+            task="reescrita",
+            system_prompt="Você é um redator experiente. Transforme o conteúdo fornecido em um post de blog único em português."
+        )
+        if not resultado:
+            return {"title": title, "content": content}
+
         return {
-            "title": new_title,
-            "content": new_content
+            "title": resultado.title.strip() or title,
+            "content": resultado.content
         }
     except Exception as e:
         print(f"Erro na IA: {e}")
@@ -422,44 +442,14 @@ def _send_to_wp(blog, titulo, conteudo, id_img, status=None):
     auth = HTTPBasicAuth(blog.wp_user, blog.wp_app_password)
     try:
         url = f"{blog.wp_url.rstrip('/')}/wp-json/wp/v2/posts"
-        return requests.post(url, auth=auth, json=payload, timeout=30)
+        with span("wordpress.post") as s:
+            response = requests.post(url, auth=auth, json=payload, timeout=30)
+            s["info"] = f"HTTP {response.status_code}"
+            if response.status_code >= 400:
+                s["status"] = "error"
+        contar_chamada("wordpress", status_code=response.status_code)
+        return response
     except Exception as e:
+        contar_chamada("wordpress", erro=e)
         print(f"Erro na requisição WP: {e}")
         return None
-    
-def check_and_enqueue_auto_posts():
-    """
-    Varre todos os blogs e move ideias de 'draft' para 'pending' 
-    conforme o cronograma de cada usuário.
-    """
-    with app.app_context():
-        hoje = date.today()
-        agora_hora = datetime.now().strftime("%H:%M")
-        
-        blogs = Blog.query.all()
-        for blog in blogs:
-            # 1. Verifica se é o horário de postagem (ou se já passou e não postou hoje)
-            # Simplificação: Se o horário atual for igual ou maior que o agendado
-            if agora_hora >= blog.schedule_time:
-                
-                # 2. Verifica quantos posts já foram feitos/agendados hoje para este blog
-                posts_hoje = ContentIdea.query.filter(
-                    ContentIdea.blog_id == blog.id,
-                    db.func.date(ContentIdea.created_at) == hoje,
-                    ContentIdea.status.in_(['pending', 'completed'])
-                ).count()
-
-                if posts_hoje < blog.posts_per_day:
-                    # 3. Busca a próxima ideia na fila de rascunhos
-                    proxima_ideia = ContentIdea.query.filter_by(
-                        blog_id=blog.id, 
-                        status='draft',
-                        is_posted=False
-                    ).order_by(ContentIdea.created_at.asc()).first()
-
-                    if proxima_ideia:
-                        print(f"🤖 Automação: Movendo '{proxima_ideia.title}' para a fila (Blog: {blog.site_name})")
-                        proxima_ideia.status = 'pending'
-                        # Atualiza a data de criação para 'hoje' para o controle de limite diário
-                        proxima_ideia.created_at = datetime.now() 
-                        db.session.commit()
\ No newline at end of file
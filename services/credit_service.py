@@ -1,48 +1,188 @@
 # services/credit_service.py
-from models import db, User, ApiUsage
+import os
+import time
+import atexit
+import threading
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import datetime
+from sqlalchemy.orm.attributes import set_committed_value
+from models import db, User, ApiUsage, CreditTransaction
 
-def adicionar_creditos(user_id, quantidade):
+# --- CONTABILIDADE DE USO DE API (BUFFER EM MEMÓRIA) ---
+# As linhas de ApiUsage são acumuladas aqui e gravadas em lote por uma thread
+# de fundo, para não fazer um commit síncrono a cada chamada de IA.
+USAGE_FLUSH_INTERVAL = int(os.environ.get("USAGE_FLUSH_INTERVAL", 30))  # segundos
+USAGE_FLUSH_MAX = int(os.environ.get("USAGE_FLUSH_MAX", 500))  # válvula de segurança
+
+_usage_buffer = []
+_usage_lock = threading.Lock()
+_flusher_started = False
+
+# Quem está consumindo (usuário, feature, ideia) no fluxo atual
+_usage_context = ContextVar("usage_context", default=None)
+
+# --- CARTEIRA DE CRÉDITOS (LEDGER) ---
+# O saldo é alterado só no banco, num único UPDATE condicional com RETURNING:
+# dois requests (ou workers) concorrentes nunca passam juntos pela checagem
+# de saldo. Cada movimentação vira uma linha em CreditTransaction (auditoria).
+
+def movimentar_creditos(user, quantidade, motivo, ref=None):
+    """
+    Aplica +quantidade (crédito) ou -quantidade (débito) ao saldo.
+    Débitos só acontecem se houver saldo. Devolve o novo saldo ou None
+    (saldo insuficiente / usuário inexistente). Faz commit da sessão.
+    `user` pode ser o objeto User ou o id.
+    """
+    user_id = user if isinstance(user, int) else user.id
+    tabela = User.__table__
+
+    stmt = tabela.update().where(tabela.c.id == user_id)
+    if quantidade < 0:
+        stmt = stmt.where(tabela.c.credits >= -quantidade)
+    stmt = stmt.values(credits=tabela.c.credits + quantidade).returning(tabela.c.credits)
+
+    saldo = db.session.execute(stmt).scalar()
+    if saldo is None:
+        return None
+
+    db.session.execute(CreditTransaction.__table__.insert().values(
+        user_id=user_id, amount=quantidade, balance_after=saldo,
+        reason=motivo[:50], ref=str(ref)[:100] if ref is not None else None,
+        created_at=datetime.utcnow()
+    ))
+    db.session.commit()
+
+    # Mantém o objeto em memória com o saldo certo sem novo SELECT
+    if not isinstance(user, int):
+        set_committed_value(user, "credits", saldo)
+    return saldo
+
+def estornar_creditos(user, quantidade, motivo, ref=None):
+    """Devolve créditos de uma operação que falhou (registrado como 'estorno: <motivo>')."""
+    return movimentar_creditos(user, abs(quantidade), f"estorno: {motivo}", ref)
+
+def adicionar_creditos(user_id, quantidade, motivo="credito", ref=None):
     """Soma créditos ao saldo do usuário."""
     try:
-        user = User.query.get(user_id)
-        if not user:
+        saldo = movimentar_creditos(user_id, quantidade, motivo, ref)
+        if saldo is None:
             return False, "Usuário não encontrado"
-            
-        user.credits += quantidade
-        db.session.commit()
-        print(f">>> [CREDITO] +{quantidade} para {user.name}. Novo saldo: {user.credits}")
+        print(f">>> [CREDITO] +{quantidade} para usuário {user_id}. Novo saldo: {saldo}")
         return True, None
     except Exception as e:
         db.session.rollback()
         return False, str(e)
 
-def debitar_creditos(user_id, quantidade):
-    """Valida e subtrai créditos do saldo do usuário."""
+def debitar_creditos(user_id, quantidade, motivo="debito", ref=None):
+    """Valida e subtrai créditos do saldo do usuário (atômico)."""
     try:
-        user = User.query.get(user_id)
-        if not user:
-            return False, "Usuário não encontrado"
-            
-        if user.credits < quantidade:
-            return False, f"Saldo insuficiente. Disponível: {user.credits}"
-            
-        user.credits -= quantidade
-        db.session.commit()
-        print(f">>> [DEBITO] -{quantidade} de {user.name}. Restante: {user.credits}")
+        saldo = movimentar_creditos(user_id, -quantidade, motivo, ref)
+        if saldo is None:
+            # Só no caminho de erro buscamos o saldo (do banco) para a mensagem
+            disponivel = db.session.execute(db.select(User.credits).where(User.id == user_id)).scalar()
+            if disponivel is None:
+                return False, "Usuário não encontrado"
+            return False, f"Saldo insuficiente. Disponível: {disponivel}"
+        print(f">>> [DEBITO] -{quantidade} de usuário {user_id}. Restante: {saldo}")
         return True, None
     except Exception as e:
         db.session.rollback()
         return False, str(e)
     
-def log_api_usage(user_id, api_name, feature, tokens=0):
+@contextmanager
+def contexto_uso(user_id, feature, idea_id=None):
+    """Define a quem serão atribuídas as chamadas de API feitas dentro do bloco."""
+    token = _usage_context.set({"user_id": user_id, "feature": feature, "idea_id": idea_id})
     try:
-        usage = ApiUsage(
-            user_id=user_id,
-            api_name=api_name,
-            feature=feature,
-            tokens_used=tokens
-        )
-        db.session.add(usage)
-        db.session.commit()
+        yield
+    finally:
+        _usage_context.reset(token)
+
+def registrar_uso(api_name, model=None, prompt_tokens=0, completion_tokens=0, images=0,
+                  user_id=None, feature=None, idea_id=None):
+    """Enfileira o uso real de uma chamada (tokens/imagens) para gravação em lote."""
+    ctx = _usage_context.get() or {}
+    user_id = user_id or ctx.get("user_id")
+    if not user_id:
+        try:
+            from flask_login import current_user
+            user_id = current_user.id if current_user.is_authenticated else None
+        except Exception:
+            user_id = None
+    if not user_id:
+        return  # Chamada sem dono (ex.: script manual): não há a quem cobrar
+
+    prompt_tokens = prompt_tokens or 0
+    completion_tokens = completion_tokens or 0
+    linha = {
+        "user_id": user_id,
+        "api_name": api_name,
+        "feature": feature or ctx.get("feature") or "Outros",
+        "model": model,
+        "prompt_tokens": prompt_tokens,
+        "completion_tokens": completion_tokens,
+        "tokens_used": prompt_tokens + completion_tokens,
+        "images": images or 0,
+        "idea_id": idea_id or ctx.get("idea_id"),
+        "created_at": datetime.utcnow(),
+    }
+    with _usage_lock:
+        _usage_buffer.append(linha)
+        cheio = len(_usage_buffer) >= USAGE_FLUSH_MAX
+    if cheio:
+        flush_api_usage()
+
+def registrar_uso_completion(api_name, completion, model=None, **kwargs):
+    """Extrai o campo `usage` de uma resposta do SDK Groq/OpenAI."""
+    usage = getattr(completion, "usage", None)
+    registrar_uso(
+        api_name,
+        model=model or getattr(completion, "model", None),
+        prompt_tokens=getattr(usage, "prompt_tokens", 0),
+        completion_tokens=getattr(usage, "completion_tokens", 0),
+        **kwargs
+    )
+
+def flush_api_usage():
+    """Grava todo o buffer numa única inserção em lote. Requer app context."""
+    with _usage_lock:
+        if not _usage_buffer:
+            return 0
+        lote = _usage_buffer[:]
+        _usage_buffer.clear()
+
+    try:
+        # Conexão própria: não mistura com a sessão/transação do request atual
+        with db.engine.begin() as conn:
+            conn.execute(ApiUsage.__table__.insert(), lote)
+        return len(lote)
     except Exception as e:
-        print(f"Erro ao logar uso de API: {e}")
\ No newline at end of file
+        print(f"Erro ao gravar uso de API em lote: {e}")
+        with _usage_lock:
+            # Devolve ao buffer para tentar no próximo ciclo (sem crescer sem limite)
+            _usage_buffer[:0] = lote[-USAGE_FLUSH_MAX:]
+        return 0
+
+def iniciar_flush_periodico(app):
+    """Sobe (uma vez por processo) a thread que esvazia o buffer periodicamente."""
+    global _flusher_started
+    if _flusher_started:
+        return
+    _flusher_started = True
+
+    def _flush_com_contexto():
+        with app.app_context():
+            flush_api_usage()
+
+    def _loop():
+        while True:
+            time.sleep(USAGE_FLUSH_INTERVAL)
+            _flush_com_contexto()
+
+    threading.Thread(target=_loop, name="api-usage-flusher", daemon=True).start()
+    atexit.register(_flush_com_contexto)
+
+def log_api_usage(user_id, api_name, feature, tokens=0):
+    """Compatibilidade: registra um uso avulso pelo mesmo buffer em lote."""
+    registrar_uso(api_name, prompt_tokens=tokens, user_id=user_id, feature=feature)
@@ -0,0 +1,77 @@
+import os
+import hashlib
+from datetime import datetime, timedelta
+from dotenv import load_dotenv
+from models import db, ImageLibrary
+from services.radar_index_service import _tokenizar
+
+load_dotenv()
+
+# Biblioteca de imagens por blog: antes de pedir uma imagem nova ao DALL-E,
+# procura uma já enviada ao WordPress cujo prompt visual seja quase igual.
+# A comparação usa SimHash (64 bits) dos termos do prompt: prompts parecidos
+# diferem em poucos bits. Cada imagem tem limite de usos e um intervalo
+# mínimo entre usos, para o blog não repetir a mesma capa em sequência.
+IMAGE_REUSE = os.environ.get("IMAGE_REUSE", "true").lower() in ("1", "true", "sim")
+IMAGE_REUSE_MAX_DISTANCE = int(os.environ.get("IMAGE_REUSE_MAX_DISTANCE", 8))   # Bits diferentes (de 64)
+IMAGE_REUSE_MAX_USES = int(os.environ.get("IMAGE_REUSE_MAX_USES", 3))
+IMAGE_REUSE_MIN_DAYS = int(os.environ.get("IMAGE_REUSE_MIN_DAYS", 14))
+IMAGE_REUSE_CANDIDATES = int(os.environ.get("IMAGE_REUSE_CANDIDATES", 500))
+
+def simhash(texto):
+    """Assinatura de 64 bits (com sinal, para caber em BIGINT) dos termos do texto."""
+    pesos = [0] * 64
+    for termo in set(_tokenizar(texto)):
+        h = int.from_bytes(hashlib.blake2b(termo.encode(), digest_size=8).digest(), "big")
+        for bit in range(64):
+            pesos[bit] += 1 if h >> bit & 1 else -1
+    valor = sum(1 << bit for bit in range(64) if pesos[bit] > 0)
+    return valor - (1 << 64) if valor >= 1 << 63 else valor
+
+def distancia(a, b):
+    return bin((a ^ b) & ((1 << 64) - 1)).count("1")
+
+def buscar_reaproveitavel(blog_id, prompt):
+    """
+    Devolve o wp_media_id de uma imagem parecida já usada pelo blog e conta
+    mais um uso, ou None. Requer app context.
+    """
+    if not IMAGE_REUSE or not blog_id:
+        return None
+
+    alvo = simhash(prompt)
+    limite_data = datetime.utcnow() - timedelta(days=IMAGE_REUSE_MIN_DAYS)
+    candidatas = db.session.query(ImageLibrary.id, ImageLibrary.simhash, ImageLibrary.wp_media_id).filter(
+        ImageLibrary.blog_id == blog_id,
+        ImageLibrary.uses < IMAGE_REUSE_MAX_USES,
+        ImageLibrary.last_used_at < limite_data,
+    ).order_by(ImageLibrary.id.desc()).limit(IMAGE_REUSE_CANDIDATES).all()
+
+    proximas = sorted(
+        (distancia(alvo, c.simhash), c.id, c.wp_media_id) for c in candidatas
+    )
+    for dist, lib_id, media_id in proximas:
+        if dist > IMAGE_REUSE_MAX_DISTANCE:
+            break
+        # Reserva atômica: dois posts simultâneos não estouram o limite de usos
+        reservada = db.session.execute(
+            db.update(ImageLibrary)
+            .where(ImageLibrary.id == lib_id, ImageLibrary.uses < IMAGE_REUSE_MAX_USES)
+            .values(uses=ImageLibrary.uses + 1, last_used_at=datetime.utcnow())
+        ).rowcount
+        db.session.commit()
+        if reservada:
+            print(f">>> [IMAGEM] Reaproveitando mídia {media_id} do blog {blog_id} (distância {dist})")
+            return media_id
+    return None
+
+def registrar_imagem(blog_id, prompt, wp_media_id):
+    """Guarda a imagem recém-enviada na biblioteca do blog."""
+    if not blog_id or not wp_media_id:
+        return
+    try:
+        db.session.add(ImageLibrary(blog_id=blog_id, prompt=prompt, simhash=simhash(prompt), wp_media_id=wp_media_id))
+        db.session.commit()
+    except Exception as e:
+        db.session.rollback()
+        print(f">>> [IMAGEM] Falha ao registrar na biblioteca: {e}")
@@ -0,0 +1,143 @@
+import os
+import io
+import sys
+import time
+import tempfile
+import threading
+import subprocess
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Otimização da imagem destacada antes do upload para o WordPress:
+# redimensiona para caber em IMAGE_MAX_WIDTH x IMAGE_MAX_HEIGHT (sem ampliar)
+# e recodifica em WebP ou JPEG otimizado. Decodificar/encodar é CPU pura, então
+# roda em outro processo e não segura o worker web nem o scheduler.
+# O processo é um interpretador novo (python -m services.image_opt_service), não
+# um fork: não herda threads, locks nem conexões do pai e não importa o app nem o
+# scheduler (o multiprocessing com spawn/forkserver reimporta o __main__, que no
+# scheduler é o scheduler.py). Este módulo só depende do Pillow.
+try:
+    from PIL import Image, ImageOps
+except ImportError:  # Sem Pillow a imagem segue sem otimização
+    Image = None
+
+IMAGE_OPTIMIZE = os.environ.get("IMAGE_OPTIMIZE", "true").lower() in ("1", "true", "sim")
+IMAGE_MAX_WIDTH = int(os.environ.get("IMAGE_MAX_WIDTH", 1200))
+IMAGE_MAX_HEIGHT = int(os.environ.get("IMAGE_MAX_HEIGHT", 800))
+IMAGE_FORMAT = os.environ.get("IMAGE_FORMAT", "webp").lower()   # webp ou jpeg
+IMAGE_QUALITY = int(os.environ.get("IMAGE_QUALITY", 82))
+IMAGE_WORKERS = int(os.environ.get("IMAGE_WORKERS", 2))    # Processos de otimização simultâneos
+IMAGE_TIMEOUT = float(os.environ.get("IMAGE_TIMEOUT", 30))  # Depois disso o processo é morto
+
+FORMATOS = {
+    "webp": ("WEBP", "image/webp", "webp"),
+    "jpeg": ("JPEG", "image/jpeg", "jpg"),
+}
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+_vagas = threading.BoundedSemaphore(IMAGE_WORKERS)
+
+def _recodificar(origem, largura, altura, formato, qualidade):
+    """Roda no processo de otimização. origem: bytes ou caminho do arquivo. Devolve (bytes, (largura, altura))."""
+    nome_pil = FORMATOS[formato][0]
+    with Image.open(origem if isinstance(origem, str) else io.BytesIO(origem)) as img:
+        img = ImageOps.exif_transpose(img)
+        img.thumbnail((largura, altura), Image.LANCZOS)
+
+        if nome_pil == "JPEG" and img.mode not in ("RGB", "L"):
+            img = img.convert("RGB")
+        elif img.mode not in ("RGB", "RGBA", "L"):
+            img = img.convert("RGBA")
+
+        saida = io.BytesIO()
+        if nome_pil == "WEBP":
+            img.save(saida, "WEBP", quality=qualidade, method=4)
+        else:
+            img.save(saida, "JPEG", quality=qualidade, optimize=True, progressive=True)
+        return saida.getvalue(), img.size
+
+def _recodificar_em_processo(caminho, formato):
+    """Chama _recodificar num processo novo, lendo e gravando arquivos. Devolve (bytes, (largura, altura))."""
+    with tempfile.NamedTemporaryFile(prefix="autoblog-opt-", delete=False) as saida:
+        destino = saida.name
+    try:
+        with _vagas:
+            processo = subprocess.run(
+                [sys.executable, "-m", "services.image_opt_service", caminho, destino,
+                 str(IMAGE_MAX_WIDTH), str(IMAGE_MAX_HEIGHT), formato, str(IMAGE_QUALITY)],
+                cwd=RAIZ, capture_output=True, text=True, timeout=IMAGE_TIMEOUT,
+            )
+        if processo.returncode != 0:
+            raise RuntimeError((processo.stderr.strip().splitlines() or [f"código {processo.returncode}"])[-1])
+        largura, altura = (int(v) for v in processo.stdout.split())
+        with open(destino, "rb") as f:
+            return f.read(), (largura, altura)
+    finally:
+        os.unlink(destino)
+
+def otimizar_imagem(dados, content_type=None, nome_arquivo=None):
+    """
+    Redimensiona e recodifica a imagem. Sempre devolve um dict utilizável:
+    {dados, content_type, nome_arquivo, bytes_antes, bytes_depois, ms, otimizada}.
+    Em qualquer falha (ou sem Pillow) devolve o original, com otimizada=False.
+    dados também pode ser o caminho de um arquivo: o original não passa pela
+    memória do processo, e sem otimização "dados" continua o caminho.
+    """
+    inicio = time.perf_counter()
+    tamanho_original = os.path.getsize(dados) if isinstance(dados, str) else len(dados)
+    resultado = {
+        "dados": dados,
+        "content_type": content_type,
+        "nome_arquivo": nome_arquivo,
+        "bytes_antes": tamanho_original,
+        "bytes_depois": tamanho_original,
+        "ms": 0,
+        "otimizada": False,
+    }
+    formato = IMAGE_FORMAT if IMAGE_FORMAT in FORMATOS else "webp"
+    if not IMAGE_OPTIMIZE or Image is None or not tamanho_original:
+        return resultado
+
+    try:
+        if isinstance(dados, str):
+            novos, tamanho = _recodificar_em_processo(dados, formato)
+        else:
+            with tempfile.NamedTemporaryFile(prefix="autoblog-img-") as tmp:
+                tmp.write(dados)
+                tmp.flush()
+                novos, tamanho = _recodificar_em_processo(tmp.name, formato)
+    except Exception as e:
+        # Inclui timeout (o processo é morto) e morte do processo (ex.: OOM)
+        print(f">>> [IMAGEM] Otimização falhou, enviando original: {e}")
+        resultado["ms"] = int((time.perf_counter() - inicio) * 1000)
+        return resultado
+
+    resultado["ms"] = int((time.perf_counter() - inicio) * 1000)
+    # Se recodificar não ajudou (imagem já pequena e comprimida), mantém o original
+    if len(novos) >= tamanho_original:
+        return resultado
+
+    _, mime, extensao = FORMATOS[formato]
+    base = os.path.splitext(nome_arquivo or f"img_{os.urandom(2).hex()}")[0]
+    resultado.update({
+        "dados": novos,
+        "content_type": mime,
+        "nome_arquivo": f"{base}.{extensao}",
+        "bytes_depois": len(novos),
+        "otimizada": True,
+        "dimensoes": tamanho,
+    })
+    economia = 100 * (1 - len(novos) / tamanho_original)
+    print(f">>> [IMAGEM] Otimizada {tamanho[0]}x{tamanho[1]} {formato}: "
+          f"{tamanho_original // 1024} KB -> {len(novos) // 1024} KB (-{economia:.0f}%) em {resultado['ms']} ms")
+    return resultado
+
+if __name__ == "__main__":
+    # Processo de otimização: entrada saída largura altura formato qualidade
+    entrada, destino, largura, altura, formato, qualidade = sys.argv[1:7]
+    novos, (largura_final, altura_final) = _recodificar(entrada, int(largura), int(altura), formato, int(qualidade))
+    with open(destino, "wb") as f:
+        f.write(novos)
+    print(largura_final, altura_final)
@@ -1,97 +1,218 @@
+import os
+import tempfile
+import threading
+import httpx
 import requests
+from http.cookiejar import DefaultCookiePolicy
 from openai import OpenAI
-import os
+from dotenv import load_dotenv
 from services.ai_service import criar_prompt_visual
+from services.credit_service import registrar_uso
+from services.metrics_service import contar_chamada, medir_etapa, IMAGE_BYTES, IMAGE_REUSE_TOTAL
+from services.image_library_service import buscar_reaproveitavel, registrar_imagem
+from services.image_opt_service import otimizar_imagem, IMAGE_OPTIMIZE
+from services.trace_service import span
+
+load_dotenv()
+
+# Tamanho de cada pedaço repassado do download da imagem para o upload no WP
+IMAGE_STREAM_CHUNK = int(os.environ.get("IMAGE_STREAM_CHUNK", 64 * 1024))
+
+# Clientes HTTP criados uma vez por processo. Com trust_env=False eles ignoram
+# as variáveis *_PROXY do ambiente (motivo da antiga limpeza do os.environ a
+# cada imagem, que alterava o processo inteiro) e reaproveitam conexões.
+# São compartilhados entre threads: o pool de conexões do requests/httpx é
+# thread-safe, e a sessão não guarda cookies (o jar seria comum a todos os
+# blogs e a todas as threads).
+_http = requests.Session()
+_http.trust_env = False
+_http.cookies.set_policy(DefaultCookiePolicy(allowed_domains=[]))
+_openai = None
+_openai_lock = threading.Lock()
+
+def _cliente_openai():
+    global _openai
+    if _openai is None:
+        with _openai_lock:
+            if _openai is None:
+                _openai = OpenAI(
+                    api_key=os.environ.get("OPENAI_API_KEY"),
+                    http_client=httpx.Client(trust_env=False, timeout=120),
+                )
+    return _openai
+
+class _CorpoStream:
+    """
+    Corpo de upload que lê do download em andamento, pedaço por pedaço.
+    Com o tamanho conhecido (Content-Length do download) o requests envia
+    Content-Length normal em vez de chunked, que alguns hosts WP recusam.
+    """
 
-def processar_imagem_featured(titulo_post, wp_url, auth_wp):
-    print(f"\n--- [SERVICE DEBUG] Iniciando processamento ---")
-    # Limpeza de ambiente para evitar erro de proxies
-    for key in list(os.environ.keys()):
-        if "PROXY" in key.upper():
-            print(f"DEBUG: Removendo variável de ambiente: {key}")
-            os.environ.pop(key)
-
-    api_key = os.environ.get("OPENAI_API_KEY")
-    print(f"DEBUG: OpenAI Key detectada? {'Sim' if api_key else 'Não'}")
-    
+    def __init__(self, resposta):
+        self._pedacos = resposta.iter_content(chunk_size=IMAGE_STREAM_CHUNK)
+        self._sobra = b""
+        self.tamanho = int(resposta.headers.get("Content-Length") or 0) or None
+        self.enviados = 0
+
+    def __len__(self):
+        return self.tamanho
+
+    def read(self, n=-1):
+        while n < 0 or len(self._sobra) < n:
+            pedaco = next(self._pedacos, None)
+            if pedaco is None:
+                break
+            self._sobra += pedaco
+        if n < 0:
+            dados, self._sobra = self._sobra, b""
+        else:
+            dados, self._sobra = self._sobra[:n], self._sobra[n:]
+        self.enviados += len(dados)
+        return dados
+
+    def __iter__(self):
+        # Sem Content-Length: o requests itera e envia em Transfer-Encoding chunked
+        for pedaco in self._pedacos:
+            self.enviados += len(pedaco)
+            yield pedaco
+
+def _enviar_midia(wp_url, auth_wp, corpo, nome_arquivo, content_type):
+    headers = {
+        'Content-Disposition': f'attachment; filename="{nome_arquivo}"',
+        'Content-Type': content_type
+    }
+    return _http.post(
+        f"{wp_url.rstrip('/')}/wp-json/wp/v2/media",
+        auth=auth_wp,
+        headers=headers,
+        data=corpo,
+        timeout=60
+    )
+
+def _otimizar(dados, content_type, nome_arquivo):
+    """Etapa de otimização com span, tempo por etapa e contagem de bytes economizados."""
+    with span("image.optimize") as s, medir_etapa("image_optimize"):
+        otimizada = otimizar_imagem(dados, content_type, nome_arquivo)
+        s["info"] = (f"{otimizada['bytes_antes']} -> {otimizada['bytes_depois']} bytes, "
+                     f"{otimizada['ms']} ms{'' if otimizada['otimizada'] else ' (original)'}")
+    IMAGE_BYTES.labels(stage="original").inc(otimizada["bytes_antes"])
+    IMAGE_BYTES.labels(stage="optimized").inc(otimizada["bytes_depois"])
+    return otimizada
+
+def processar_imagem_featured(titulo_post, wp_url, auth_wp, blog_id=None):
+    """
+    Devolve o ID da mídia destacada no WordPress (ou None). Com blog_id, tenta
+    antes reaproveitar uma imagem da biblioteca do blog com prompt parecido.
+    """
     try:
-        client = OpenAI(api_key=api_key)
-        
-        print(f"DEBUG: Solicitando prompt visual ao ai_service...")
-        visual_prompt = criar_prompt_visual(titulo_post)
-        print(f"DEBUG: Prompt gerado: {visual_prompt[:50]}...")
-
-        print("DEBUG: Chamando API DALL-E 3...")
-        image_gen = client.images.generate(
-            model="dall-e-3",
-            prompt=visual_prompt,
-            n=1,
-            size="1024x1024"
-        )
-        image_url = image_gen.data[0].url
-        print(f"DEBUG: URL da imagem recebida com sucesso.")
-
-        print(f"DEBUG: Fazendo download da imagem...")
-        img_res = requests.get(image_url, timeout=30)
-        print(f"DEBUG: Status download: {img_res.status_code}")
-
-        print(f"DEBUG: Fazendo upload para WordPress em: {wp_url}")
-        headers = {
-            'Content-Disposition': f'attachment; filename="f_{os.urandom(2).hex()}.jpg"',
-            'Content-Type': 'image/jpeg'
-        }
-        response = requests.post(
-            f"{wp_url.rstrip('/')}/wp-json/wp/v2/media",
-            auth=auth_wp,
-            headers=headers,
-            data=img_res.content,
-            timeout=60
-        )
-        print(f"DEBUG: Resposta WP Media Status: {response.status_code}")
-        
-        if response.status_code == 201:
-            media_id = response.json().get('id')
-            print(f"DEBUG: Sucesso total! ID gerado: {media_id}")
-            return media_id
-        
-        print(f"DEBUG: Falha no WP. Resposta: {response.text}")
-        return None
+        with span("llm.prompt_visual"):
+            visual_prompt = criar_prompt_visual(titulo_post)
+
+        if blog_id:
+            with span("image.library") as s:
+                reaproveitada = buscar_reaproveitavel(blog_id, visual_prompt)
+                s["info"] = f"media_id={reaproveitada}" if reaproveitada else "sem imagem parecida"
+            IMAGE_REUSE_TOTAL.labels(result="hit" if reaproveitada else "miss").inc()
+            if reaproveitada:
+                return reaproveitada
+
+        media_id = _gerar_e_enviar(visual_prompt, wp_url, auth_wp)
+        if media_id:
+            registrar_imagem(blog_id, visual_prompt, media_id)
+        return media_id
 
     except Exception as e:
-        print(f"DEBUG: EXCEÇÃO NO SERVICE: {str(e)}")
+        print(f">>> [IMAGEM] Falha ao gerar/enviar imagem: {e}")
         return None
-    
-import requests
-import os
+
+def _gerar_e_enviar(visual_prompt, wp_url, auth_wp):
+    """Gera a imagem no DALL-E e envia ao WordPress. Devolve o ID da mídia."""
+    client = _cliente_openai()
+
+    with span("openai.dall-e", info="dall-e-3 1024x1024"):
+        try:
+            image_gen = client.images.generate(
+                model="dall-e-3",
+                prompt=visual_prompt,
+                n=1,
+                size="1024x1024"
+            )
+        except Exception as e:
+            contar_chamada("openai", erro=e)
+            raise
+    contar_chamada("openai")
+    image_url = image_gen.data[0].url
+    registrar_uso("OpenAI", model="dall-e-3", images=len(image_gen.data))
+
+    nome_arquivo = f"f_{os.urandom(2).hex()}"
+
+    if IMAGE_OPTIMIZE:
+        # Para redimensionar é preciso a imagem inteira: o download vai em
+        # pedaços para um arquivo temporário e o pool lê de lá. Se a otimização
+        # não servir, o original sobe em stream a partir do mesmo arquivo.
+        with tempfile.NamedTemporaryFile(prefix="autoblog-img-") as tmp:
+            with span("image.download") as s:
+                with _http.get(image_url, stream=True, timeout=30) as img_res:
+                    img_res.raise_for_status()
+                    for pedaco in img_res.iter_content(chunk_size=IMAGE_STREAM_CHUNK):
+                        tmp.write(pedaco)
+                    content_type = img_res.headers.get("Content-Type", "image/png").split(";")[0]
+                tmp.flush()
+                s["info"] = f"HTTP {img_res.status_code}, {tmp.tell()} bytes (arquivo temporário)"
+            imagem = _otimizar(tmp.name, content_type, f"{nome_arquivo}.png")
+
+            with span("wordpress.media") as s:
+                corpo = imagem["dados"]
+                if not imagem["otimizada"]:
+                    tmp.seek(0)
+                    corpo = tmp
+                response = _enviar_midia(wp_url, auth_wp, corpo, imagem["nome_arquivo"], imagem["content_type"])
+                s["info"] = f"HTTP {response.status_code}"
+                if response.status_code != 201:
+                    s["status"] = "error"
+        contar_chamada("wordpress", status_code=response.status_code)
+        return _id_da_midia(response)
+
+    # Sem otimização, download e upload acontecem juntos: os bytes vão do
+    # CDN da OpenAI para o WordPress sem a imagem inteira ficar em memória.
+    with span("image.download") as s_download:
+        with _http.get(image_url, stream=True, timeout=30) as img_res:
+            img_res.raise_for_status()
+            corpo = _CorpoStream(img_res)
+            content_type = img_res.headers.get("Content-Type", "image/png").split(";")[0]
+            extensao = {"image/png": "png", "image/webp": "webp"}.get(content_type, "jpg")
+
+            with span("wordpress.media") as s:
+                response = _enviar_midia(wp_url, auth_wp, corpo if corpo.tamanho else iter(corpo),
+                                         f"{nome_arquivo}.{extensao}", content_type)
+                s["info"] = f"HTTP {response.status_code}"
+                if response.status_code != 201:
+                    s["status"] = "error"
+        s_download["info"] = f"HTTP {img_res.status_code}, {corpo.enviados} bytes (stream)"
+    contar_chamada("wordpress", status_code=response.status_code)
+    return _id_da_midia(response)
+
+def _id_da_midia(response):
+    if response.status_code == 201:
+        return response.json().get('id')
+
+    print(f">>> [IMAGEM] WordPress recusou a mídia ({response.status_code}): {response.text[:200]}")
+    return None
 
 def upload_manual_image(image_file, wp_url, auth):
     """
-    Recebe um objeto de arquivo do Flask, faz o upload para o WordPress 
+    Recebe um objeto de arquivo do Flask, faz o upload para o WordPress
     e retorna o ID da mídia (attachment ID).
     """
     try:
-        # 1. Preparar o arquivo para envio
-        # Lemos o nome original e o conteúdo binário
-        filename = image_file.filename
-        content_type = image_file.content_type
-        
-        # 2. Configurar os Headers da API do WordPress para Mídia
-        headers = {
-            'Content-Disposition': f'attachment; filename={filename}',
-            'Content-Type': content_type
-        }
-
-        # 3. Endpoint de mídia do WordPress
-        endpoint = f"{wp_url.rstrip('/')}/wp-json/wp/v2/media"
-
-        # 4. Faz o upload (enviando os bytes do arquivo no corpo da requisição)
-        response = requests.post(
-            endpoint,
-            auth=auth,
-            headers=headers,
-            data=image_file.read(),
-            timeout=30
-        )
+        if IMAGE_OPTIMIZE:
+            # Fotos enviadas pelo usuário costumam ser as maiores (câmera/celular)
+            imagem = _otimizar(image_file.read(), image_file.content_type, image_file.filename)
+            response = _enviar_midia(wp_url, auth, imagem["dados"], imagem["nome_arquivo"], imagem["content_type"])
+        else:
+            # O stream do arquivo vai direto no corpo da requisição (o requests
+            # descobre o tamanho pelo seek/tell e envia sem copiar para a memória)
+            response = _enviar_midia(wp_url, auth, image_file.stream, image_file.filename, image_file.content_type)
 
         if response.status_code in [200, 201]:
             data = response.json()
@@ -102,4 +223,4 @@ def upload_manual_image(image_file, wp_url, auth):
 
     except Exception as e:
         print(f"❌ Falha crítica no upload de imagem: {e}")
-        return None
\ No newline at end of file
+        return None
@@ -0,0 +1,183 @@
+import os
+import json
+import uuid
+import calendar
+import tempfile
+from datetime import datetime, timedelta
+from dotenv import load_dotenv
+from werkzeug.datastructures import FileStorage
+from werkzeug.utils import secure_filename
+from models import db, User, BackgroundJob
+from services import content_service
+from services.credit_service import contexto_uso, estornar_creditos
+
+load_dotenv()
+
+# Jobs em segundo plano: publicação manual imediata e Spy Writer faziam upload
+# de imagem, POST no WordPress, scraping e reescrita por IA dentro da
+# requisição, segurando o worker do gunicorn por até um minuto. Agora a rota
+# só grava um BackgroundJob e devolve o id; os workers do scheduler executam
+# e a página acompanha o status pela rota JSON /content/jobs/<id>.
+JOB_WORKERS = int(os.environ.get("JOB_WORKERS", 2))
+JOB_POLL_SECONDS = float(os.environ.get("JOB_POLL_SECONDS", 1))
+JOB_TIMEOUT_MIN = int(os.environ.get("JOB_TIMEOUT_MIN", 10))       # 'running' há mais que isso virou 'failed'
+JOB_QUEUE_TIMEOUT_MIN = int(os.environ.get("JOB_QUEUE_TIMEOUT_MIN", 15))  # 'queued' sem worker por mais que isso também
+JOB_RETENTION_DAYS = int(os.environ.get("JOB_RETENTION_DAYS", 7))
+# Web e scheduler rodam no mesmo container (supervisord): o upload passa por disco
+JOBS_UPLOAD_DIR = os.environ.get("JOBS_UPLOAD_DIR", os.path.join(tempfile.gettempdir(), "autoblog_jobs"))
+
+FINALIZADOS = ('done', 'failed')
+
+# Créditos debitados pela rota antes de criar o job: (quantidade, motivo).
+# Devolvidos uma única vez quando o job termina em 'failed' (ver _finalizar).
+CUSTOS = {"spy_writer": (2, "Spy Writer")}
+
+def criar_job(user_id, tipo, **payload):
+    """Grava o job na fila e devolve o objeto (já com id)."""
+    job = BackgroundJob(user_id=user_id, kind=tipo, payload=json.dumps(payload))
+    db.session.add(job)
+    db.session.commit()
+    return job
+
+def salvar_upload(arquivo):
+    """Copia o arquivo enviado para JOBS_UPLOAD_DIR. Devolve a referência para o payload ou None."""
+    if not arquivo or not arquivo.filename:
+        return None
+    os.makedirs(JOBS_UPLOAD_DIR, exist_ok=True)
+    nome = secure_filename(arquivo.filename) or "imagem"
+    caminho = os.path.join(JOBS_UPLOAD_DIR, f"{uuid.uuid4().hex}_{nome}")
+    arquivo.save(caminho)
+    return {"caminho": caminho, "nome": nome, "content_type": arquivo.content_type}
+
+def job_para_json(job):
+    return {
+        "id": job.id,
+        "kind": job.kind,
+        "status": job.status,
+        "message": job.message,
+        "result": json.loads(job.result) if job.result else None,
+        "finished": job.status in FINALIZADOS,
+    }
+
+# --- EXECUTORES ---
+# Cada um recebe (usuário, payload) e devolve (sucesso, resultado, mensagem).
+
+def _executar_post_manual(user, dados):
+    imagem = dados.get("imagem")
+    arquivo = None
+    try:
+        if imagem:
+            arquivo = FileStorage(stream=open(imagem["caminho"], "rb"), filename=imagem["nome"],
+                                  content_type=imagem["content_type"])
+        sucesso, mensagem = content_service.process_manual_post(
+            user, dados["site_id"], dados["title"], dados["content"], dados["action"], arquivo
+        )
+        return sucesso, None, mensagem
+    finally:
+        if arquivo:
+            arquivo.close()
+        if imagem and os.path.exists(imagem["caminho"]):
+            os.remove(imagem["caminho"])
+
+def _executar_spy_writer(user, dados):
+    url = dados["url"]
+    with contexto_uso(user.id, "Spy Writer"):
+        processado = content_service.analyze_spy_link(url, getattr(user, 'is_demo', False))
+    if not processado:
+        return False, None, "Não foi possível extrair dados desta URL."
+    return True, processado, "Conteúdo processado! Você pode editar abaixo ou enviar direto para a fila."
+
+EXECUTORES = {
+    "manual_post": _executar_post_manual,
+    "spy_writer": _executar_spy_writer,
+}
+
+# --- WORKER ---
+
+def reivindicar_job(agora=None):
+    """queued -> running no job mais antigo (troca condicional). Devolve o job ou None."""
+    agora = agora or datetime.utcnow()
+    for _ in range(3):
+        job_id = (db.session.query(BackgroundJob.id)
+                  .filter(BackgroundJob.status == 'queued')
+                  .order_by(BackgroundJob.id.asc())
+                  .limit(1).scalar())
+        if job_id is None:
+            db.session.commit()
+            return None
+        pegou = BackgroundJob.query.filter_by(id=job_id, status='queued').update(
+            {"status": "running", "started_at": agora}, synchronize_session=False)
+        db.session.commit()
+        if pegou:
+            return db.session.get(BackgroundJob, job_id, populate_existing=True)
+    return None
+
+def _finalizar(job, de, para, mensagem, agora, resultado=None):
+    """
+    de -> para só se o job ainda estiver em `de` (troca condicional): o worker e
+    a limpeza de travados nunca finalizam o mesmo job duas vezes. Estorna o
+    custo (CUSTOS) de jobs que terminam em 'failed'. Faz commit. Devolve se trocou.
+    """
+    trocou = BackgroundJob.query.filter_by(id=job.id, status=de).update(
+        {"status": para, "message": (mensagem or "")[:500], "result": resultado, "finished_at": agora})
+    db.session.commit()
+    if trocou and para == 'failed' and job.kind in CUSTOS:
+        quantidade, motivo = CUSTOS[job.kind]
+        estornar_creditos(job.user_id, quantidade, motivo, ref=json.loads(job.payload or "{}").get("url"))
+    return bool(trocou)
+
+def executar_job(job):
+    """Roda o executor do job e grava status, resultado e mensagem."""
+    user = db.session.get(User, job.user_id)
+    resultado = None
+    try:
+        sucesso, dados, mensagem = EXECUTORES[job.kind](user, json.loads(job.payload or "{}"))
+        status = 'done' if sucesso else 'failed'
+        resultado = json.dumps(dados) if dados is not None else None
+    except Exception as e:
+        db.session.rollback()
+        print(f"❌ [JOB] {job.kind} #{job.id} falhou: {e}")
+        status, mensagem = 'failed', f"Erro no processamento: {e}"
+    # Se a limpeza já encerrou o job por tempo, o resultado tardio é descartado
+    _finalizar(job, 'running', status, mensagem, datetime.utcnow(), resultado)
+    return status == 'done'
+
+def processar_jobs():
+    """Um ciclo do worker: executa o próximo job, se houver. Requer app context. Devolve se executou."""
+    job = reivindicar_job()
+    if job:
+        executar_job(job)
+    return job is not None
+
+def limpar_jobs(agora=None):
+    """
+    Falha (com estorno) jobs travados em 'running' ou esquecidos em 'queued' —
+    assim a página para de consultar o status — e apaga os finalizados antigos
+    (com os uploads órfãos).
+    """
+    agora = agora or datetime.utcnow()
+    esgotados = BackgroundJob.query.filter(db.or_(
+        db.and_(BackgroundJob.status == 'running',
+                BackgroundJob.started_at < agora - timedelta(minutes=JOB_TIMEOUT_MIN)),
+        db.and_(BackgroundJob.status == 'queued',
+                BackgroundJob.created_at < agora - timedelta(minutes=JOB_QUEUE_TIMEOUT_MIN)),
+    )).all()
+    travados = 0
+    for job in esgotados:
+        mensagem = ("Tempo esgotado no processamento." if job.status == 'running'
+                    else "O processamento não começou a tempo. Tente novamente.")
+        travados += _finalizar(job, job.status, 'failed', mensagem, agora)
+    removidos = BackgroundJob.query.filter(
+        BackgroundJob.status.in_(FINALIZADOS),
+        BackgroundJob.finished_at < agora - timedelta(days=JOB_RETENTION_DAYS)
+    ).delete(synchronize_session=False)
+    db.session.commit()
+
+    if os.path.isdir(JOBS_UPLOAD_DIR):
+        # agora é UTC naive: timegm não passa pelo fuso do host (timestamp() passaria)
+        limite = calendar.timegm((agora - timedelta(days=1)).timetuple())
+        for nome in os.listdir(JOBS_UPLOAD_DIR):
+            caminho = os.path.join(JOBS_UPLOAD_DIR, nome)
+            if os.path.getmtime(caminho) < limite:
+                os.remove(caminho)
+    return travados, removidos
@@ -0,0 +1,146 @@
+import os
+import hmac
+import time
+from contextlib import contextmanager
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Métricas no formato Prometheus.
+# Workers do gunicorn e o scheduler são processos separados: no modo
+# multiprocess cada um grava seus valores em arquivos mmap num diretório
+# comum e o /metrics do web devolve a soma de todos (scheduler incluído).
+# Por isso só existe um endpoint: raspar dois somaria tudo em dobro.
+# O diretório precisa existir antes do import do prometheus_client e deve ser
+# limpo a cada deploy (ver Dockerfile).
+METRICS_DIR = os.environ.setdefault(
+    "PROMETHEUS_MULTIPROC_DIR",
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "instance", "metrics")
+)
+os.makedirs(METRICS_DIR, exist_ok=True)
+
+from prometheus_client import (
+    CollectorRegistry, Counter, Histogram, generate_latest, multiprocess, CONTENT_TYPE_LATEST,
+)
+from prometheus_client.core import GaugeMetricFamily
+
+METRICS_TOKEN = os.environ.get("METRICS_TOKEN")  # O /metrics exige "Authorization: Bearer <token>"; sem token fica desligado
+
+STAGE_SECONDS = Histogram(
+    "autoblog_stage_duration_seconds",
+    "Duração de cada etapa da publicação (llm, image, wordpress)",
+    ["stage"],
+    buckets=(0.5, 1, 2, 5, 10, 20, 30, 60, 120, 300),
+)
+ENQUEUE_TO_PUBLISH_SECONDS = Histogram(
+    "autoblog_enqueue_to_publish_seconds",
+    "Tempo entre a ideia entrar na fila (pending) e ser publicada",
+    ["lane"],
+    buckets=(5, 10, 30, 60, 120, 300, 600, 1800, 3600, 7200, 21600, 86400),
+)
+PUBLISH_TOTAL = Counter(
+    "autoblog_publish_total",
+    "Publicações processadas pela fila",
+    ["result"],
+)
+PROVIDER_REQUESTS = Counter(
+    "autoblog_provider_requests_total",
+    "Chamadas a provedores externos por resultado (ok, error, rate_limited)",
+    ["provider", "outcome"],
+)
+RADAR_FETCH_SECONDS = Histogram(
+    "autoblog_radar_fetch_seconds",
+    "Duração do download/extração de cada fonte do Radar",
+    ["result"],
+    buckets=(0.25, 0.5, 1, 2, 5, 10, 20, 30),
+)
+IMAGE_BYTES = Counter(
+    "autoblog_image_bytes_total",
+    "Bytes das imagens antes e depois da otimização (stage=original|optimized)",
+    ["stage"],
+)
+PROMPT_TOKENS = Histogram(
+    "autoblog_prompt_tokens",
+    "Tamanho em tokens dos prompts enviados (system + prompt), por modelo",
+    ["model"],
+    buckets=(256, 512, 1024, 2048, 4096, 8192, 16384, 32768, 65536, 131072),
+)
+STRUCTURED_OUTPUT_TOTAL = Counter(
+    "autoblog_structured_output_total",
+    "Chamadas de saída estruturada da IA (result=ok|repaired|failed)",
+    ["schema", "result"],
+)
+IMAGE_REUSE_TOTAL = Counter(
+    "autoblog_image_reuse_total",
+    "Consultas à biblioteca de imagens do blog (hit = mídia reaproveitada)",
+    ["result"],
+)
+
+@contextmanager
+def medir_etapa(etapa):
+    """Cronometra um bloco e registra no histograma de etapas."""
+    inicio = time.perf_counter()
+    try:
+        yield
+    finally:
+        STAGE_SECONDS.labels(stage=etapa).observe(time.perf_counter() - inicio)
+
+def classificar_erro(erro):
+    """'rate_limited' para HTTP 429 / RateLimitError dos SDKs, 'error' para o resto."""
+    status = getattr(erro, "status_code", None) or getattr(getattr(erro, "response", None), "status_code", None)
+    if status == 429 or "RateLimit" in type(erro).__name__:
+        return "rate_limited"
+    return "error"
+
+def contar_chamada(provedor, status_code=None, erro=None):
+    """Conta uma chamada externa a partir do status HTTP ou da exceção levantada."""
+    if erro is not None:
+        resultado = classificar_erro(erro)
+    elif status_code == 429:
+        resultado = "rate_limited"
+    elif status_code is not None and status_code >= 400:
+        resultado = "error"
+    else:
+        resultado = "ok"
+    PROVIDER_REQUESTS.labels(provider=provedor, outcome=resultado).inc()
+
+class _ContentIdeaCollector:
+    """Contagem de ContentIdea por status, lida do banco no momento da coleta."""
+
+    def __init__(self, app):
+        self.app = app
+
+    def collect(self):
+        from models import db, ContentIdea
+        gauge = GaugeMetricFamily("autoblog_content_ideas", "Ideias de conteúdo por status", labels=["status"])
+        try:
+            with self.app.app_context():
+                linhas = db.session.query(ContentIdea.status, db.func.count(ContentIdea.id)).group_by(ContentIdea.status).all()
+        except Exception as e:
+            print(f">>> [METRICS] Falha ao contar ideias: {e}")
+            linhas = []
+        for status, total in linhas:
+            gauge.add_metric([status or "desconhecido"], total)
+        yield gauge
+
+def _registry(app):
+    registry = CollectorRegistry()
+    multiprocess.MultiProcessCollector(registry)
+    registry.register(_ContentIdeaCollector(app))
+    return registry
+
+def init_metrics(app):
+    """Expõe /metrics no app Flask (único endpoint; o scheduler grava no mesmo diretório)."""
+    from flask import request, Response, abort
+
+    registry = _registry(app)
+
+    def metrics():
+        # Nomes de usuários/modelos e volume de publicações não são públicos
+        if not METRICS_TOKEN:
+            abort(404)
+        if not hmac.compare_digest(request.headers.get("Authorization", ""), f"Bearer {METRICS_TOKEN}"):
+            abort(401)
+        return Response(generate_latest(registry), content_type=CONTENT_TYPE_LATEST)
+
+    app.add_url_rule("/metrics", "metrics", metrics)
@@ -0,0 +1,153 @@
+import os
+import time
+import threading
+from collections import deque
+from dotenv import load_dotenv
+from services.metrics_service import contar_chamada
+
+load_dotenv()
+
+# Roteamento de modelos por tarefa.
+# Cada tarefa tem uma cadeia de modelos (o primeiro saudável é usado) e uma meta
+# de latência. Tarefas curtas vão para modelos rápidos/baratos; o artigo
+# completo vai para o modelo principal. Qualquer cadeia pode ser trocada via
+# .env com MODEL_CHAIN_<TAREFA>=modelo1,modelo2
+MODEL_QUICK = os.environ.get("GROQ_MODEL_QUICK") or "llama-3.1-8b-instant"
+MODEL_MAIN = os.environ.get("GROQ_MODEL_MAIN") or "llama-3.3-70b-versatile"
+
+TAREFAS = {
+    "titulos":       {"cadeia": [MODEL_QUICK, MODEL_MAIN], "latencia_alvo": 5,  "timeout": 20},
+    "prompt_visual": {"cadeia": [MODEL_QUICK, MODEL_MAIN], "latencia_alvo": 5,  "timeout": 20},
+    "resumo":        {"cadeia": [MODEL_QUICK, MODEL_MAIN], "latencia_alvo": 10, "timeout": 30},
+    "artigo":        {"cadeia": [MODEL_MAIN, MODEL_QUICK], "latencia_alvo": 60, "timeout": 120},
+    "reescrita":     {"cadeia": [MODEL_MAIN, MODEL_QUICK], "latencia_alvo": 60, "timeout": 120},
+}
+
+JANELA = int(os.environ.get("ROUTER_WINDOW", 50))              # últimas N chamadas por modelo
+JANELA_SEGUNDOS = int(os.environ.get("ROUTER_WINDOW_SECONDS", 600))  # amostras mais velhas não contam
+TAXA_ERRO_MAX = float(os.environ.get("ROUTER_MAX_ERROR_RATE", 0.5))
+FALHAS_SEGUIDAS_MAX = int(os.environ.get("ROUTER_MAX_CONSECUTIVE_FAILURES", 3))
+PAUSA_SEGUNDOS = int(os.environ.get("ROUTER_COOLDOWN", 60))    # tempo fora da rotação
+
+_historico = {}      # modelo -> deque[(instante, latência, ok)]
+_falhas_seguidas = {}
+_pausado_ate = {}
+_lock = threading.Lock()
+
+def _cadeia(tarefa):
+    config = TAREFAS.get(tarefa) or TAREFAS["artigo"]
+    env = os.environ.get(f"MODEL_CHAIN_{tarefa.upper()}")
+    cadeia = [m.strip() for m in env.split(",")] if env else config["cadeia"]
+    # Remove vazios e duplicados preservando a ordem
+    return list(dict.fromkeys(m for m in cadeia if m))
+
+def _percentil(valores, p):
+    if not valores:
+        return None
+    ordenados = sorted(valores)
+    idx = min(int(round(p / 100 * (len(ordenados) - 1))), len(ordenados) - 1)
+    return ordenados[idx]
+
+def _resumo(modelo):
+    # Só a janela de tempo conta: um modelo lento que saiu da rotação volta a
+    # ser "saudável" quando as amostras antigas expiram e é testado de novo
+    limite = time.time() - JANELA_SEGUNDOS
+    hist = [(lat, ok) for quando, lat, ok in _historico.get(modelo) or () if quando >= limite]
+    latencias = [lat for lat, ok in hist if ok]
+    erros = sum(1 for _, ok in hist if not ok)
+    return {
+        "chamadas": len(hist),
+        "p50": _percentil(latencias, 50),
+        "p95": _percentil(latencias, 95),
+        "taxa_erro": (erros / len(hist)) if hist else 0.0,
+        "pausado": _pausado_ate.get(modelo, 0) > time.time(),
+    }
+
+def modelos_para(tarefa):
+    """
+    Ordem de tentativa para a tarefa: modelos saudáveis primeiro (na ordem da
+    cadeia), depois os que estouram a meta de latência. Pausados ficam de fora;
+    se todos estiverem pausados a lista vem vazia.
+    """
+    alvo = (TAREFAS.get(tarefa) or TAREFAS["artigo"])["latencia_alvo"]
+    saudaveis, lentos = [], []
+    with _lock:
+        for modelo in _cadeia(tarefa):
+            info = _resumo(modelo)
+            if info["pausado"]:
+                continue
+            if info["p95"] is not None and info["p95"] > alvo:
+                lentos.append(modelo)
+            else:
+                saudaveis.append(modelo)
+    return saudaveis + lentos
+
+def timeout_para(tarefa):
+    return (TAREFAS.get(tarefa) or TAREFAS["artigo"])["timeout"]
+
+# Erros de transporte dos clientes (groq/openai.APIConnectionError, httpx.TransportError,
+# requests.ConnectionError): não herdam de ConnectionError, então vão pelo nome da classe
+_ERROS_DE_CONEXAO = {"APIConnectionError", "TransportError", "ConnectionError"}
+
+def falha_do_modelo(erro):
+    """
+    Timeout, falha de conexão, HTTP 5xx e 429 indicam problema no modelo ou no
+    provedor; outros 4xx são culpa do pedido.
+    """
+    if isinstance(erro, (TimeoutError, ConnectionError)) or "Timeout" in type(erro).__name__:
+        return True
+    if any(classe.__name__ in _ERROS_DE_CONEXAO for classe in type(erro).__mro__):
+        return True
+    status = getattr(erro, "status_code", None) or getattr(getattr(erro, "response", None), "status_code", None)
+    if status is None:
+        return "RateLimit" in type(erro).__name__
+    return status == 429 or status >= 500
+
+def registrar_resultado(modelo, latencia, ok):
+    """Alimenta o histórico do modelo e abre o 'disjuntor' quando ele degrada."""
+    with _lock:
+        hist = _historico.setdefault(modelo, deque(maxlen=JANELA))
+        hist.append((time.time(), latencia, ok))
+
+        if ok:
+            _falhas_seguidas[modelo] = 0
+            return
+
+        _falhas_seguidas[modelo] = _falhas_seguidas.get(modelo, 0) + 1
+        info = _resumo(modelo)
+        degradado = info["chamadas"] >= 5 and info["taxa_erro"] > TAXA_ERRO_MAX
+        if _falhas_seguidas[modelo] >= FALHAS_SEGUIDAS_MAX or degradado:
+            _pausado_ate[modelo] = time.time() + PAUSA_SEGUNDOS
+            _falhas_seguidas[modelo] = 0
+            print(f">>> [ROUTER] Modelo {modelo} degradado; fora da rotação por {PAUSA_SEGUNDOS}s.")
+
+def executar_com_failover(tarefa, chamada, provedor="groq"):
+    """
+    Executa chamada(modelo, timeout) seguindo a ordem do roteador.
+    Em timeout/conexão/5xx/429, registra a falha e tenta o próximo modelo; outros erros
+    (ex.: 400 do pedido) sobem direto, sem afetar a saúde do modelo.
+    Devolve (resultado, modelo) ou levanta a última exceção se todos falharem.
+    """
+    modelos = modelos_para(tarefa)
+    if not modelos:
+        raise RuntimeError(f"Nenhum modelo disponível para a tarefa '{tarefa}' (todos pausados ou cadeia vazia)")
+
+    ultimo_erro = None
+    timeout = timeout_para(tarefa)
+    for modelo in modelos:
+        inicio = time.perf_counter()
+        try:
+            resultado = chamada(modelo, timeout)
+        except Exception as e:
+            contar_chamada(provedor, erro=e)
+            if not falha_do_modelo(e):
+                raise
+            registrar_resultado(modelo, time.perf_counter() - inicio, False)
+            print(f">>> [ROUTER] Falha em {modelo} ({tarefa}): {e}")
+            ultimo_erro = e
+            continue
+        registrar_resultado(modelo, time.perf_counter() - inicio, True)
+        contar_chamada(provedor)
+        return resultado, modelo
+
+    raise ultimo_erro
@@ -0,0 +1,105 @@
+import os
+import base64
+from datetime import datetime
+from flask import request, url_for
+from dotenv import load_dotenv
+from models import db
+
+load_dotenv()
+
+# Paginação por "keyset" (seek): em vez de OFFSET, a próxima página começa
+# depois da última linha vista, pela chave (data, id). O custo de cada página
+# não cresce com o histórico, desde que exista índice na coluna de data.
+PAGE_SIZE_DEFAULT = int(os.environ.get("PAGE_SIZE_DEFAULT", 25))
+PAGE_SIZE_MAX = int(os.environ.get("PAGE_SIZE_MAX", 100))
+
+class Pagina:
+    """Itens de uma página e os links para seguir adiante / voltar ao início."""
+
+    def __init__(self, items, next_cursor, per_page, is_first):
+        self.items = items
+        self.next_cursor = next_cursor
+        self.per_page = per_page
+        self.is_first = is_first
+
+    @property
+    def has_next(self):
+        return self.next_cursor is not None
+
+    @property
+    def next_url(self):
+        if not self.has_next:
+            return None
+        return _url_com(cursor=self.next_cursor)
+
+    @property
+    def first_url(self):
+        return None if self.is_first else _url_com(cursor=None)
+
+    def __iter__(self):
+        return iter(self.items)
+
+    def __len__(self):
+        return len(self.items)
+
+def _url_com(**novos):
+    args = request.args.to_dict()
+    args.update(novos)
+    args = {k: v for k, v in args.items() if v is not None}
+    return url_for(request.endpoint, **(request.view_args or {}), **args)
+
+def codificar_cursor(data, id_):
+    bruto = f"{data.isoformat() if data else ''}|{id_}"
+    return base64.urlsafe_b64encode(bruto.encode()).decode().rstrip("=")
+
+def decodificar_cursor(cursor):
+    """(datetime, id) ou None se o cursor estiver ausente/adulterado (volta à 1ª página)."""
+    if not cursor:
+        return None
+    try:
+        bruto = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        data, id_ = bruto.rsplit("|", 1)
+        return (datetime.fromisoformat(data) if data else None), int(id_)
+    except (ValueError, UnicodeDecodeError):
+        return None
+
+def tamanho_pagina(valor=None):
+    """Tamanho pedido na URL, limitado entre 1 e PAGE_SIZE_MAX."""
+    try:
+        valor = int(valor) if valor is not None else PAGE_SIZE_DEFAULT
+    except (TypeError, ValueError):
+        valor = PAGE_SIZE_DEFAULT
+    return max(1, min(valor, PAGE_SIZE_MAX))
+
+def paginar(query, coluna_data, coluna_id, cursor=None, per_page=None, crescente=False):
+    """
+    Aplica ORDER BY (data, id) e o filtro de continuação do cursor à query.
+    Busca per_page + 1 linhas para saber se existe próxima página.
+    """
+    per_page = tamanho_pagina(per_page)
+    posicao = decodificar_cursor(cursor)
+
+    if posicao:
+        data, id_ = posicao
+        if crescente:
+            query = query.filter(db.or_(coluna_data > data, db.and_(coluna_data == data, coluna_id > id_)))
+        else:
+            query = query.filter(db.or_(coluna_data < data, db.and_(coluna_data == data, coluna_id < id_)))
+
+    ordem = (coluna_data.asc(), coluna_id.asc()) if crescente else (coluna_data.desc(), coluna_id.desc())
+    linhas = query.order_by(*ordem).limit(per_page + 1).all()
+
+    proximo = None
+    if len(linhas) > per_page:
+        linhas = linhas[:per_page]
+        ultimo = linhas[-1]
+        proximo = codificar_cursor(getattr(ultimo, coluna_data.key), getattr(ultimo, coluna_id.key))
+
+    return Pagina(linhas, proximo, per_page, is_first=posicao is None)
+
+def paginar_request(query, coluna_data, coluna_id, crescente=False):
+    """Atalho para rotas: lê ?cursor= e ?per_page= da URL."""
+    return paginar(query, coluna_data, coluna_id,
+                   cursor=request.args.get("cursor"),
+                   per_page=request.args.get("per_page"),
+                   crescente=crescente)
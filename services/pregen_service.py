@@ -0,0 +1,128 @@
+import os
+import logging
+from datetime import datetime, timedelta
+from dotenv import load_dotenv
+from models import db, Blog, ContentIdea, User
+from services.content_service import gerar_conteudo_ia, preparar_imagem_post
+from services.credit_service import contexto_uso
+from services.trace_service import iniciar_trace, span
+from services.slot_service import slots_planejados_ate
+
+load_dotenv()
+
+# Pré-geração: texto e imagem das ideias dos próximos slots de cada blog são
+# feitos com antecedência, enquanto a fila de publicação está ociosa. No
+# horário agendado a publicação vira só o POST no WordPress.
+# Roda numa thread própria do scheduler: gerar texto/imagem leva minutos e
+# não pode atrasar o loop do schedule (enfileiramento e fila de publicação).
+PREGEN_HOURS = int(os.environ.get("PREGEN_HOURS", 12))                       # Janela de antecedência
+PREGEN_MIN_LEAD_MINUTES = int(os.environ.get("PREGEN_MIN_LEAD_MINUTES", 15))  # Perto disso o publicador faz na hora
+PREGEN_MAX_PER_RUN = int(os.environ.get("PREGEN_MAX_PER_RUN", 3))
+PREGEN_MAX_AGE_HOURS = int(os.environ.get("PREGEN_MAX_AGE_HOURS", 48))       # Conteúdo pronto mais velho é descartado
+PREGEN_POLL_SECONDS = int(os.environ.get("PREGEN_POLL_SECONDS", 120))         # Espera quando não há o que preparar
+
+logger = logging.getLogger("autoblog.pregen")
+
+def _fila_ociosa():
+    return not db.session.query(ContentIdea.id).filter(ContentIdea.status.in_(['pending', 'processing'])).first()
+
+def _prontas_por_usuario():
+    """Quantas ideias já pré-geradas (ainda não publicadas) cada usuário tem."""
+    return dict(db.session.query(Blog.user_id, db.func.count(ContentIdea.id))
+                .join(Blog, ContentIdea.blog_id == Blog.id)
+                .filter(ContentIdea.status == 'draft', ContentIdea.prepared_at.isnot(None))
+                .group_by(Blog.user_id).all())
+
+def ideias_a_vencer(agora=None, horas=None):
+    """
+    Ideias que vão ser publicadas nas próximas `horas`, casando os slots
+    planejados de cada blog (slot_service) com as drafts na ordem em que o
+    enfileirador vai pegá-las. Devolve [(slot_at UTC, ideia)] só com as que
+    ainda não foram pré-geradas.
+    """
+    agora = agora or datetime.utcnow()
+    limite = agora + timedelta(hours=horas or PREGEN_HOURS)
+    antecedencia = agora + timedelta(minutes=PREGEN_MIN_LEAD_MINUTES)
+
+    por_blog = {}
+    for slot in slots_planejados_ate(limite):
+        por_blog.setdefault(slot.blog_id, []).append(slot)
+
+    resultado = []
+    for blog_id, slots in por_blog.items():
+        # Slots que vencem antes da antecedência vão consumir as primeiras drafts
+        antes = sum(1 for s in slots if s.slot_at < antecedencia)
+        na_janela = slots[antes:]
+        if not na_janela:
+            continue
+        proximas = (ContentIdea.query
+                    .filter_by(blog_id=blog_id, status='draft', is_posted=False)
+                    .order_by(ContentIdea.created_at.asc())
+                    .offset(antes)
+                    .limit(len(na_janela))
+                    .all())
+        resultado += [(s.slot_at, ideia) for s, ideia in zip(na_janela, proximas) if ideia.prepared_at is None]
+    return sorted(resultado, key=lambda item: item[0])
+
+def pre_gerar_ideia(idea):
+    """Gera texto e imagem da ideia e grava, se ela ainda estiver como draft."""
+    with contexto_uso(idea.blog.user_id, "Pre-geracao", idea_id=idea.id), iniciar_trace(idea.id):
+        with span("pregen", info=idea.title[:100]) as s:
+            conteudo = gerar_conteudo_ia(idea.title, idea.context_insight, blog_id=idea.blog_id)
+            if not conteudo:
+                s["status"] = "error"
+                return False
+            wp_image_id = preparar_imagem_post(idea)
+
+            # Só grava se o publicador não pegou a ideia enquanto gerávamos
+            gravadas = ContentIdea.query.filter_by(id=idea.id, status='draft').update({
+                "full_content": conteudo,
+                "featured_image_id": wp_image_id,
+                "prepared_at": datetime.utcnow(),
+            }, synchronize_session=False)
+            db.session.commit()
+            s["info"] = f"media_id={wp_image_id}" if gravadas else "ideia já saiu do draft"
+            return bool(gravadas)
+
+def expirar_pre_gerados():
+    """
+    Descarta textos pré-gerados velhos demais (o publicador gera de novo na hora).
+    O featured_image_id fica de propósito: a mídia já está no WordPress, depende
+    só do título (que não muda) e preparar_imagem_post a reaproveita. Limpar
+    custaria outra imagem no DALL-E e deixaria a anterior órfã na biblioteca.
+    """
+    limite = datetime.utcnow() - timedelta(hours=PREGEN_MAX_AGE_HOURS)
+    expiradas = ContentIdea.query.filter(
+        ContentIdea.status == 'draft',
+        ContentIdea.prepared_at < limite
+    ).update({"full_content": None, "prepared_at": None}, synchronize_session=False)
+    db.session.commit()
+    return expiradas
+
+def pre_gerar_conteudos(agora=None):
+    """
+    Ciclo do scheduler. Só trabalha com a fila de publicação vazia e, por
+    usuário, mantém no máximo min(posts_per_day do plano, créditos) ideias
+    prontas. Requer app context. Devolve quantas ideias foram preparadas.
+    """
+    expirar_pre_gerados()
+    if not _fila_ociosa():
+        return 0
+
+    prontas = _prontas_por_usuario()
+    feitas = 0
+    for _, ideia in ideias_a_vencer(agora):
+        if feitas >= PREGEN_MAX_PER_RUN or not _fila_ociosa():
+            break
+        dono = db.session.get(User, ideia.blog.user_id)
+        if not dono or not dono.plan:
+            continue
+        teto = min(dono.plan.posts_per_day or 1, dono.credits or 0)
+        if prontas.get(dono.id, 0) >= teto:
+            continue
+
+        logger.info("Pré-gerando '%s' (blog %s)", ideia.title, ideia.blog_id)
+        if pre_gerar_ideia(ideia):
+            prontas[dono.id] = prontas.get(dono.id, 0) + 1
+            feitas += 1
+    return feitas
@@ -0,0 +1,188 @@
+import os
+import json
+import time
+import logging
+import threading
+import functools
+from contextlib import contextmanager
+from contextvars import ContextVar
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Perfil de banco por request Flask / job do scheduler:
+# quantidade de queries, tempo total no banco e as queries mais lentas.
+# Workers do gunicorn e o scheduler são processos separados: cada perfil vira
+# uma linha JSON num arquivo comum (append), que a página do admin lê. Quando
+# passa de PROFILER_MAX_BYTES o arquivo é trocado por um novo e o anterior
+# fica em <arquivo>.1, então o disco usado é limitado.
+SLOW_QUERY_MS = float(os.environ.get("SLOW_QUERY_MS", 100))
+TOP_QUERIES = int(os.environ.get("PROFILER_TOP_QUERIES", 5))
+HISTORICO_MAX = int(os.environ.get("PROFILER_HISTORY", 200))
+PROFILER_FILE = os.environ.get(
+    "PROFILER_FILE",
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "instance", "db_profiler.jsonl")
+)
+PROFILER_MAX_BYTES = int(os.environ.get("PROFILER_MAX_BYTES", 2_000_000))
+
+logger = logging.getLogger("autoblog.db")
+
+_perfil_atual = ContextVar("perfil_db", default=None)
+_lock = threading.Lock()
+_instalado = False
+
+def _novo_perfil(tipo, nome):
+    return {"tipo": tipo, "nome": nome, "queries": 0, "db_ms": 0.0, "lentas": [], "inicio": time.perf_counter()}
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("_inicio_query", []).append(time.perf_counter())
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    pilha = conn.info.get("_inicio_query")
+    if not pilha:
+        return
+    duracao_ms = (time.perf_counter() - pilha.pop()) * 1000
+
+    perfil = _perfil_atual.get()
+    if perfil is None:
+        return
+    perfil["queries"] += 1
+    perfil["db_ms"] += duracao_ms
+
+    if duracao_ms >= SLOW_QUERY_MS:
+        perfil["lentas"].append((round(duracao_ms, 1), " ".join(statement.split())[:500]))
+        perfil["lentas"].sort(key=lambda q: q[0], reverse=True)
+        del perfil["lentas"][TOP_QUERIES:]
+
+def _handle_error(contexto):
+    # Query que falhou não passa pelo after_cursor_execute: tira o início da pilha
+    pilha = contexto.connection.info.get("_inicio_query") if contexto.connection is not None else None
+    if pilha:
+        pilha.pop()
+
+def instalar_eventos():
+    """Registra os listeners em todas as engines (uma vez por processo)."""
+    global _instalado
+    if _instalado:
+        return
+    event.listen(Engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(Engine, "after_cursor_execute", _after_cursor_execute)
+    event.listen(Engine, "handle_error", _handle_error)
+    _instalado = True
+
+def _finalizar(perfil, token, extra=None):
+    _perfil_atual.reset(token)
+    registro = {
+        "tipo": perfil["tipo"],
+        "nome": perfil["nome"],
+        "queries": perfil["queries"],
+        "db_ms": round(perfil["db_ms"], 1),
+        "total_ms": round((time.perf_counter() - perfil["inicio"]) * 1000, 1),
+        "lentas": perfil["lentas"],
+        "quando": time.strftime("%Y-%m-%d %H:%M:%S"),
+    }
+    if extra:
+        registro.update(extra)
+    _gravar(registro)
+    logger.info(json.dumps({"evento": "db_profile", **registro}, ensure_ascii=False))
+    return registro
+
+def _gravar(registro):
+    """Acrescenta o perfil ao arquivo comum (uma escrita O_APPEND por linha) e gira o arquivo se cresceu demais."""
+    linha = (json.dumps(registro, ensure_ascii=False) + "\n").encode("utf-8")
+    try:
+        os.makedirs(os.path.dirname(PROFILER_FILE), exist_ok=True)
+        fd = os.open(PROFILER_FILE, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+        try:
+            os.write(fd, linha)
+            tamanho = os.fstat(fd).st_size
+        finally:
+            os.close(fd)
+        if tamanho > PROFILER_MAX_BYTES:
+            with _lock:
+                os.replace(PROFILER_FILE, PROFILER_FILE + ".1")
+    except OSError as e:
+        logger.warning(f"Perfil de banco não gravado em {PROFILER_FILE}: {e}")
+
+@contextmanager
+def perfilar(tipo, nome):
+    """Abre um perfil (ex.: job do scheduler) e o registra ao sair do bloco."""
+    instalar_eventos()
+    perfil = _novo_perfil(tipo, nome)
+    token = _perfil_atual.set(perfil)
+    try:
+        yield perfil
+    finally:
+        _finalizar(perfil, token)
+
+def perfilar_job(funcao):
+    """Decorator para jobs do scheduler."""
+    @functools.wraps(funcao)
+    def wrapper(*args, **kwargs):
+        with perfilar("job", funcao.__name__):
+            return funcao(*args, **kwargs)
+    return wrapper
+
+def init_profiler(app):
+    """Liga o perfil por request: headers X-DB-*, log estruturado e histórico."""
+    from flask import g, request
+
+    instalar_eventos()
+
+    @app.before_request
+    def _iniciar_perfil():
+        perfil = _novo_perfil("request", request.endpoint or request.path)
+        g._perfil_db = (perfil, _perfil_atual.set(perfil))
+
+    @app.after_request
+    def _encerrar_perfil(response):
+        item = g.pop("_perfil_db", None)
+        if item is None:
+            return response
+        perfil, token = item
+        if request.endpoint == "static":
+            _perfil_atual.reset(token)
+            return response
+        registro = _finalizar(perfil, token, {"metodo": request.method, "status": response.status_code})
+        response.headers["X-DB-Query-Count"] = str(registro["queries"])
+        response.headers["X-DB-Time-Ms"] = str(registro["db_ms"])
+        return response
+
+def _ler_perfis():
+    """Perfis gravados por todos os processos, do mais antigo ao mais novo."""
+    registros = []
+    for caminho in (PROFILER_FILE + ".1", PROFILER_FILE):
+        try:
+            with open(caminho, encoding="utf-8") as f:
+                linhas = f.readlines()
+        except OSError:
+            continue
+        for linha in linhas:
+            try:
+                registros.append(json.loads(linha))
+            except ValueError:
+                pass  # Linha sendo escrita por outro processo
+    return registros
+
+def get_perfis_recentes(limite=HISTORICO_MAX):
+    """Últimos `limite` perfis (requests de todos os workers e jobs do scheduler), mais novo primeiro."""
+    return list(reversed(_ler_perfis()[-limite:]))
+
+def get_resumo_por_nome():
+    """Agrega o histórico gravado por endpoint/job: média e máximo de queries e tempo de banco."""
+    resumo = {}
+    for r in _ler_perfis():
+        item = resumo.setdefault((r["tipo"], r["nome"]), {"tipo": r["tipo"], "nome": r["nome"], "execucoes": 0,
+                                                         "queries": 0, "max_queries": 0, "db_ms": 0.0})
+        item["execucoes"] += 1
+        item["queries"] += r["queries"]
+        item["max_queries"] = max(item["max_queries"], r["queries"])
+        item["db_ms"] += r["db_ms"]
+    linhas = []
+    for item in resumo.values():
+        item["media_queries"] = round(item["queries"] / item["execucoes"], 1)
+        item["media_db_ms"] = round(item["db_ms"] / item["execucoes"], 1)
+        linhas.append(item)
+    return sorted(linhas, key=lambda i: i["media_queries"], reverse=True)
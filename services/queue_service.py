@@ -0,0 +1,151 @@
+import os
+from datetime import datetime, timedelta
+from dotenv import load_dotenv
+from models import db, User, Plan, Blog, ContentIdea, QueueShare
+
+load_dotenv()
+
+# Fila de publicação com divisão justa entre usuários (deficit round-robin).
+# A cada rodada cada usuário com ideias 'pending' ganha crédito igual ao peso
+# do plano (Plan.queue_weight); cada ideia publicada gasta 1. O próximo a ser
+# atendido é quem tem mais crédito, então um usuário com 500 ideias na fila
+# não segura os outros: em cada rodada ele só passa na frente na proporção do
+# seu peso. Plan.max_concurrent_posts limita quantas ideias do mesmo usuário
+# ficam em 'processing' ao mesmo tempo.
+QUEUE_PROCESSING_TIMEOUT_MIN = int(os.environ.get("QUEUE_PROCESSING_TIMEOUT_MIN", 30))
+
+# Faixa rápida: ideias que o usuário mandou publicar na hora (priority > 0)
+# têm workers reservados no scheduler que olham a fila a cada poucos segundos
+# e não disputam com a automação. A faixa normal também as pega primeiro.
+# Dentro da faixa rápida os usuários se revezam e cada um tem no máximo
+# max_concurrent_posts ideias prioritárias em 'processing'.
+PRIORIDADE_NORMAL = 0
+PRIORIDADE_INTERATIVA = 10
+QUEUE_FAST_WORKERS = int(os.environ.get("QUEUE_FAST_WORKERS", 1))
+QUEUE_FAST_POLL_SECONDS = float(os.environ.get("QUEUE_FAST_POLL_SECONDS", 2))
+
+# Valores para planos que ainda estão com o padrão do banco (ver manutencao.py)
+PESOS_PADRAO = {"VIP": (8, 3), "Pro": (4, 2), "Lite": (2, 1), "Starter": (1, 1)}
+
+# Ordem dentro da fila: quando a ideia entrou nela. Ideias enfileiradas antes da
+# coluna enqueued_at existir (e sem o preenchimento do manutencao.py) usam created_at.
+_ENFILEIRADA_EM = db.func.coalesce(ContentIdea.enqueued_at, ContentIdea.created_at)
+
+def _em_andamento(agora, so_prioritarias=False):
+    """{user_id: ideias em 'processing'} ignorando as travadas há mais que o timeout."""
+    limite = agora - timedelta(minutes=QUEUE_PROCESSING_TIMEOUT_MIN)
+    consulta = (db.session.query(Blog.user_id, db.func.count(ContentIdea.id))
+                .join(Blog, ContentIdea.blog_id == Blog.id)
+                .filter(ContentIdea.status == 'processing', ContentIdea.claimed_at >= limite))
+    if so_prioritarias:
+        consulta = consulta.filter(ContentIdea.priority > PRIORIDADE_NORMAL)
+    return dict(consulta.group_by(Blog.user_id).all())
+
+def _usuarios_na_fila(so_prioritarias=False):
+    """[(user_id, peso, limite simultâneo, ideia pending mais antiga)]."""
+    consulta = (db.session.query(
+                    Blog.user_id,
+                    db.func.coalesce(Plan.queue_weight, 1),
+                    db.func.coalesce(Plan.max_concurrent_posts, 1),
+                    db.func.min(_ENFILEIRADA_EM))
+                .join(Blog, ContentIdea.blog_id == Blog.id)
+                .join(User, Blog.user_id == User.id)
+                .outerjoin(Plan, User.plan_id == Plan.id)
+                .filter(ContentIdea.status == 'pending', ContentIdea.is_posted == False))
+    if so_prioritarias:
+        consulta = consulta.filter(ContentIdea.priority > PRIORIDADE_NORMAL)
+    return consulta.group_by(Blog.user_id, Plan.queue_weight, Plan.max_concurrent_posts).all()
+
+def _escolher_usuario(agora):
+    """Aplica uma rodada do DRR e devolve o user_id a ser atendido (ou None)."""
+    na_fila = _usuarios_na_fila()
+    if not na_fila:
+        # Fila vazia: ninguém guarda crédito para depois (regra do DRR)
+        QueueShare.query.filter(QueueShare.deficit != 0).update({"deficit": 0.0}, synchronize_session=False)
+        return None
+
+    rodando = _em_andamento(agora)
+    elegiveis = [(uid, max(1, peso), antiga) for uid, peso, limite, antiga in na_fila
+                 if rodando.get(uid, 0) < max(1, limite)]
+    if not elegiveis:
+        return None
+
+    ids = [uid for uid, _, _ in elegiveis]
+    cotas = {q.user_id: q for q in QueueShare.query.filter(QueueShare.user_id.in_(ids))}
+    for uid in ids:
+        if uid not in cotas:
+            cotas[uid] = QueueShare(user_id=uid, deficit=0.0)
+            db.session.add(cotas[uid])
+
+    # Quem saiu da fila perde o crédito acumulado
+    QueueShare.query.filter(
+        QueueShare.user_id.notin_([uid for uid, _, _, _ in na_fila]),
+        QueueShare.deficit != 0
+    ).update({"deficit": 0.0}, synchronize_session=False)
+
+    # Nova rodada quando nenhum elegível tem crédito para uma publicação
+    if all(cotas[uid].deficit < 1 for uid in ids):
+        for uid, peso, _ in elegiveis:
+            cotas[uid].deficit += peso
+
+    # Mais crédito primeiro; empate: quem espera há mais tempo
+    uid, _, _ = max(elegiveis, key=lambda e: (cotas[e[0]].deficit, -e[2].timestamp()))
+    cotas[uid].deficit -= 1
+    return uid
+
+def reivindicar_proxima(agora=None, tentativas=3):
+    """
+    Escolhe o próximo usuário pela divisão justa e marca a ideia pending mais
+    antiga dele como 'processing'. Devolve a ideia (já gravada) ou None.
+    A troca de status é condicional: dois workers nunca pegam a mesma ideia.
+    """
+    agora = agora or datetime.utcnow()
+    for _ in range(tentativas):
+        user_id = _escolher_usuario(agora)
+        if user_id is None:
+            db.session.commit()
+            return None
+
+        ideia_id = (db.session.query(ContentIdea.id)
+                    .join(Blog, ContentIdea.blog_id == Blog.id)
+                    .filter(Blog.user_id == user_id, ContentIdea.status == 'pending', ContentIdea.is_posted == False)
+                    .order_by(ContentIdea.priority.desc(), _ENFILEIRADA_EM.asc(), ContentIdea.id.asc())
+                    .limit(1).scalar())
+        if _marcar_processando(ideia_id, agora):
+            return db.session.get(ContentIdea, ideia_id, populate_existing=True)
+    return None
+
+def _marcar_processando(ideia_id, agora):
+    """pending -> processing só se ninguém pegou antes. Faz commit."""
+    pegou = ideia_id and ContentIdea.query.filter_by(id=ideia_id, status='pending').update(
+        {"status": "processing", "claimed_at": agora}, synchronize_session=False)
+    db.session.commit()
+    return bool(pegou)
+
+def reivindicar_prioritaria(agora=None, tentativas=3):
+    """
+    Faixa rápida: não passa pelo DRR nem disputa com a automação, mas reveza
+    os usuários (quem tem menos prioritárias em andamento primeiro; empate:
+    quem espera há mais tempo) e respeita max_concurrent_posts contando só as
+    prioritárias. Devolve a ideia já como 'processing' ou None.
+    """
+    agora = agora or datetime.utcnow()
+    for _ in range(tentativas):
+        rodando = _em_andamento(agora, so_prioritarias=True)
+        elegiveis = [(rodando.get(uid, 0), antiga, uid)
+                     for uid, _, limite, antiga in _usuarios_na_fila(so_prioritarias=True)
+                     if rodando.get(uid, 0) < max(1, limite)]
+        if not elegiveis:
+            db.session.commit()
+            return None
+        _, _, user_id = min(elegiveis)
+
+        ideia_id = (db.session.query(ContentIdea.id)
+                    .join(Blog, ContentIdea.blog_id == Blog.id)
+                    .filter(Blog.user_id == user_id, ContentIdea.status == 'pending', ContentIdea.is_posted == False,
+                            ContentIdea.priority > PRIORIDADE_NORMAL)
+                    .order_by(ContentIdea.priority.desc(), _ENFILEIRADA_EM.asc(), ContentIdea.id.asc())
+                    .limit(1).scalar())
+        if _marcar_processando(ideia_id, agora):
+            return db.session.get(ContentIdea, ideia_id, populate_existing=True)
+    return None
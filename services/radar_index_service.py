@@ -0,0 +1,228 @@
+import os
+import re
+import time
+import zlib
+import fcntl
+import shutil
+import threading
+import unicodedata
+from contextlib import contextmanager
+import numpy as np
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Índice vetorial local dos insights do Radar (um por blog).
+# Usa TF-IDF com "hashing trick": não precisa de modelo, roda só em CPU e o
+# vocabulário não cresce. Os vetores ficam em arquivos .npy abertos via mmap.
+# Cada reconstrução grava uma versão nova (diretório com vetores, ids e idf) e
+# só então troca o ponteiro blog_<id>.atual: quem lê nunca mistura arquivos
+# de versões diferentes. Web (sincronização de fontes) e scheduler podem
+# reconstruir o mesmo blog ao mesmo tempo: gravação, troca e limpeza rodam sob
+# um flock em blog_<id>.lock.
+INDEX_DIR = os.environ.get(
+    "RADAR_INDEX_DIR",
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "instance", "radar_index")
+)
+INDEX_DIM = int(os.environ.get("RADAR_INDEX_DIM", 4096))
+
+STOPWORDS = {
+    "que", "para", "com", "uma", "por", "mais", "como", "mas", "foi", "ele", "ela", "das", "dos",
+    "nos", "nas", "seu", "sua", "seus", "suas", "isso", "este", "esta", "esse", "essa", "sao",
+    "ser", "tem", "ter", "muito", "tambem", "quando", "entre", "sobre", "apos", "pelo", "pela",
+    "the", "and", "for", "with", "that", "this", "from", "are", "you", "your",
+}
+
+_cache = {}
+_lock = threading.Lock()
+
+def _tokenizar(texto):
+    """Normaliza acentos/caixa e devolve os termos relevantes do texto."""
+    texto = unicodedata.normalize("NFKD", texto or "").encode("ascii", "ignore").decode().lower()
+    return [t for t in re.findall(r"[a-z0-9]{3,}", texto) if t not in STOPWORDS]
+
+def _hash_termo(termo):
+    # crc32 é estável entre processos (hash() do Python não é)
+    return zlib.crc32(termo.encode()) % INDEX_DIM
+
+def _contagens(textos):
+    """Matriz de frequência de termos (docs x INDEX_DIM)."""
+    matriz = np.zeros((len(textos), INDEX_DIM), dtype=np.float32)
+    for i, texto in enumerate(textos):
+        for termo in _tokenizar(texto):
+            matriz[i, _hash_termo(termo)] += 1.0
+    return matriz
+
+def _normalizar(matriz):
+    np.log1p(matriz, out=matriz)  # tf sublinear
+    normas = np.linalg.norm(matriz, axis=1, keepdims=True)
+    normas[normas == 0] = 1.0
+    matriz /= normas
+    return matriz
+
+def _ponteiro(blog_id):
+    return os.path.join(INDEX_DIR, f"blog_{blog_id}.atual")
+
+def _versao_atual(blog_id):
+    """Nome do diretório da versão em uso, ou None se o blog não tem índice (ou o ponteiro aponta para o nada)."""
+    try:
+        with open(_ponteiro(blog_id), encoding="utf-8") as f:
+            versao = f.read().strip()
+    except OSError:
+        return None
+    return versao if versao and os.path.isdir(os.path.join(INDEX_DIR, versao)) else None
+
+@contextmanager
+def _trava(blog_id):
+    """Exclusão entre reconstruções do mesmo blog, inclusive em processos diferentes."""
+    with open(os.path.join(INDEX_DIR, f"blog_{blog_id}.lock"), "a") as f:
+        fcntl.flock(f, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(f, fcntl.LOCK_UN)
+
+def _caminhos(versao):
+    base = os.path.join(INDEX_DIR, versao)
+    return os.path.join(base, "vec.npy"), os.path.join(base, "ids.npy"), os.path.join(base, "idf.npy")
+
+def _numero_versao(nome):
+    try:
+        return int(nome.rsplit(".v", 1)[1])
+    except (IndexError, ValueError):
+        return None
+
+def _limpar_versoes(blog_id, versao, anterior):
+    """Remove versões mais antigas que `versao`, menos a `anterior` (leitores podem estar nela)."""
+    # Leitores com mmap aberto continuam válidos mesmo após a remoção (Linux)
+    prefixo = f"blog_{blog_id}.v"
+    limite = _numero_versao(versao)
+    for nome in os.listdir(INDEX_DIR):
+        numero = _numero_versao(nome) if nome.startswith(prefixo) else None
+        if numero is not None and numero < limite and nome != anterior:
+            shutil.rmtree(os.path.join(INDEX_DIR, nome), ignore_errors=True)
+
+def construir_indice(blog_id, ids, textos):
+    """Gera e grava o índice do blog a partir de pares (id da captura, texto)."""
+    os.makedirs(INDEX_DIR, exist_ok=True)
+    with _trava(blog_id):
+        anterior = _versao_atual(blog_id)
+        versao = f"blog_{blog_id}.v{time.time_ns()}"
+        vec_path, ids_path, idf_path = _caminhos(versao)
+        os.makedirs(os.path.dirname(vec_path))
+
+        contagens = _contagens(textos)
+        df = np.count_nonzero(contagens, axis=0).astype(np.float32)
+        idf = np.log((1.0 + len(textos)) / (1.0 + df)) + 1.0
+
+        vetores = _normalizar(contagens) * idf
+        normas = np.linalg.norm(vetores, axis=1, keepdims=True)
+        normas[normas == 0] = 1.0
+        vetores /= normas
+
+        np.save(vec_path, vetores.astype(np.float32))
+        np.save(idf_path, idf.astype(np.float32))
+        np.save(ids_path, np.asarray(ids, dtype=np.int64))
+
+        # Troca atômica do ponteiro: a versão inteira passa a valer de uma vez
+        tmp = _ponteiro(blog_id) + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            f.write(versao)
+        os.replace(tmp, _ponteiro(blog_id))
+        _limpar_versoes(blog_id, versao, anterior)
+
+    with _lock:
+        _cache.pop(blog_id, None)
+    return len(ids)
+
+def _carregar(blog_id):
+    """Abre o índice via mmap, reaproveitando o cache enquanto a versão não mudar."""
+    versao = _versao_atual(blog_id)
+    if versao is None:
+        return None
+
+    with _lock:
+        item = _cache.get(blog_id)
+        if item and item[0] == versao:
+            return item[1]
+
+        vec_path, ids_path, idf_path = _caminhos(versao)
+        try:
+            indice = (
+                np.load(vec_path, mmap_mode="r"),
+                np.load(ids_path, mmap_mode="r"),
+                np.load(idf_path),
+            )
+        except (OSError, ValueError):
+            return None  # Versão removida entre ler o ponteiro e abrir os arquivos
+        if indice[0].shape[0] != indice[1].shape[0]:
+            print(f">>> [RADAR INDEX] Índice do blog {blog_id} inconsistente ({versao}), ignorando")
+            return None
+        _cache[blog_id] = (versao, indice)
+        return indice
+
+def buscar(blog_id, consulta, k=5):
+    """Top-k por similaridade de cosseno (força bruta). Retorna [(id, score)]."""
+    indice = _carregar(blog_id)
+    if indice is None or not consulta:
+        return []
+    vetores, ids, idf = indice
+    if len(ids) == 0:
+        return []
+
+    q = _normalizar(_contagens([consulta]))[0] * idf
+    norma = np.linalg.norm(q)
+    if norma == 0:
+        return []
+    q /= norma
+
+    scores = vetores @ q
+    k = min(k, len(scores))
+    topo = np.argpartition(-scores, k - 1)[:k]
+    topo = topo[np.argsort(-scores[topo])]
+    return [(int(ids[i]), float(scores[i])) for i in topo if scores[i] > 0]
+
+def reconstruir_indice_blog(blog_id):
+    """Relê as capturas do blog no banco e regrava o índice."""
+    from models import CapturedContent
+
+    capturas = CapturedContent.query.with_entities(
+        CapturedContent.id, CapturedContent.title, CapturedContent.content_summary
+    ).filter(CapturedContent.site_id == blog_id).order_by(CapturedContent.id.asc()).all()
+
+    ids = [c.id for c in capturas]
+    textos = [f"{c.title or ''}\n{c.content_summary or ''}" for c in capturas]
+    return construir_indice(blog_id, ids, textos)
+
+def buscar_insights_relevantes(blog_id, consulta, k=5):
+    """Devolve os CapturedContent mais relevantes para a consulta, em ordem de score."""
+    from models import CapturedContent
+
+    # Sem índice ainda: o scheduler constrói (reconstruir_indices_ausentes), não o request
+    resultados = buscar(blog_id, consulta, k)
+    if not resultados:
+        return []
+
+    ids = [r[0] for r in resultados]
+    por_id = {c.id: c for c in CapturedContent.query.filter(CapturedContent.id.in_(ids)).all()}
+    return [por_id[i] for i in ids if i in por_id]
+
+def reconstruir_indices_ausentes():
+    """
+    Constrói o índice dos blogs que têm capturas mas ainda não têm índice
+    (ou cujo ponteiro aponta para uma versão apagada). Requer app context.
+    """
+    from models import db, CapturedContent
+
+    blogs = [b for (b,) in db.session.query(CapturedContent.site_id).filter(
+        CapturedContent.site_id.isnot(None)).distinct()]
+    construidos = 0
+    for blog_id in blogs:
+        if _versao_atual(blog_id) is not None:
+            continue
+        try:
+            reconstruir_indice_blog(blog_id)
+            construidos += 1
+        except Exception as e:
+            print(f">>> [RADAR INDEX] Falha ao construir índice do blog {blog_id}: {e}")
+    return construidos
@@ -1,5 +1,6 @@
 import requests
 from bs4 import BeautifulSoup
+from services.token_service import truncar_por_tokens, SCRAPER_MAX_TOKENS
 
 def extrair_texto_da_url(url):
     """
@@ -15,24 +16,6 @@ def extrair_texto_da_url(url):
         'Referer': 'https://www.google.com/'
     }
 
-    # No scraper_service.py, dentro da função extrair_texto_da_url
-
-    # 1. Tags para remover completamente
-    tags_para_remover = [
-        'script', 'style', 'nav', 'footer', 'header', 'aside', 
-        'form', 'iframe', 'noscript', 'svg', 'button'
-    ]
-    for element in soup(tags_para_remover):
-        element.decompose()
-
-    # 2. Remover classes e IDs comuns de publicidade e menus (Opcional, mas potente)
-    lixo_seletivo = [
-        'cookie', 'banner', 'ads', 'sidebar', 'social-share', 'menu'
-    ]
-    for tag in soup.find_all(True, {'class': True}):
-        if any(lixo in ' '.join(tag['class']).lower() for lixo in lixo_seletivo):
-            tag.decompose()
-
     try:
         # Timeout curto para não travar o sistema (15 segundos)
         response = requests.get(url, headers=headers, timeout=15)
@@ -43,10 +26,24 @@ def extrair_texto_da_url(url):
         
         soup = BeautifulSoup(response.text, 'html.parser')
 
-        # Remove elementos irrelevantes para o post
-        for element in soup(['script', 'style', 'nav', 'footer', 'header', 'aside', 'form']):
+        # 1. Tags para remover completamente
+        tags_para_remover = [
+            'script', 'style', 'nav', 'footer', 'header', 'aside', 
+            'form', 'iframe', 'noscript', 'svg', 'button'
+        ]
+        for element in soup(tags_para_remover):
             element.decompose()
 
+        # 2. Remover classes e IDs comuns de publicidade e menus (Opcional, mas potente)
+        lixo_seletivo = [
+            'cookie', 'banner', 'ads', 'sidebar', 'social-share', 'menu'
+        ]
+        for tag in soup.find_all(True, {'class': True}):
+            if tag.decomposed or not tag.attrs:
+                continue
+            if any(lixo in ' '.join(tag.get('class', [])).lower() for lixo in lixo_seletivo):
+                tag.decompose()
+
         # Pega o texto limpo
         texto = soup.get_text(separator=' ')
         
@@ -55,7 +52,8 @@ def extrair_texto_da_url(url):
         chunks = (phrase.strip() for line in linhas for phrase in line.split("  "))
         texto_limpo = '\n'.join(chunk for chunk in chunks if chunk)
 
-        return texto_limpo[:10000] # Limite de segurança para a API de IA
+        # Limite de segurança para a API de IA (em tokens, cortando no fim de frase)
+        return truncar_por_tokens(texto_limpo, SCRAPER_MAX_TOKENS)
 
     except Exception as e:
         print(f">>> [ERRO SCRAPER] Falha ao ler {url}: {str(e)}")
@@ -0,0 +1,221 @@
+import os
+import calendar
+import hashlib
+import pytz
+from datetime import datetime, timedelta, time as dtime
+from dotenv import load_dotenv
+from sqlalchemy.orm import joinedload
+from models import db, Blog, User, ContentIdea, PostSlot
+
+load_dotenv()
+
+# Planejador de horários de publicação.
+# Cada blog ganha linhas em post_slot (UTC) para hoje e amanhã no fuso dele:
+# posts_per_day horários espaçados igualmente em 24h a partir de schedule_time
+# (o horário nominal), depois espalhados para não concentrar a frota.
+# O enfileirador pega os slots vencidos, inclusive os que passaram enquanto o
+# scheduler estava parado (dentro da janela de recuperação), e move a próxima
+# ideia 'draft' do blog para 'pending'.
+PLANNER_DAYS = int(os.environ.get("PLANNER_DAYS", 2))
+PLANNER_CATCHUP_HOURS = float(os.environ.get("PLANNER_CATCHUP_HOURS", 6))
+PLANNER_MAX_SLOTS_PER_DAY = int(os.environ.get("PLANNER_MAX_SLOTS_PER_DAY", 48))
+PLANNER_RETENTION_DAYS = int(os.environ.get("PLANNER_RETENTION_DAYS", 30))
+
+# Espalhamento: quase todo blog usa o schedule_time padrão (09:00), o que
+# empilha a frota inteira no mesmo minuto. Cada slot ganha um jitter fixo
+# (derivado do blog/dia/posição, estável entre replanejamentos) e vai para a
+# faixa de SLOT_BUCKET_MINUTES menos cheia dentro da tolerância, usando o
+# histograma de slots já planejados de todos os blogs. SLOT_BUCKET_CAPACITY é
+# quanto a fila publica por faixa (1 post a cada 30 s = 10 em 5 min).
+SLOT_JITTER_MINUTES = float(os.environ.get("SLOT_JITTER_MINUTES", 5))
+SLOT_TOLERANCE_MINUTES = float(os.environ.get("SLOT_TOLERANCE_MINUTES", 30))
+SLOT_BUCKET_MINUTES = int(os.environ.get("SLOT_BUCKET_MINUTES", 5))
+SLOT_BUCKET_CAPACITY = int(os.environ.get("SLOT_BUCKET_CAPACITY", 10))
+FUSO_PADRAO = 'America/Sao_Paulo'
+
+def _fuso(blog):
+    try:
+        return pytz.timezone(blog.timezone or FUSO_PADRAO)
+    except pytz.UnknownTimeZoneError:
+        return pytz.timezone(FUSO_PADRAO)
+
+def _hora_base(blog):
+    try:
+        hora, minuto = (int(p) for p in (blog.schedule_time or "09:00").split(":")[:2])
+        return dtime(hora, minuto)
+    except ValueError:
+        return dtime(9, 0)
+
+def posts_por_dia(blog):
+    """posts_per_day do blog, limitado pelo plano do dono."""
+    quantidade = blog.posts_per_day or 1
+    plano = blog.owner.plan if blog.owner else None
+    if plano and plano.posts_per_day:
+        quantidade = min(quantidade, plano.posts_per_day)
+    return max(1, min(quantidade, PLANNER_MAX_SLOTS_PER_DAY))
+
+def horarios_do_dia(blog, dia_local, quantidade=None):
+    """Horários (UTC, sem tzinfo) dos posts do blog no dia local informado."""
+    quantidade = quantidade or posts_por_dia(blog)
+    fuso = _fuso(blog)
+    base = datetime.combine(dia_local, _hora_base(blog))
+    intervalo = timedelta(hours=24) / quantidade
+    return [
+        fuso.normalize(fuso.localize(base + i * intervalo)).astimezone(pytz.utc).replace(tzinfo=None)
+        for i in range(quantidade)
+    ]
+
+def _faixa(momento):
+    # momento é UTC naive: timegm não passa pelo fuso do host (timestamp() passaria)
+    return calendar.timegm(momento.timetuple()) // (SLOT_BUCKET_MINUTES * 60)
+
+def _inicio_faixa(faixa):
+    return datetime.utcfromtimestamp(faixa * SLOT_BUCKET_MINUTES * 60)
+
+def _fracao(*chave):
+    """Número em [0, 1) fixo para a chave (o mesmo slot sempre recebe o mesmo jitter)."""
+    h = hashlib.blake2b(":".join(map(str, chave)).encode(), digest_size=8).digest()
+    return int.from_bytes(h, "big") / 2 ** 64
+
+def histograma_carga(inicio, fim):
+    """{faixa: slots planejados/enfileirados} de toda a frota entre inicio e fim (UTC)."""
+    carga = {}
+    for (slot_at,) in db.session.query(PostSlot.slot_at).filter(
+            PostSlot.status.in_(['planned', 'enqueued']),
+            PostSlot.slot_at >= inicio, PostSlot.slot_at <= fim):
+        faixa = _faixa(slot_at)
+        carga[faixa] = carga.get(faixa, 0) + 1
+    return carga
+
+def espalhar(nominal, chave, carga, tolerancia=None):
+    """
+    Horário real do slot: nominal + jitter, movido para a faixa mais próxima
+    com folga (< SLOT_BUCKET_CAPACITY) dentro de ±tolerância; se todas
+    estiverem cheias, a menos carregada. Atualiza `carga`.
+    """
+    tolerancia = timedelta(minutes=SLOT_TOLERANCE_MINUTES if tolerancia is None else tolerancia)
+    jitter = timedelta(minutes=SLOT_JITTER_MINUTES) * (2 * _fracao("jitter", *chave) - 1)
+    jitter = max(-tolerancia, min(tolerancia, jitter))
+    alvo = nominal + jitter
+
+    primeira, ultima = _faixa(nominal - tolerancia), _faixa(nominal + tolerancia)
+    faixas = sorted(range(primeira, ultima + 1), key=lambda f: abs(f - _faixa(alvo)))
+    livres = [f for f in faixas if carga.get(f, 0) < SLOT_BUCKET_CAPACITY]
+    escolhida = livres[0] if livres else min(faixas, key=lambda f: carga.get(f, 0))
+
+    if escolhida == _faixa(alvo):
+        horario = alvo
+    else:
+        # Posição fixa dentro da faixa escolhida, sem sair da tolerância
+        horario = _inicio_faixa(escolhida) + timedelta(minutes=SLOT_BUCKET_MINUTES) * _fracao("faixa", *chave)
+        horario = max(nominal - tolerancia, min(nominal + tolerancia, horario))
+    horario = horario.replace(microsecond=0)
+    carga[_faixa(horario)] = carga.get(_faixa(horario), 0) + 1
+    return horario
+
+def planejar_slots(agora=None, dias=None):
+    """
+    Materializa (idempotente) os slots de hoje e dos próximos dias de cada blog
+    e ajusta os ainda 'planned' se schedule_time/posts_per_day mudaram.
+    Requer app context. Devolve quantos slots foram criados.
+    """
+    agora = agora or datetime.utcnow()
+    dias = dias or PLANNER_DAYS
+    recuperacao = agora - timedelta(hours=PLANNER_CATCHUP_HOURS)
+
+    existentes = {}
+    for slot in PostSlot.query.filter(PostSlot.local_date >= agora.date() - timedelta(days=2)):
+        existentes[(slot.blog_id, slot.local_date, slot.position)] = slot
+
+    # Primeiro calcula os horários nominais; depois espalha em ordem de horário,
+    # para que a disputa pelas faixas não dependa da ordem dos blogs
+    novos, mudados = [], []
+    for blog in Blog.query.options(joinedload(Blog.owner).joinedload(User.plan)):
+        hoje_local = pytz.utc.localize(agora).astimezone(_fuso(blog)).date()
+        quantidade = posts_por_dia(blog)
+        # Tolerância menor que meio intervalo: os posts do dia não trocam de ordem
+        tolerancia = min(SLOT_TOLERANCE_MINUTES, 24 * 60 / quantidade / 2 - 1)
+        # Começa em ontem: com vários posts por dia os últimos horários de ontem
+        # podem cair na madrugada de hoje
+        for d in range(-1, dias):
+            dia = hoje_local + timedelta(days=d)
+            for posicao, nominal in enumerate(horarios_do_dia(blog, dia, quantidade)):
+                atual = existentes.pop((blog.id, dia, posicao), None)
+                if atual is None:
+                    # Horário que já passou além da janela de recuperação não é criado
+                    # (ex.: blog cadastrado à tarde não publica o post das 09:00)
+                    if nominal >= recuperacao:
+                        novos.append((nominal, blog.id, dia, posicao, tolerancia))
+                elif (atual.status == 'planned' and (atual.nominal_at or atual.slot_at) != nominal
+                      and nominal > agora):
+                    mudados.append((nominal, atual, tolerancia))
+
+    carga = histograma_carga(agora - timedelta(days=1), agora + timedelta(days=dias + 1))
+    for nominal, atual, tolerancia in sorted(mudados, key=lambda m: m[0]):
+        faixa_antiga = _faixa(atual.slot_at)
+        carga[faixa_antiga] = max(0, carga.get(faixa_antiga, 0) - 1)
+        atual.nominal_at = nominal
+        atual.slot_at = espalhar(nominal, (atual.blog_id, atual.local_date, atual.position), carga, tolerancia)
+
+    criados = 0
+    for nominal, blog_id, dia, posicao, tolerancia in sorted(novos, key=lambda n: n[0]):
+        slot_at = espalhar(nominal, (blog_id, dia, posicao), carga, tolerancia)
+        db.session.add(PostSlot(blog_id=blog_id, local_date=dia, position=posicao, nominal_at=nominal, slot_at=slot_at))
+        criados += 1
+
+    # Sobras: posições além do novo posts_per_day (ou blogs removidos) que ainda não venceram
+    for slot in existentes.values():
+        if slot.status == 'planned' and slot.slot_at > agora:
+            db.session.delete(slot)
+
+    PostSlot.query.filter(
+        PostSlot.local_date < agora.date() - timedelta(days=PLANNER_RETENTION_DAYS)
+    ).delete(synchronize_session=False)
+    db.session.commit()
+    return criados
+
+def enfileirar_slots_vencidos(agora=None):
+    """
+    Para cada slot vencido, coloca a próxima ideia draft do blog na fila.
+    Slots vencidos há mais de PLANNER_CATCHUP_HOURS viram 'missed'.
+    Requer app context. Devolve quantas ideias foram enfileiradas.
+    """
+    agora = agora or datetime.utcnow()
+    recuperacao = agora - timedelta(hours=PLANNER_CATCHUP_HOURS)
+    vencidos = (PostSlot.query
+                .filter(PostSlot.status == 'planned', PostSlot.slot_at <= agora)
+                .order_by(PostSlot.slot_at.asc(), PostSlot.id.asc())
+                .all())
+
+    enfileiradas = 0
+    for slot in vencidos:
+        if slot.slot_at < recuperacao:
+            slot.status = 'missed'
+            db.session.commit()
+            continue
+
+        proxima = ContentIdea.query.filter_by(
+            blog_id=slot.blog_id,
+            status='draft',
+            is_posted=False
+        ).order_by(ContentIdea.created_at.asc()).first()
+
+        if not proxima:
+            slot.status = 'skipped'
+            print(f">>> [AGENDADOR] Slot {slot.slot_at:%d/%m %H:%M} UTC do blog {slot.blog_id} sem ideia disponível.")
+        else:
+            print(f">>> [AGENDADOR] Slot {slot.slot_at:%d/%m %H:%M} UTC: '{proxima.title}' (blog {slot.blog_id}) para a fila")
+            proxima.status = 'pending'
+            proxima.enqueued_at = datetime.utcnow()  # Ordem da fila e métrica enqueue -> publish
+            slot.status = 'enqueued'
+            slot.idea_id = proxima.id
+            enfileiradas += 1
+        db.session.commit()
+    return enfileiradas
+
+def slots_planejados_ate(ate):
+    """Slots ainda 'planned' que vencem até `ate` (inclusive os já vencidos), em ordem."""
+    return (PostSlot.query
+            .filter(PostSlot.status == 'planned', PostSlot.slot_at <= ate)
+            .order_by(PostSlot.slot_at.asc(), PostSlot.id.asc())
+            .all())
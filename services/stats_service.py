@@ -0,0 +1,142 @@
+import os
+import time
+from datetime import datetime, date, timedelta
+from dotenv import load_dotenv
+from models import db, User, Blog, Plan, PostLog, ApiUsage, DailyStat
+
+load_dotenv()
+
+# Estatísticas do painel admin.
+# O scheduler recalcula só os dias "abertos" (hoje e ontem) e grava em
+# daily_stats; cada agregação filtra por created_at/posted_at indexados, então
+# o custo é o volume do dia, não o histórico inteiro. O painel lê a tabela
+# pequena através de um cache por processo.
+STATS_CACHE_TTL = float(os.environ.get("STATS_CACHE_TTL", 60))
+STATS_DIAS_GRAFICO = int(os.environ.get("STATS_DIAS_GRAFICO", 90))
+
+_cache_painel = {"expira": 0.0, "dados": None}
+
+def _intervalo(dia):
+    inicio = datetime.combine(dia, datetime.min.time())
+    return inicio, inicio + timedelta(days=1)
+
+def _metricas_do_dia(dia):
+    """Contagens de um dia (UTC). Cada consulta usa o índice de data da tabela."""
+    inicio, fim = _intervalo(dia)
+    metricas = {}
+
+    metricas["users.new"] = db.session.query(db.func.count(User.id)).filter(
+        User.created_at >= inicio, User.created_at < fim).scalar() or 0
+    metricas["blogs.new"] = db.session.query(db.func.count(Blog.id)).filter(
+        Blog.created_at >= inicio, Blog.created_at < fim).scalar() or 0
+
+    total_posts = 0
+    for status, total in (db.session.query(PostLog.status, db.func.count(PostLog.id))
+                          .filter(PostLog.posted_at >= inicio, PostLog.posted_at < fim)
+                          .group_by(PostLog.status)):
+        metricas[f"posts.{status or 'desconhecido'}"] = total
+        total_posts += total
+    metricas["posts.total"] = total_posts
+
+    for api_name, tokens, imagens in (db.session.query(
+                ApiUsage.api_name,
+                db.func.sum(ApiUsage.tokens_used),
+                db.func.sum(ApiUsage.images))
+            .filter(ApiUsage.created_at >= inicio, ApiUsage.created_at < fim)
+            .group_by(ApiUsage.api_name)):
+        metricas[f"tokens.{api_name}"] = int(tokens or 0)
+        if imagens:
+            metricas[f"images.{api_name}"] = int(imagens)
+
+    return metricas
+
+# Retratos do dia: gravados enquanto o dia está aberto; depois da meia-noite a
+# linha de ontem fica como o valor de fechamento e não é mais recalculada.
+RETRATOS = ("users.total", "blogs.total", "mrr.cents")
+
+def _retrato_atual():
+    """Totais do momento (gravados na linha de hoje, não somados entre dias)."""
+    receita = db.session.query(db.func.sum(Plan.price)).join(User, User.plan_id == Plan.id).scalar() or 0
+    return {
+        "users.total": db.session.query(db.func.count(User.id)).scalar() or 0,
+        "blogs.total": db.session.query(db.func.count(Blog.id)).scalar() or 0,
+        "mrr.cents": int(round(receita * 100)),
+    }
+
+def atualizar_rollup(dias=2, hoje=None):
+    """
+    Recalcula os últimos `dias` dias (padrão: ontem e hoje, para cobrir a
+    virada da meia-noite e linhas gravadas com atraso). Requer app context.
+    """
+    hoje = hoje or datetime.utcnow().date()
+    agora = datetime.utcnow()
+    linhas = []
+    for i in range(dias - 1, -1, -1):
+        dia = hoje - timedelta(days=i)
+        metricas = _metricas_do_dia(dia)
+        if dia == hoje:
+            metricas.update(_retrato_atual())
+        linhas += [{"day": dia, "metric": m, "value": v, "updated_at": agora} for m, v in metricas.items()]
+
+    inicio = hoje - timedelta(days=dias - 1)
+    # Troca as linhas dos dias recalculados numa única transação (menos os retratos de dias fechados)
+    DailyStat.query.filter(
+        DailyStat.day >= inicio, DailyStat.day <= hoje,
+        db.or_(DailyStat.day == hoje, DailyStat.metric.notin_(RETRATOS))
+    ).delete(synchronize_session=False)
+    if linhas:
+        db.session.execute(DailyStat.__table__.insert(), linhas)
+    db.session.commit()
+    invalidar_cache_painel()
+    return len(linhas)
+
+def invalidar_cache_painel():
+    _cache_painel["expira"] = 0.0
+
+def _series(linhas, dias, hoje):
+    """{métrica: [valor por dia]} alinhado com a lista de dias (zeros onde não há linha)."""
+    datas = [hoje - timedelta(days=i) for i in range(dias - 1, -1, -1)]
+    posicao = {d: i for i, d in enumerate(datas)}
+    series = {}
+    for dia, metrica, valor in linhas:
+        if isinstance(dia, str):  # SQLite sem tipo DATE nativo
+            dia = date.fromisoformat(dia)
+        if dia in posicao:
+            series.setdefault(metrica, [0] * dias)[posicao[dia]] = valor
+    return datas, series
+
+def resumo_painel(dias=None):
+    """
+    Cartões e séries do painel admin, lidos de daily_stats.
+    Cache de STATS_CACHE_TTL segundos por processo. Se o rollup ainda não
+    rodou hoje (ex.: scheduler parado), calcula o dia atual na hora.
+    """
+    if _cache_painel["dados"] and _cache_painel["expira"] > time.monotonic():
+        return _cache_painel["dados"]
+
+    dias = dias or STATS_DIAS_GRAFICO
+    hoje = datetime.utcnow().date()
+    if not DailyStat.query.filter_by(day=hoje, metric="users.total").first():
+        atualizar_rollup(dias=1, hoje=hoje)
+
+    linhas = db.session.query(DailyStat.day, DailyStat.metric, DailyStat.value).filter(
+        DailyStat.day > hoje - timedelta(days=dias)).all()
+    datas, series = _series(linhas, dias, hoje)
+
+    def ultimo(metrica):
+        return series.get(metrica, [0])[-1]
+
+    dados = {
+        "total_users": ultimo("users.total"),
+        "total_blogs": ultimo("blogs.total"),
+        "posts_today": ultimo("posts.total"),
+        "new_users_week": sum(series.get("users.new", [0])[-7:]),
+        "revenue": f"{ultimo('mrr.cents') / 100:.2f}",
+        "dias": [d.strftime("%d/%m") for d in datas],
+        "series": series,
+        "provedores": sorted(m.split(".", 1)[1] for m in series if m.startswith("tokens.")),
+        "atualizado_em": datetime.utcnow(),
+    }
+    _cache_painel["dados"] = dados
+    _cache_painel["expira"] = time.monotonic() + STATS_CACHE_TTL
+    return dados
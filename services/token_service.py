@@ -0,0 +1,122 @@
+import os
+import re
+import threading
+import tiktoken
+from dotenv import load_dotenv
+from services.metrics_service import PROMPT_TOKENS
+
+load_dotenv()
+
+# Janela de contexto (tokens) dos modelos que usamos. Modelos fora da lista
+# caem no DEFAULT_CONTEXT_WINDOW.
+CONTEXT_WINDOWS = {
+    "llama-3.3-70b-versatile": 128000,
+    "llama-3.1-70b-versatile": 128000,
+    "llama-3.1-70b-specdec": 8192,
+    "llama-3.1-8b-instant": 128000,
+    "llama3-70b-8192": 8192,
+    "llama3-8b-8192": 8192,
+    "mixtral-8x7b-32768": 32768,
+    "gpt-4o": 128000,
+    "gpt-4o-mini": 128000,
+}
+DEFAULT_CONTEXT_WINDOW = int(os.environ.get("DEFAULT_CONTEXT_WINDOW", 8192))
+
+# Orçamentos por uso (tokens reservados para o texto de contexto no prompt)
+RADAR_CONTEXT_TOKENS = int(os.environ.get("RADAR_CONTEXT_TOKENS", 1000))
+SPY_CONTEXT_TOKENS = int(os.environ.get("SPY_CONTEXT_TOKENS", 6000))
+SCRAPER_MAX_TOKENS = int(os.environ.get("SCRAPER_MAX_TOKENS", 8000))
+# Espaço deixado para a resposta do modelo
+OUTPUT_RESERVE_TOKENS = int(os.environ.get("OUTPUT_RESERVE_TOKENS", 2048))
+
+_encodings = {}
+_lock = threading.Lock()
+
+_FIM_DE_FRASE = re.compile(r"(?<=[.!?…])\s+|\n+")
+
+def _encoding(model=None):
+    """Tokenizer do modelo; Llama/Groq não existem no tiktoken, então usamos cl100k_base."""
+    nome = model or "default"
+    with _lock:
+        if nome in _encodings:
+            return _encodings[nome]
+    try:
+        try:
+            enc = tiktoken.encoding_for_model(model) if model else tiktoken.get_encoding("cl100k_base")
+        except KeyError:
+            enc = tiktoken.get_encoding("cl100k_base")
+    except Exception as e:
+        # Sem acesso ao arquivo BPE (ex.: servidor offline): contamos por estimativa
+        print(f">>> [TOKENS] tiktoken indisponível ({e.__class__.__name__}); usando estimativa por caracteres.")
+        enc = None
+    with _lock:
+        _encodings[nome] = enc
+    return enc
+
+def contar_tokens(texto, model=None):
+    if not texto:
+        return 0
+    enc = _encoding(model)
+    if enc is None:
+        return len(texto) // 4 + 1
+    return len(enc.encode(texto, disallowed_special=()))
+
+def janela_contexto(model):
+    return CONTEXT_WINDOWS.get(model, DEFAULT_CONTEXT_WINDOW)
+
+def orcamento_prompt(model):
+    """Tokens disponíveis para o prompt (janela do modelo menos a reserva de saída)."""
+    return max(janela_contexto(model) - OUTPUT_RESERVE_TOKENS, 512)
+
+def truncar_por_tokens(texto, max_tokens, model=None):
+    """
+    Corta o texto para caber em max_tokens, sempre no fim de uma frase.
+    Devolve um prefixo do original, então parágrafos e quebras de linha ficam intactos.
+    Se a primeira frase sozinha já estourar, faz o corte seco nos tokens.
+    """
+    if not texto or contar_tokens(texto, model) <= max_tokens:
+        return texto
+
+    cortes = []
+    usados = inicio = 0
+    for fim in [m.start() for m in _FIM_DE_FRASE.finditer(texto)] + [len(texto)]:
+        custo = contar_tokens(texto[inicio:fim], model)
+        if usados + custo > max_tokens:
+            break
+        usados += custo
+        inicio = fim
+        if texto[:fim].strip():
+            cortes.append(fim)
+
+    # A soma por trechos pode diferir do texto inteiro em um ou outro token
+    while cortes and contar_tokens(texto[:cortes[-1]], model) > max_tokens:
+        cortes.pop()
+    if cortes:
+        return texto[:cortes[-1]]
+
+    enc = _encoding(model)
+    if enc is None:
+        return texto[:max_tokens * 4]
+    return enc.decode(enc.encode(texto, disallowed_special=())[:max_tokens])
+
+def registrar_tamanho_prompt(model, tokens):
+    """Registra o tamanho do prompt enviado no histograma por modelo (/metrics)."""
+    PROMPT_TOKENS.labels(model=model or "desconhecido").observe(tokens)
+
+def preparar_prompt(prompt, system_prompt, model):
+    """
+    Checagem antes do envio: se system + prompt não couber na janela do modelo,
+    apara o prompt no fim de frase. Registra o tamanho final e devolve (prompt, tokens).
+    """
+    tokens_system = contar_tokens(system_prompt, model)
+    limite = orcamento_prompt(model) - tokens_system
+    tokens_prompt = contar_tokens(prompt, model)
+
+    if tokens_prompt > limite:
+        print(f">>> [TOKENS] Prompt com {tokens_prompt} tokens excede o orçamento de {limite} ({model}); aparando.")
+        prompt = truncar_por_tokens(prompt, limite, model)
+        tokens_prompt = contar_tokens(prompt, model)
+
+    total = tokens_system + tokens_prompt
+    registrar_tamanho_prompt(model, total)
+    return prompt, total
@@ -0,0 +1,100 @@
+import os
+import time
+import uuid
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import datetime, timedelta
+from dotenv import load_dotenv
+from models import db, TraceSpan
+
+load_dotenv()
+
+# Trace leve do fluxo de publicação: cada tentativa de publicar uma ideia
+# ganha um trace_id e cada etapa vira um span cronometrado. Os spans ficam
+# em memória durante o fluxo e são gravados numa única inserção no final.
+TRACE_RETENTION_DAYS = int(os.environ.get("TRACE_RETENTION_DAYS", 30))
+
+_trace_atual = ContextVar("trace_publicacao", default=None)
+
+def trace_id_atual():
+    trace = _trace_atual.get()
+    return trace["trace_id"] if trace else None
+
+@contextmanager
+def iniciar_trace(idea_id=None):
+    """Abre um trace para a ideia. Se já houver um ativo, reaproveita (não aninha traces)."""
+    if _trace_atual.get() is not None:
+        yield _trace_atual.get()["trace_id"]
+        return
+
+    trace = {"trace_id": uuid.uuid4().hex, "idea_id": idea_id, "inicio": time.perf_counter(), "profundidade": 0, "spans": []}
+    token = _trace_atual.set(trace)
+    try:
+        yield trace["trace_id"]
+    finally:
+        _trace_atual.reset(token)
+        _gravar(trace)
+
+@contextmanager
+def span(nome, info=None):
+    """
+    Cronometra uma etapa dentro do trace atual (sem trace ativo não faz nada).
+    Devolve um dict mutável: quem chama pode ajustar 'status' e 'info'.
+    Exceções marcam o span como 'error' e seguem adiante.
+    """
+    trace = _trace_atual.get()
+    dados = {"status": "ok", "info": info}
+    if trace is None:
+        yield dados
+        return
+
+    inicio = time.perf_counter()
+    profundidade = trace["profundidade"]
+    trace["profundidade"] += 1
+    try:
+        yield dados
+    except Exception as e:
+        dados["status"] = "error"
+        dados["info"] = dados["info"] or f"{type(e).__name__}: {e}"
+        raise
+    finally:
+        trace["profundidade"] -= 1
+        trace["spans"].append({
+            "trace_id": trace["trace_id"],
+            "idea_id": trace["idea_id"],
+            "name": nome,
+            "depth": profundidade,
+            "start_ms": int((inicio - trace["inicio"]) * 1000),
+            "duration_ms": int((time.perf_counter() - inicio) * 1000),
+            "status": dados["status"],
+            "info": str(dados["info"])[:255] if dados["info"] is not None else None,
+            "created_at": datetime.utcnow(),
+        })
+
+def _gravar(trace):
+    if not trace["spans"]:
+        return
+    try:
+        # Conexão própria: não depende do estado da sessão do fluxo (que pode ter feito rollback)
+        with db.engine.begin() as conn:
+            conn.execute(TraceSpan.__table__.insert(), sorted(trace["spans"], key=lambda s: s["start_ms"]))
+    except Exception as e:
+        print(f">>> [TRACE] Falha ao gravar spans do trace {trace['trace_id']}: {e}")
+
+def listar_traces_recentes(limite=50):
+    """Um resumo por trace (span raiz): ideia, início, duração total e status."""
+    return (TraceSpan.query
+            .filter(TraceSpan.depth == 0)
+            .order_by(TraceSpan.id.desc())
+            .limit(limite)
+            .all())
+
+def carregar_trace(trace_id):
+    return TraceSpan.query.filter_by(trace_id=trace_id).order_by(TraceSpan.start_ms.asc(), TraceSpan.depth.asc()).all()
+
+def limpar_traces_antigos(dias=None):
+    """Remove spans mais velhos que TRACE_RETENTION_DAYS. Requer app context."""
+    limite = datetime.utcnow() - timedelta(days=dias or TRACE_RETENTION_DAYS)
+    removidos = TraceSpan.query.filter(TraceSpan.created_at < limite).delete(synchronize_session=False)
+    db.session.commit()
+    return removidos
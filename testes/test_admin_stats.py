@@ -0,0 +1,71 @@
+import sys
+import os
+
+# Adiciona a raiz do projeto ao path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from datetime import datetime, timedelta
+from flask import Flask
+from models import db, Plan, User, Blog, PostLog, ApiUsage, DailyStat
+from services import stats_service
+
+def _app_teste():
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite://'
+    db.init_app(app)
+    return app
+
+def test_rollup_diario_e_painel():
+    print("\n=== TESTE DO ROLLUP DO PAINEL ADMIN ===")
+    app = _app_teste()
+    with app.app_context():
+        db.create_all()
+        plano = Plan(name="Pro", price=49.9)
+        db.session.add(plano)
+        db.session.flush()
+        user = User(name="t", email="t@example.com", password="x", plan_id=plano.id)
+        db.session.add(user)
+        db.session.flush()
+        blog = Blog(user_id=user.id, site_name="b", wp_url="http://b", wp_user="u", wp_app_password="p")
+        db.session.add(blog)
+        ontem = datetime.utcnow() - timedelta(days=1)
+        db.session.add_all([
+            PostLog(blog_id=1, title="1", status="Publicado"),
+            PostLog(blog_id=1, title="2", status="Erro"),
+            PostLog(blog_id=1, title="3", status="Publicado", posted_at=ontem),
+            ApiUsage(user_id=user.id, api_name="Groq", feature="Post-IA", tokens_used=1200),
+        ])
+        db.session.commit()
+
+        stats_service.atualizar_rollup()
+        hoje = {s.metric: s.value for s in DailyStat.query.filter_by(day=datetime.utcnow().date())}
+        print(f"Hoje: {hoje}")
+        assert hoje["posts.total"] == 2 and hoje["posts.Publicado"] == 1 and hoje["posts.Erro"] == 1
+        assert hoje["tokens.Groq"] == 1200 and hoje["users.new"] == 1
+        assert hoje["mrr.cents"] == 4990
+
+        dados = stats_service.resumo_painel()
+        assert dados["total_users"] == 1 and dados["posts_today"] == 2 and dados["revenue"] == "49.90"
+        assert len(dados["series"]["posts.Publicado"]) == stats_service.STATS_DIAS_GRAFICO
+        assert dados["series"]["posts.Publicado"][-2:] == [1, 1]
+        assert dados["provedores"] == ["Groq"]
+
+        # Dentro do TTL o painel não consulta o banco de novo
+        db.session.add(PostLog(blog_id=1, title="4", status="Publicado"))
+        db.session.commit()
+        assert stats_service.resumo_painel()["posts_today"] == 2
+        stats_service.atualizar_rollup()
+        assert stats_service.resumo_painel()["posts_today"] == 3
+
+        # Virada do dia: o retrato de ontem fica como fechamento, com as métricas recalculadas
+        amanha = datetime.utcnow().date() + timedelta(days=1)
+        db.session.add(User(name="u2", email="u2@example.com", password="x", plan_id=plano.id))
+        db.session.commit()
+        stats_service.atualizar_rollup(hoje=amanha)
+        fechado = {s.metric: s.value for s in DailyStat.query.filter_by(day=datetime.utcnow().date())}
+        assert fechado["users.total"] == 1 and fechado["mrr.cents"] == 4990 and fechado["posts.total"] == 3
+        assert DailyStat.query.filter_by(day=amanha, metric="users.total").first().value == 2
+    print("✅ Rollup por dia, séries de 90 dias e cache do painel.")
+
+if __name__ == "__main__":
+    test_rollup_diario_e_painel()
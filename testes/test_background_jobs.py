@@ -0,0 +1,116 @@
+import sys
+import os
+import io
+import tempfile
+from datetime import datetime, timedelta
+
+# Adiciona a raiz do projeto ao path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from flask import Flask
+from werkzeug.datastructures import FileStorage
+from models import db, Plan, User, BackgroundJob
+from services import job_service
+
+def _app_teste():
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite://'
+    db.init_app(app)
+    return app
+
+def _usuario(creditos):
+    plano = Plan(name="Pro")
+    db.session.add(plano)
+    db.session.flush()
+    user = User(name="t", email="t@example.com", password="x", plan_id=plano.id, credits=creditos)
+    db.session.add(user)
+    db.session.commit()
+    return user
+
+def test_spy_writer_roda_no_worker_e_estorna_na_falha():
+    print("\n=== TESTE DOS JOBS: SPY WRITER ===")
+    respostas = {"http://ok": {"title": "Novo", "content": "<p>texto</p>"}, "http://vazio": None}
+    job_service.content_service.analyze_spy_link = lambda url, is_demo=False: respostas[url]
+
+    app = _app_teste()
+    with app.app_context():
+        db.create_all()
+        user = _usuario(creditos=10)
+
+        ok = job_service.criar_job(user.id, "spy_writer", url="http://ok")
+        assert job_service.job_para_json(ok)["status"] == "queued"
+        assert job_service.processar_jobs()
+        estado = job_service.job_para_json(db.session.get(BackgroundJob, ok.id))
+        assert estado["status"] == "done" and estado["finished"]
+        assert estado["result"] == {"title": "Novo", "content": "<p>texto</p>"}
+
+        # A rota debitou 2 créditos antes de criar o job; a falha devolve
+        user.consume_credit(2, reason="Spy Writer")
+        falha = job_service.criar_job(user.id, "spy_writer", url="http://vazio")
+        assert job_service.processar_jobs()
+        assert db.session.get(BackgroundJob, falha.id).status == "failed"
+        assert db.session.get(User, user.id).credits == 10
+
+        assert not job_service.processar_jobs()  # Fila vazia
+
+def test_post_manual_recebe_o_upload_e_apaga_o_arquivo():
+    print("\n=== TESTE DOS JOBS: POST MANUAL ===")
+    job_service.JOBS_UPLOAD_DIR = tempfile.mkdtemp()
+    recebido = {}
+
+    def publicar(user, site_id, title, content, action, image_file=None):
+        recebido.update(site_id=site_id, action=action, imagem=image_file.read(), nome=image_file.filename)
+        return True, "Sucesso! O post foi enviado como Publicado."
+    job_service.content_service.process_manual_post = publicar
+
+    app = _app_teste()
+    with app.app_context():
+        db.create_all()
+        user = _usuario(creditos=0)
+        upload = FileStorage(stream=io.BytesIO(b"\x89PNG dados"), filename="../foto final.png", content_type="image/png")
+        imagem = job_service.salvar_upload(upload)
+        assert os.path.dirname(imagem["caminho"]) == job_service.JOBS_UPLOAD_DIR
+
+        job = job_service.criar_job(user.id, "manual_post", site_id="3", title="T", content="C",
+                                    action="now", imagem=imagem)
+        assert job_service.processar_jobs()
+
+        assert db.session.get(BackgroundJob, job.id).status == "done"
+        assert recebido == {"site_id": "3", "action": "now", "imagem": b"\x89PNG dados", "nome": "foto_final.png"}
+        assert not os.path.exists(imagem["caminho"])
+
+def test_limpeza_encerra_jobs_esgotados_e_estorna_uma_vez():
+    print("\n=== TESTE DOS JOBS: TEMPO ESGOTADO ===")
+    agora = datetime(2026, 3, 10, 12, 0)
+    app = _app_teste()
+    with app.app_context():
+        db.create_all()
+        user = _usuario(creditos=6)
+        for _ in range(3):
+            user.consume_credit(2, reason="Spy Writer")
+
+        rodando = job_service.criar_job(user.id, "spy_writer", url="http://lento")
+        rodando.status, rodando.started_at = 'running', agora - timedelta(minutes=job_service.JOB_TIMEOUT_MIN + 1)
+        na_fila = job_service.criar_job(user.id, "spy_writer", url="http://esquecido")
+        na_fila.created_at = agora - timedelta(minutes=job_service.JOB_QUEUE_TIMEOUT_MIN + 1)
+        recente = job_service.criar_job(user.id, "spy_writer", url="http://recente")
+        recente.created_at = agora
+        db.session.commit()
+
+        travados, _ = job_service.limpar_jobs(agora)
+        assert travados == 2
+        estados = [job_service.job_para_json(db.session.get(BackgroundJob, j.id)) for j in (rodando, na_fila, recente)]
+        print(f"Status: {[e['status'] for e in estados]} | créditos: {db.session.get(User, user.id).credits}")
+        assert [e["finished"] for e in estados] == [True, True, False]  # A página para de consultar
+        assert db.session.get(User, user.id).credits == 4
+
+        # O worker termina depois da limpeza: resultado descartado, sem segundo estorno
+        job_service.content_service.analyze_spy_link = lambda url, is_demo=False: None
+        assert not job_service.executar_job(db.session.get(BackgroundJob, rodando.id))
+        assert db.session.get(BackgroundJob, rodando.id).message == "Tempo esgotado no processamento."
+        assert db.session.get(User, user.id).credits == 4
+
+if __name__ == "__main__":
+    test_spy_writer_roda_no_worker_e_estorna_na_falha()
+    test_post_manual_recebe_o_upload_e_apaga_o_arquivo()
+    test_limpeza_encerra_jobs_esgotados_e_estorna_uma_vez()
@@ -0,0 +1,50 @@
+import sys
+import os
+
+# Adiciona a raiz do projeto ao path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from flask import Flask
+from sqlalchemy.orm.attributes import set_committed_value
+from models import db, Plan, User, CreditTransaction
+from services.credit_service import debitar_creditos, estornar_creditos
+
+def _app_teste():
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite://'
+    db.init_app(app)
+    return app
+
+def test_debito_atomico_e_extrato():
+    print("\n=== TESTE DO LEDGER DE CRÉDITOS ===")
+    app = _app_teste()
+    with app.app_context():
+        db.create_all()
+        plano = Plan(name="Teste")
+        db.session.add(plano)
+        db.session.flush()
+        user = User(name="t", email="t@example.com", password="x", plan_id=plano.id, credits=3)
+        db.session.add(user)
+        db.session.commit()
+
+        assert user.consume_credit(2, reason="Post-IA", ref="idea:1")
+        assert user.credits == 1
+
+        # Saldo "velho" em memória não deixa passar: a checagem é feita no UPDATE
+        set_committed_value(user, "credits", 99)
+        assert not user.consume_credit(2, reason="Post-IA")
+
+        ok, erro = debitar_creditos(user.id, 5)
+        assert not ok and "Disponível: 1" in erro
+
+        assert estornar_creditos(user, 2, "Post-IA", ref="idea:1") == 3
+
+        extrato = CreditTransaction.query.order_by(CreditTransaction.id).all()
+        for t in extrato:
+            print(f"{t.amount:+d} -> {t.balance_after} ({t.reason})")
+        assert [(t.amount, t.balance_after) for t in extrato] == [(-2, 1), (2, 3)]
+        assert extrato[1].reason == "estorno: Post-IA"
+    print("✅ Débito condicional no banco e extrato append-only.")
+
+if __name__ == "__main__":
+    test_debito_atomico_e_extrato()
@@ -0,0 +1,48 @@
+import sys
+import os
+
+# Adiciona a raiz do projeto ao path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from flask import Flask
+from models import db, Plan, User, Blog, PostLog, UserDailyUsage
+
+def _app_teste():
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite://'
+    db.init_app(app)
+    return app
+
+def test_contador_diario_e_limite():
+    print("\n=== TESTE DO CONTADOR DIÁRIO ===")
+    app = _app_teste()
+    with app.app_context():
+        db.create_all()
+        plano = Plan(name="Teste", posts_per_day=2)
+        db.session.add(plano)
+        db.session.flush()
+        user = User(name="t", email="t@example.com", password="x", plan_id=plano.id)
+        db.session.add(user)
+        db.session.flush()
+        blog = Blog(user_id=user.id, site_name="b", wp_url="http://b", wp_user="u", wp_app_password="p")
+        db.session.add(blog)
+        db.session.commit()
+
+        assert user.reached_daily_limit(is_ai_post=True) == (False, 2, 0)
+
+        db.session.add(PostLog(blog_id=blog.id, title="1", status="Publicado"))
+        db.session.add(PostLog(blog_id=blog.id, title="2", status="Erro"))
+        db.session.commit()
+
+        uso = UserDailyUsage.query.one()
+        print(f"Contador: posts={uso.posts} publicados={uso.published}")
+        assert (uso.posts, uso.published) == (2, 1)
+
+        # O insert invalida o cache do processo: a leitura já vê o novo valor
+        reached, limite, atual = user.reached_daily_limit(is_ai_post=True)
+        assert reached and atual == 2
+        assert user.can_post_today()  # Só 1 'Publicado' de 2 permitidos
+    print("✅ PostLog incrementa o contador e os limites leem dele.")
+
+if __name__ == "__main__":
+    test_contador_diario_e_limite()
@@ -0,0 +1,75 @@
+import sys
+import os
+import subprocess
+import tempfile
+
+# Adiciona a raiz do projeto ao path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from sqlalchemy import create_engine, text
+from services import profiler_service
+from services.profiler_service import perfilar, get_perfis_recentes, get_resumo_por_nome
+
+RAIZ = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+
+def test_conta_queries_do_job():
+    print("\n=== TESTE DO PERFIL DE BANCO ===")
+    engine = create_engine("sqlite://")
+    profiler_service.PROFILER_FILE = os.path.join(tempfile.mkdtemp(), "perfis.jsonl")
+    profiler_service.SLOW_QUERY_MS = 0  # Toda query conta como lenta
+
+    with perfilar("job", "teste_profiler") as perfil:
+        with engine.connect() as conn:
+            for _ in range(3):
+                conn.execute(text("SELECT 1"))
+
+    print(f"Queries: {perfil['queries']} | lentas: {perfil['lentas']}")
+    assert perfil["queries"] == 3
+    assert perfil["lentas"] and "SELECT 1" in perfil["lentas"][0][1]
+    assert get_perfis_recentes()[0]["nome"] == "teste_profiler"
+
+    # Fora de um perfil nada é contado
+    with engine.connect() as conn:
+        conn.execute(text("SELECT 1"))
+    assert perfil["queries"] == 3
+    print("✅ Queries contadas por job, lentas registradas.")
+
+def test_query_com_erro_nao_deixa_inicio_na_pilha():
+    engine = create_engine("sqlite://")
+    with perfilar("job", "teste_erro"):
+        with engine.connect() as conn:
+            try:
+                conn.execute(text("SELECT * FROM tabela_que_nao_existe"))
+            except Exception:
+                pass
+            # A conexão volta ao pool e é reaproveitada: a pilha não pode crescer
+            assert conn.info.get("_inicio_query") == []
+    print("✅ Query com erro não deixa lixo em conn.info.")
+
+def test_perfis_de_outros_processos_aparecem():
+    print("\n=== TESTE DO HISTÓRICO ENTRE PROCESSOS ===")
+    arquivo = os.path.join(tempfile.mkdtemp(), "perfis.jsonl")
+    profiler_service.PROFILER_FILE = arquivo
+    # Outro processo (ex.: o scheduler) roda um job perfilado
+    codigo = ("from services.profiler_service import perfilar_job\n"
+              "perfilar_job(lambda: None)()\n")
+    subprocess.run([sys.executable, "-c", codigo], cwd=RAIZ, check=True, timeout=60,
+                   env={**os.environ, "PROFILER_FILE": arquivo})
+    with perfilar("request", "dashboard.home"):
+        pass
+    assert [r["nome"] for r in get_perfis_recentes()] == ["dashboard.home", "<lambda>"]
+    assert {(i["tipo"], i["nome"]) for i in get_resumo_por_nome()} == {("job", "<lambda>"), ("request", "dashboard.home")}
+
+    # Ao passar do limite o arquivo gira; o anterior continua sendo lido
+    profiler_service.PROFILER_MAX_BYTES = 1
+    with perfilar("request", "depois_do_giro"):
+        pass
+    profiler_service.PROFILER_MAX_BYTES = 2_000_000
+    assert os.path.exists(arquivo + ".1") and not os.path.exists(arquivo)
+    assert len(get_perfis_recentes()) == 3
+    print("✅ Perfis de workers e do scheduler lidos do arquivo comum.")
+
+if __name__ == "__main__":
+    test_conta_queries_do_job()
+    test_query_com_erro_nao_deixa_inicio_na_pilha()
+    test_perfis_de_outros_processos_aparecem()
@@ -0,0 +1,46 @@
+import sys
+import os
+
+# Adiciona a raiz do projeto ao path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from flask import Flask
+from sqlalchemy import inspect
+from models import db, Plan, User, Blog, ContentIdea, sem_textos_longos
+
+def _app_teste():
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite://'
+    db.init_app(app)
+    return app
+
+def test_listas_nao_carregam_textos_longos():
+    print("\n=== TESTE DE COLUNAS ADIADAS ===")
+    app = _app_teste()
+    with app.app_context():
+        db.create_all()
+        plano = Plan(name="Teste")
+        db.session.add(plano)
+        db.session.flush()
+        user = User(name="t", email="t@example.com", password="x", plan_id=plano.id)
+        db.session.add(user)
+        db.session.flush()
+        blog = Blog(user_id=user.id, site_name="b", wp_url="http://b", wp_user="u", wp_app_password="p")
+        db.session.add(blog)
+        db.session.flush()
+        db.session.add(ContentIdea(blog_id=blog.id, title="Ideia", context_insight="X" * 10000))
+        db.session.commit()
+        db.session.expunge_all()
+
+        ideia = ContentIdea.query.options(*sem_textos_longos(ContentIdea)).one()
+        nao_carregados = inspect(ideia).unloaded
+        print(f"Não carregados na lista: {sorted(nao_carregados)}")
+        assert {"context_insight", "full_content"} <= nao_carregados
+        assert "title" not in nao_carregados
+
+        # Detalhe: o atributo é buscado sob demanda ao ser acessado
+        assert len(ideia.context_insight) == 10000
+    print("✅ Lista sem colunas Text; carregamento sob demanda no detalhe.")
+
+if __name__ == "__main__":
+    test_listas_nao_carregam_textos_longos()
@@ -0,0 +1,139 @@
+import sys
+import os
+
+# Adiciona a raiz do projeto ao path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from datetime import datetime, timedelta
+from flask import Flask
+from models import db, Plan, User, Blog, ContentIdea
+from services.queue_service import reivindicar_proxima, reivindicar_prioritaria, PRIORIDADE_INTERATIVA
+
+def _app_teste():
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite://'
+    db.init_app(app)
+    return app
+
+def _usuario(nome, plano, ideias, base):
+    user = User(name=nome, email=f"{nome}@example.com", password="x", plan_id=plano.id)
+    db.session.add(user)
+    db.session.flush()
+    blog = Blog(user_id=user.id, site_name=nome, wp_url=f"http://{nome}", wp_user="u", wp_app_password="p")
+    db.session.add(blog)
+    db.session.flush()
+    for i in range(ideias):
+        db.session.add(ContentIdea(blog_id=blog.id, title=f"{nome} {i}", status='pending',
+                                   created_at=base + timedelta(seconds=i)))
+    return user
+
+def test_divide_a_fila_pelo_peso_do_plano():
+    print("\n=== TESTE DA FILA JUSTA ===")
+    agora = datetime(2026, 3, 10, 12, 0)
+    app = _app_teste()
+    with app.app_context():
+        db.create_all()
+        vip = Plan(name="VIP", queue_weight=4, max_concurrent_posts=10)
+        starter = Plan(name="Starter", queue_weight=1, max_concurrent_posts=10)
+        db.session.add_all([vip, starter])
+        db.session.flush()
+        # O VIP enfileirou 500 ideias antes de todo mundo
+        _usuario("vip", vip, 500, agora - timedelta(hours=2))
+        _usuario("a", starter, 5, agora - timedelta(hours=1))
+        _usuario("b", starter, 5, agora - timedelta(hours=1))
+        db.session.commit()
+
+        ordem = []
+        for _ in range(12):
+            ideia = reivindicar_proxima(agora)
+            assert ideia.status == 'processing'
+            ordem.append(ideia.blog.site_name)
+            # Simula o fim da publicação, liberando a vaga
+            ideia.status = 'completed'
+            db.session.commit()
+        print(f"Ordem: {ordem}")
+
+        # A cada rodada: 4 do VIP e 1 de cada Starter, sem esperar as 500
+        assert ordem.count("vip") == 8
+        assert ordem.count("a") == 2 and ordem.count("b") == 2
+        # Dentro do usuário, a mais antiga primeiro
+        assert ContentIdea.query.filter_by(title="vip 0").one().status == 'completed'
+
+def test_respeita_limite_de_posts_simultaneos():
+    print("\n=== TESTE DO LIMITE SIMULTÂNEO ===")
+    agora = datetime(2026, 3, 10, 12, 0)
+    app = _app_teste()
+    with app.app_context():
+        db.create_all()
+        plano = Plan(name="Pro", queue_weight=4, max_concurrent_posts=2)
+        db.session.add(plano)
+        db.session.flush()
+        _usuario("pro", plano, 5, agora - timedelta(hours=1))
+        db.session.commit()
+
+        assert reivindicar_proxima(agora) is not None
+        assert reivindicar_proxima(agora) is not None
+        # Duas em 'processing': o usuário espera uma terminar
+        assert reivindicar_proxima(agora) is None
+        # Uma travada há mais que o timeout não segura a vaga
+        depois = agora + timedelta(hours=1)
+        assert reivindicar_proxima(depois) is not None
+        assert ContentIdea.query.filter_by(status='processing').count() == 3
+
+def test_faixa_rapida_passa_na_frente_da_automacao():
+    print("\n=== TESTE DA FAIXA RÁPIDA ===")
+    agora = datetime(2026, 3, 10, 12, 0)
+    app = _app_teste()
+    with app.app_context():
+        db.create_all()
+        plano = Plan(name="Starter", queue_weight=1, max_concurrent_posts=1)
+        db.session.add(plano)
+        db.session.flush()
+        _usuario("bulk", plano, 300, agora - timedelta(hours=3))
+        _usuario("click", plano, 2, agora - timedelta(hours=2))
+        db.session.commit()
+        # O usuário já tem um post da automação em andamento (limite do plano = 1)
+        ContentIdea.query.filter_by(title="click 0").update({"status": "processing", "claimed_at": agora})
+        ContentIdea.query.filter_by(title="click 1").update({"priority": PRIORIDADE_INTERATIVA, "created_at": agora})
+        db.session.commit()
+
+        # A faixa rápida não conta o post da automação no limite simultâneo
+        ideia = reivindicar_prioritaria(agora)
+        assert ideia.title == "click 1" and ideia.status == 'processing'
+        assert reivindicar_prioritaria(agora) is None
+        # Na faixa normal ela também viria antes das 300 da automação
+        assert reivindicar_proxima(agora).blog.site_name == "bulk"
+
+def test_faixa_rapida_reveza_usuarios_e_respeita_o_limite():
+    print("\n=== TESTE DO REVEZAMENTO NA FAIXA RÁPIDA ===")
+    agora = datetime(2026, 3, 10, 12, 0)
+    app = _app_teste()
+    with app.app_context():
+        db.create_all()
+        plano = Plan(name="Lite", queue_weight=2, max_concurrent_posts=1)
+        db.session.add(plano)
+        db.session.flush()
+        # "rajada" clicou em 20 publicações antes de "outro" clicar na dele
+        _usuario("rajada", plano, 20, agora - timedelta(minutes=10))
+        _usuario("outro", plano, 1, agora - timedelta(minutes=5))
+        db.session.commit()
+        ContentIdea.query.update({"priority": PRIORIDADE_INTERATIVA})
+        db.session.commit()
+
+        primeira = reivindicar_prioritaria(agora)
+        segunda = reivindicar_prioritaria(agora)
+        print(f"Faixa rápida: {primeira.title}, {segunda.title}")
+        assert (primeira.title, segunda.title) == ("rajada 0", "outro 0")
+        # Os dois no limite do plano: a faixa rápida espera terminar
+        assert reivindicar_prioritaria(agora) is None
+
+        primeira.status = 'completed'
+        db.session.commit()
+        assert reivindicar_prioritaria(agora).title == "rajada 1"
+    print("✅ Um usuário com muitos cliques não segura a faixa rápida dos outros.")
+
+if __name__ == "__main__":
+    test_divide_a_fila_pelo_peso_do_plano()
+    test_respeita_limite_de_posts_simultaneos()
+    test_faixa_rapida_passa_na_frente_da_automacao()
+    test_faixa_rapida_reveza_usuarios_e_respeita_o_limite()
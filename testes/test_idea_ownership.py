@@ -0,0 +1,98 @@
+import sys
+import os
+
+# Adiciona a raiz do projeto ao path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from flask import Flask
+from models import db, login_manager, Plan, User, Blog, ContentIdea, CreditTransaction
+from routes import content
+from routes.content import content_bp
+
+def _app_teste():
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite://'
+    app.config['SECRET_KEY'] = 'teste'
+    db.init_app(app)
+    login_manager.init_app(app)
+    app.register_blueprint(content_bp, url_prefix='/content')
+    return app
+
+def _usuario(nome, plano):
+    user = User(name=nome, email=f"{nome}@example.com", password="x", plan_id=plano.id, credits=5)
+    db.session.add(user)
+    db.session.flush()
+    blog = Blog(user_id=user.id, site_name=nome, wp_url=f"http://{nome}", wp_user="u", wp_app_password="p")
+    db.session.add(blog)
+    db.session.flush()
+    return user, blog
+
+def test_ideia_de_outro_usuario_da_404():
+    print("\n=== TESTE DO DONO DA IDEIA ===")
+    app = _app_teste()
+    with app.app_context():
+        db.create_all()
+        plano = Plan(name="Pro", posts_per_day=3)
+        db.session.add(plano)
+        db.session.flush()
+        dono, blog = _usuario("dono", plano)
+        intruso, _ = _usuario("intruso", plano)
+        rascunho = ContentIdea(blog_id=blog.id, title="Rascunho", status='draft')
+        na_fila = ContentIdea(blog_id=blog.id, title="Na fila", status='pending')
+        db.session.add_all([rascunho, na_fila])
+        db.session.commit()
+        ids = (rascunho.id, na_fila.id, intruso.id)
+
+    cliente = app.test_client()
+    with cliente.session_transaction() as sessao:
+        sessao["_user_id"] = str(ids[2])
+        sessao["_fresh"] = True
+
+    assert cliente.post(f"/content/publish-idea/{ids[0]}").status_code == 404
+    assert cliente.post(f"/content/cancel-queue-item/{ids[1]}").status_code == 404
+    assert cliente.post(f"/content/delete-idea/{ids[0]}").status_code == 404
+
+    with app.app_context():
+        assert db.session.get(ContentIdea, ids[0]).status == 'draft'
+        assert db.session.get(ContentIdea, ids[1]).status == 'pending'
+        # Nada debitado do intruso: a checagem vem antes do consume_credit
+        assert db.session.get(User, ids[2]).credits == 5
+        assert CreditTransaction.query.count() == 0
+    print("✅ Publicar, cancelar e excluir só a própria ideia.")
+
+def test_spy_writer_estorna_se_o_job_nao_for_criado():
+    print("\n=== TESTE DO ESTORNO SEM JOB ===")
+    app = _app_teste()
+    with app.app_context():
+        db.create_all()
+        plano = Plan(name="Pro", posts_per_day=3)
+        db.session.add(plano)
+        db.session.flush()
+        user, _ = _usuario("dono", plano)
+        db.session.commit()
+        user_id = user.id
+
+    def banco_fora(*args, **kwargs):
+        raise RuntimeError("conexão perdida")
+    original = (content.criar_job, content.render_template)
+    content.criar_job = banco_fora
+    content.render_template = lambda *args, **kwargs: "formulario"
+    try:
+        cliente = app.test_client()
+        with cliente.session_transaction() as sessao:
+            sessao["_user_id"] = str(user_id)
+            sessao["_fresh"] = True
+        resposta = cliente.post("/content/spy-writer", data={"url": "http://concorrente/post"})
+    finally:
+        content.criar_job, content.render_template = original
+
+    assert resposta.status_code == 200
+    with app.app_context():
+        assert db.session.get(User, user_id).credits == 5
+        motivos = [t.reason for t in CreditTransaction.query.order_by(CreditTransaction.id)]
+        assert motivos == ["Spy Writer", "estorno: Spy Writer"]
+    print("✅ Débito do Spy Writer devolvido quando o job não chega a existir.")
+
+if __name__ == "__main__":
+    test_ideia_de_outro_usuario_da_404()
+    test_spy_writer_estorna_se_o_job_nao_for_criado()
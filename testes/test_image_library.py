@@ -0,0 +1,56 @@
+import sys
+import os
+
+# Adiciona a raiz do projeto ao path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from flask import Flask
+from models import db, Plan, User, Blog, ImageLibrary
+from services import image_library_service
+from services.image_library_service import buscar_reaproveitavel, registrar_imagem
+
+ESCRITORIO = ("Cena fotográfica realista de um escritório moderno com pessoas trabalhando em laptops, "
+              "luz natural entrando pelas janelas, plantas verdes e mesas de madeira clara")
+PARECIDO = ("Cena fotográfica realista de um escritório moderno com profissionais trabalhando em laptops, "
+            "luz natural entrando pelas janelas, plantas verdes e mesas de madeira")
+PRAIA = "Fotografia realista de uma praia tropical ao pôr do sol, coqueiros, areia branca e ondas calmas"
+
+def _app_teste():
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite://'
+    db.init_app(app)
+    return app
+
+def test_reaproveita_imagem_parecida_com_limite():
+    print("\n=== TESTE DA BIBLIOTECA DE IMAGENS ===")
+    image_library_service.IMAGE_REUSE_MIN_DAYS = 0
+    image_library_service.IMAGE_REUSE_MAX_USES = 2
+    app = _app_teste()
+    with app.app_context():
+        db.create_all()
+        plano = Plan(name="Teste")
+        db.session.add(plano)
+        db.session.flush()
+        user = User(name="t", email="t@example.com", password="x", plan_id=plano.id)
+        db.session.add(user)
+        db.session.flush()
+        blogs = [Blog(user_id=user.id, site_name=n, wp_url="http://b", wp_user="u", wp_app_password="p") for n in "ab"]
+        db.session.add_all(blogs)
+        db.session.commit()
+
+        registrar_imagem(blogs[0].id, ESCRITORIO, 501)
+
+        assert buscar_reaproveitavel(blogs[0].id, PRAIA) is None       # Tema diferente
+        assert buscar_reaproveitavel(blogs[1].id, PARECIDO) is None    # Outro blog
+        assert buscar_reaproveitavel(blogs[0].id, PARECIDO) == 501     # 2º uso
+        assert buscar_reaproveitavel(blogs[0].id, PARECIDO) is None    # Limite de usos atingido
+        assert db.session.get(ImageLibrary, 1).uses == 2
+
+        # Intervalo mínimo entre usos
+        image_library_service.IMAGE_REUSE_MAX_USES = 5
+        image_library_service.IMAGE_REUSE_MIN_DAYS = 14
+        assert buscar_reaproveitavel(blogs[0].id, PARECIDO) is None
+    print("✅ Prompt parecido reaproveita a mídia, respeitando blog, limite e intervalo.")
+
+if __name__ == "__main__":
+    test_reaproveita_imagem_parecida_com_limite()
@@ -0,0 +1,61 @@
+import sys
+import os
+import io
+import subprocess
+import tempfile
+
+# Adiciona a raiz do projeto ao path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from PIL import Image
+from services import image_opt_service
+from services.image_opt_service import otimizar_imagem
+
+def _png_dalle():
+    """PNG 1024x1024 com ruído, parecido em tamanho com o que o DALL-E devolve."""
+    img = Image.frombytes("RGB", (1024, 1024), os.urandom(1024 * 1024 * 3))
+    saida = io.BytesIO()
+    img.save(saida, "PNG")
+    return saida.getvalue()
+
+def test_redimensiona_e_recodifica():
+    print("\n=== TESTE DA OTIMIZAÇÃO DE IMAGEM ===")
+    image_opt_service.IMAGE_MAX_WIDTH = 800
+    image_opt_service.IMAGE_MAX_HEIGHT = 800
+    original = _png_dalle()
+
+    for formato, mime in (("webp", "image/webp"), ("jpeg", "image/jpeg")):
+        image_opt_service.IMAGE_FORMAT = formato
+        r = otimizar_imagem(original, "image/png", "f_ab12.png")
+        print(f"{formato}: {r['bytes_antes']} -> {r['bytes_depois']} bytes em {r['ms']} ms")
+        assert r["otimizada"] and r["content_type"] == mime
+        assert r["bytes_depois"] < r["bytes_antes"]
+        assert r["nome_arquivo"].startswith("f_ab12.") and not r["nome_arquivo"].endswith(".png")
+        with Image.open(io.BytesIO(r["dados"])) as img:
+            assert img.size == (800, 800)
+
+    # Bytes que não são imagem: segue o original, sem exceção
+    r = otimizar_imagem(b"nao sou imagem", "image/png", "x.png")
+    assert not r["otimizada"] and r["dados"] == b"nao sou imagem"
+    print("✅ Redimensiona, recodifica e cai no original quando não dá.")
+
+def test_processo_de_otimizacao_nao_importa_o_app():
+    with tempfile.TemporaryDirectory() as pasta:
+        entrada, saida = os.path.join(pasta, "in.png"), os.path.join(pasta, "out.webp")
+        with open(entrada, "wb") as f:
+            f.write(_png_dalle())
+        # -X importtime lista no stderr cada módulo importado pelo processo
+        processo = subprocess.run(
+            [sys.executable, "-X", "importtime", "-m", "services.image_opt_service",
+             entrada, saida, "400", "400", "webp", "80"],
+            cwd=image_opt_service.RAIZ, capture_output=True, text=True, timeout=60,
+        )
+        assert processo.returncode == 0, processo.stderr[-500:]
+        assert processo.stdout.split() == ["400", "400"]
+        importados = {linha.rsplit("|", 1)[-1].strip() for linha in processo.stderr.splitlines()}
+        assert not importados & {"app", "scheduler", "models", "flask", "sqlalchemy"}
+    print("✅ O processo de otimização só carrega o Pillow.")
+
+if __name__ == "__main__":
+    test_redimensiona_e_recodifica()
+    test_processo_de_otimizacao_nao_importa_o_app()
@@ -0,0 +1,121 @@
+import sys
+import os
+import io
+import threading
+from types import SimpleNamespace
+from http.server import BaseHTTPRequestHandler, HTTPServer, ThreadingHTTPServer
+
+# Adiciona a raiz do projeto ao path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from PIL import Image
+from services import image_service, image_opt_service
+from services.image_service import _CorpoStream, _enviar_midia
+
+class _RespostaFalsa:
+    """Imita um download em stream: entrega a imagem em pedaços."""
+    def __init__(self, dados, pedaco=1000, com_tamanho=True):
+        self.dados = dados
+        self.pedaco = pedaco
+        self.headers = {"Content-Length": str(len(dados))} if com_tamanho else {}
+
+    def iter_content(self, chunk_size=1):
+        for i in range(0, len(self.dados), self.pedaco):
+            yield self.dados[i:i + self.pedaco]
+
+def _servidor_wp(recebido):
+    class Handler(BaseHTTPRequestHandler):
+        def do_POST(self):
+            recebido["headers"] = dict(self.headers)
+            if self.headers.get("Content-Length"):
+                recebido["corpo"] = self.rfile.read(int(self.headers["Content-Length"]))
+            self.send_response(201)
+            self.send_header("Content-Type", "application/json")
+            self.end_headers()
+            self.wfile.write(b'{"id": 7}')
+
+        def log_message(self, *args):
+            pass
+
+    servidor = HTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=servidor.handle_request, daemon=True).start()
+    return servidor
+
+def test_download_vai_direto_para_o_upload():
+    print("\n=== TESTE DO STREAM DE IMAGEM ===")
+    imagem = os.urandom(150_000)
+
+    corpo = _CorpoStream(_RespostaFalsa(imagem))
+    assert len(corpo) == len(imagem)
+    assert corpo.read(10) == imagem[:10]
+    assert corpo.read(5000) == imagem[10:5010]
+
+    recebido = {}
+    servidor = _servidor_wp(recebido)
+    corpo = _CorpoStream(_RespostaFalsa(imagem))
+    resposta = _enviar_midia(f"http://127.0.0.1:{servidor.server_port}", None, corpo, "f.png", "image/png")
+    servidor.server_close()
+
+    print(f"Status: {resposta.status_code} | enviados: {corpo.enviados} bytes")
+    assert resposta.json()["id"] == 7
+    assert recebido["headers"]["Content-Length"] == str(len(imagem))
+    assert recebido["headers"]["Content-Type"] == "image/png"
+    assert recebido["corpo"] == imagem and corpo.enviados == len(imagem)
+    print("✅ Upload com Content-Length, bytes repassados em pedaços.")
+
+def test_otimizacao_le_o_download_de_arquivo_temporario():
+    print("\n=== TESTE DO DOWNLOAD EM ARQUIVO PARA O OTIMIZADOR ===")
+    saida = io.BytesIO()
+    Image.frombytes("RGB", (1024, 1024), os.urandom(1024 * 1024 * 3)).save(saida, "PNG")
+    png = saida.getvalue()
+    recebido = {}
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            self.send_response(200)
+            self.send_header("Content-Type", "image/png")
+            self.send_header("Content-Length", str(len(png)))
+            self.end_headers()
+            self.wfile.write(png)
+
+        def do_POST(self):
+            recebido["tipo"] = self.headers["Content-Type"]
+            recebido["corpo"] = self.rfile.read(int(self.headers["Content-Length"]))
+            self.send_response(201)
+            self.send_header("Content-Type", "application/json")
+            self.end_headers()
+            self.wfile.write(b'{"id": 9}')
+
+        def log_message(self, *args):
+            pass
+
+    servidor = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=servidor.serve_forever, daemon=True).start()
+    base = f"http://127.0.0.1:{servidor.server_port}"
+    imagens = SimpleNamespace(generate=lambda **kw: SimpleNamespace(data=[SimpleNamespace(url=f"{base}/img.png")]))
+    origens = []
+
+    original = (image_service._cliente_openai, image_service.IMAGE_OPTIMIZE, image_service.otimizar_imagem)
+    image_service._cliente_openai = lambda: SimpleNamespace(images=imagens)
+    image_service.IMAGE_OPTIMIZE = True
+    image_service.otimizar_imagem = lambda dados, *a: origens.append(dados) or image_opt_service.otimizar_imagem(dados, *a)
+    try:
+        assert image_service._gerar_e_enviar("prompt", base, None) == 9
+        # O otimizador recebeu o caminho do arquivo (já apagado), não os bytes
+        assert isinstance(origens[0], str) and not os.path.exists(origens[0])
+        assert recebido["tipo"] != "image/png" and len(recebido["corpo"]) < len(png)
+
+        # Sem otimização possível, o original sobe em stream do mesmo arquivo
+        image_opt_service.IMAGE_OPTIMIZE = False
+        assert image_service._gerar_e_enviar("prompt", base, None) == 9
+        assert recebido["tipo"] == "image/png" and recebido["corpo"] == png
+    finally:
+        image_service._cliente_openai, image_service.IMAGE_OPTIMIZE, image_service.otimizar_imagem = original
+        image_opt_service.IMAGE_OPTIMIZE = True
+        servidor.shutdown()
+        servidor.server_close()
+    print("✅ Download em arquivo temporário, otimizado ou original enviado a partir dele.")
+
+if __name__ == "__main__":
+    test_download_vai_direto_para_o_upload()
+    test_otimizacao_le_o_download_de_arquivo_temporario()
@@ -0,0 +1,56 @@
+import sys
+import os
+import tempfile
+
+# Adiciona a raiz do projeto ao path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+os.environ.setdefault("PROMETHEUS_MULTIPROC_DIR", tempfile.mkdtemp(prefix="metrics-teste-"))
+
+from flask import Flask
+from services import metrics_service
+from services.metrics_service import classificar_erro, contar_chamada, PROVIDER_REQUESTS
+
+class RateLimitError(Exception):
+    pass
+
+class ErroHttp(Exception):
+    def __init__(self, status_code):
+        self.status_code = status_code
+
+def test_classifica_erros_de_provedor():
+    print("\n=== TESTE DE MÉTRICAS DE PROVEDOR ===")
+    assert classificar_erro(RateLimitError("limite")) == "rate_limited"
+    assert classificar_erro(ErroHttp(429)) == "rate_limited"
+    assert classificar_erro(ErroHttp(500)) == "error"
+    assert classificar_erro(TimeoutError()) == "error"
+    print("✅ 429 e RateLimitError contam como rate_limited.")
+
+def test_conta_por_status_http():
+    contador = PROVIDER_REQUESTS.labels(provider="teste", outcome="rate_limited")
+    antes = contador._value.get()
+    contar_chamada("teste", status_code=429)
+    assert contador._value.get() == antes + 1
+    print("✅ Status HTTP 429 incrementa o contador de rate limit.")
+
+def test_endpoint_exige_token():
+    app = Flask(__name__)
+    metrics_service.init_metrics(app)
+    cliente = app.test_client()
+    original = metrics_service.METRICS_TOKEN
+    try:
+        metrics_service.METRICS_TOKEN = None
+        assert cliente.get("/metrics").status_code == 404  # Sem token configurado fica desligado
+
+        metrics_service.METRICS_TOKEN = "segredo"
+        assert cliente.get("/metrics").status_code == 401
+        assert cliente.get("/metrics", headers={"Authorization": "Bearer errado"}).status_code == 401
+        resposta = cliente.get("/metrics", headers={"Authorization": "Bearer segredo"})
+        assert resposta.status_code == 200 and b"autoblog_provider_requests_total" in resposta.data
+    finally:
+        metrics_service.METRICS_TOKEN = original
+    print("✅ /metrics só responde com o token.")
+
+if __name__ == "__main__":
+    test_classifica_erros_de_provedor()
+    test_conta_por_status_http()
+    test_endpoint_exige_token()
@@ -0,0 +1,105 @@
+import sys
+import os
+import time
+import tempfile
+from collections import deque
+import groq
+import httpx
+import requests
+
+# Adiciona a raiz do projeto ao path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+os.environ.setdefault("PROMETHEUS_MULTIPROC_DIR", tempfile.mkdtemp(prefix="metrics-teste-"))
+
+from services import model_router_service as router
+
+class ErroHttp(Exception):
+    def __init__(self, status_code):
+        self.status_code = status_code
+
+def _limpar():
+    router._historico.clear()
+    router._falhas_seguidas.clear()
+    router._pausado_ate.clear()
+
+def test_so_timeout_5xx_e_429_contam_como_falha():
+    print("\n=== TESTE DO ROTEADOR DE MODELOS ===")
+    _limpar()
+    os.environ["MODEL_CHAIN_TITULOS"] = "rapido,principal"
+    try:
+        # 400 é erro do pedido: sobe direto, sem tentar outro modelo nem pausar
+        chamados = []
+        def erro_do_pedido(modelo, timeout):
+            chamados.append(modelo)
+            raise ErroHttp(400)
+        try:
+            router.executar_com_failover("titulos", erro_do_pedido)
+            assert False, "esperava ErroHttp"
+        except ErroHttp:
+            pass
+        assert chamados == ["rapido"] and "rapido" not in router._historico
+
+        # 503 repetido pausa o modelo; a partir daí ele nem é chamado
+        def instavel(modelo, timeout):
+            if modelo == "rapido":
+                raise ErroHttp(503)
+            return "ok"
+        for _ in range(router.FALHAS_SEGUIDAS_MAX):
+            assert router.executar_com_failover("titulos", instavel) == ("ok", "principal")
+        assert router.modelos_para("titulos") == ["principal"]
+
+        # Todos pausados: falha na hora, sem chamar ninguém
+        router._pausado_ate["principal"] = time.time() + 60
+        try:
+            router.executar_com_failover("titulos", lambda m, t: chamados.append(m))
+            assert False, "esperava RuntimeError"
+        except RuntimeError:
+            pass
+        assert chamados == ["rapido"]
+    finally:
+        del os.environ["MODEL_CHAIN_TITULOS"]
+        _limpar()
+    print("✅ Só falhas do modelo contam; pausados ficam fora da rotação.")
+
+def test_erro_de_conexao_faz_failover():
+    _limpar()
+    os.environ["MODEL_CHAIN_TITULOS"] = "fora_do_ar,reserva"
+    try:
+        pedido = httpx.Request("POST", "https://api.groq.com/openai/v1/chat/completions")
+        erros = [groq.APIConnectionError(request=pedido), httpx.ConnectError("recusada"),
+                 requests.ConnectionError("recusada"), ConnectionResetError()]
+        for erro in erros:
+            assert router.falha_do_modelo(erro), type(erro)
+
+        def provedor_caiu(modelo, timeout):
+            if modelo == "fora_do_ar":
+                raise groq.APIConnectionError(request=pedido)
+            return "ok"
+        for _ in range(router.FALHAS_SEGUIDAS_MAX):
+            assert router.executar_com_failover("titulos", provedor_caiu) == ("ok", "reserva")
+        assert router.modelos_para("titulos") == ["reserva"]  # Disjuntor aberto
+    finally:
+        del os.environ["MODEL_CHAIN_TITULOS"]
+        _limpar()
+    print("✅ Erro de conexão tenta o próximo modelo e abre o disjuntor.")
+
+def test_modelo_lento_volta_quando_amostras_expiram():
+    _limpar()
+    os.environ["MODEL_CHAIN_TITULOS"] = "lento,outro"
+    try:
+        for _ in range(5):
+            router.registrar_resultado("lento", 30.0, True)
+        assert router.modelos_para("titulos") == ["outro", "lento"]
+
+        antigo = time.time() - router.JANELA_SEGUNDOS - 1
+        router._historico["lento"] = deque((antigo, lat, ok) for _, lat, ok in router._historico["lento"])
+        assert router.modelos_para("titulos") == ["lento", "outro"]
+    finally:
+        del os.environ["MODEL_CHAIN_TITULOS"]
+        _limpar()
+    print("✅ Modelo lento volta à frente quando a janela de tempo expira.")
+
+if __name__ == "__main__":
+    test_so_timeout_5xx_e_429_contam_como_falha()
+    test_erro_de_conexao_faz_failover()
+    test_modelo_lento_volta_quando_amostras_expiram()
@@ -0,0 +1,57 @@
+import sys
+import os
+from datetime import datetime, timedelta
+
+# Adiciona a raiz do projeto ao path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from flask import Flask
+from models import db, Plan, User, Blog, PostLog
+from services.pagination_service import paginar, decodificar_cursor, tamanho_pagina, PAGE_SIZE_MAX
+
+def _app_teste():
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite://'
+    db.init_app(app)
+    return app
+
+def test_paginacao_por_cursor():
+    print("\n=== TESTE DE PAGINAÇÃO POR CURSOR ===")
+    app = _app_teste()
+    with app.app_context():
+        db.create_all()
+        plano = Plan(name="Teste")
+        db.session.add(plano)
+        db.session.flush()
+        user = User(name="t", email="t@example.com", password="x", plan_id=plano.id)
+        db.session.add(user)
+        db.session.flush()
+        blog = Blog(user_id=user.id, site_name="b", wp_url="http://b", wp_user="u", wp_app_password="p")
+        db.session.add(blog)
+        db.session.flush()
+
+        # Datas repetidas de propósito: o desempate é pelo id
+        base = datetime(2025, 1, 1)
+        for i in range(7):
+            db.session.add(PostLog(blog_id=blog.id, title=f"post {i}", status="Publicado", posted_at=base + timedelta(hours=i // 2)))
+        db.session.commit()
+
+        vistos, cursor = [], None
+        while True:
+            pagina = paginar(PostLog.query, PostLog.posted_at, PostLog.id, cursor=cursor, per_page=3)
+            vistos += [p.title for p in pagina]
+            if not pagina.has_next:
+                break
+            cursor = pagina.next_cursor
+
+        print(f"Ordem: {vistos}")
+        esperado = [p.title for p in PostLog.query.order_by(PostLog.posted_at.desc(), PostLog.id.desc())]
+        assert vistos == esperado and len(vistos) == 7
+
+    assert decodificar_cursor("lixo!!") is None
+    assert tamanho_pagina("100000") == PAGE_SIZE_MAX
+    assert tamanho_pagina("abc") >= 1
+    print("✅ Todas as linhas, sem repetição, e página limitada no servidor.")
+
+if __name__ == "__main__":
+    test_paginacao_por_cursor()
@@ -0,0 +1,76 @@
+import sys
+import os
+
+# Adiciona a raiz do projeto ao path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from datetime import datetime, timedelta
+from flask import Flask
+from models import db, Plan, User, Blog, ContentIdea
+from services import pregen_service
+from services import slot_service
+from services.slot_service import planejar_slots
+
+def _app_teste():
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite://'
+    db.init_app(app)
+    return app
+
+def test_pre_gera_proximas_ideias_dentro_do_limite():
+    print("\n=== TESTE DA PRÉ-GERAÇÃO ===")
+    # Sem chamadas reais a IA/WordPress neste teste
+    pregen_service.gerar_conteudo_ia = lambda titulo, contexto=None, blog_id=None: f"<p>{titulo}</p>"
+    pregen_service.preparar_imagem_post = lambda idea: 77
+    slot_service.SLOT_JITTER_MINUTES = 0
+
+    agora = datetime(2026, 3, 10, 6, 0)  # UTC
+    app = _app_teste()
+    with app.app_context():
+        db.create_all()
+        plano = Plan(name="Pro", posts_per_day=2)
+        db.session.add(plano)
+        db.session.flush()
+        user = User(name="t", email="t@example.com", password="x", plan_id=plano.id, credits=1)
+        db.session.add(user)
+        db.session.flush()
+        blog = Blog(user_id=user.id, site_name="b", wp_url="http://b", wp_user="u", wp_app_password="p",
+                    timezone="UTC", schedule_time="09:00", posts_per_day=2)
+        db.session.add(blog)
+        db.session.flush()
+        for i in range(3):
+            db.session.add(ContentIdea(blog_id=blog.id, title=f"Ideia {i}", created_at=agora - timedelta(days=3 - i)))
+        db.session.commit()
+        planejar_slots(agora)
+
+        # Slots às 09:00 e 21:00; só o primeiro está dentro das 12h de antecedência
+        vencendo = pregen_service.ideias_a_vencer(agora)
+        assert [(h, i.title) for h, i in vencendo] == [(datetime(2026, 3, 10, 9, 0), "Ideia 0")]
+        vencendo = pregen_service.ideias_a_vencer(agora, horas=16)
+        assert [i.title for _, i in vencendo] == ["Ideia 0", "Ideia 1"]
+
+        # Fila de publicação ocupada: não disputa recursos com o publicador
+        ocupada = ContentIdea(blog_id=blog.id, title="Na fila", status='pending')
+        db.session.add(ocupada)
+        db.session.commit()
+        assert pregen_service.pre_gerar_conteudos(agora) == 0
+        db.session.delete(ocupada)
+        db.session.commit()
+
+        # Só 1 crédito: prepara apenas a ideia mais antiga
+        assert pregen_service.pre_gerar_conteudos(agora) == 1
+        pronta = ContentIdea.query.filter(ContentIdea.prepared_at.isnot(None)).one()
+        print(f"Pronta: {pronta.title} | imagem {pronta.featured_image_id}")
+        assert pronta.title == "Ideia 0" and pronta.full_content == "<p>Ideia 0</p>" and pronta.featured_image_id == 77
+        assert pregen_service.pre_gerar_conteudos(agora) == 0
+
+        # Fora da janela de antecedência nada é feito
+        assert pregen_service.ideias_a_vencer(agora - timedelta(hours=13)) == []
+
+        # Slot vencido ainda não enfileirado consome a primeira draft
+        vencendo = pregen_service.ideias_a_vencer(datetime(2026, 3, 10, 9, 5), horas=12)
+        assert [i.title for _, i in vencendo] == ["Ideia 1"]
+    print("✅ Próximas ideias pré-geradas, respeitando fila, créditos e janela.")
+
+if __name__ == "__main__":
+    test_pre_gera_proximas_ideias_dentro_do_limite()
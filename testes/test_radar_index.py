@@ -0,0 +1,84 @@
+import sys
+import os
+import time
+import shutil
+import tempfile
+import threading
+
+# Adiciona a raiz do projeto ao path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from services import radar_index_service as radar_index
+
+def test_busca_por_relevancia():
+    print("\n=== TESTE DO ÍNDICE VETORIAL DO RADAR ===")
+    radar_index.INDEX_DIR = tempfile.mkdtemp()
+
+    capturas = {
+        10: "Marketing digital: como usar o Instagram para vender mais em 2025",
+        11: "Receita de bolo de cenoura com cobertura de chocolate",
+        12: "Python 3.13 traz melhorias de performance no interpretador",
+        13: "Estratégias de SEO para blogs de marketing e tráfego orgânico",
+    }
+    total = radar_index.construir_indice(1, list(capturas.keys()), list(capturas.values()))
+    print(f"Índice criado com {total} capturas em {radar_index.INDEX_DIR}")
+
+    resultado = radar_index.buscar(1, "marketing no instagram", k=2)
+    print(f"Top-2 para 'marketing no instagram': {resultado}")
+    assert resultado and resultado[0][0] == 10
+    assert all(r[0] != 11 for r in resultado)
+
+    vazio = radar_index.buscar(2, "qualquer coisa")
+    assert vazio == []
+    print("✅ Busca retornou os insights mais relevantes e ignora blogs sem índice.")
+
+def test_reconstrucao_troca_a_versao_inteira():
+    print("\n=== TESTE DA TROCA DE VERSÃO DO ÍNDICE ===")
+    radar_index.INDEX_DIR = tempfile.mkdtemp()
+
+    radar_index.construir_indice(1, [1, 2], ["receita de bolo", "marketing digital"])
+    assert radar_index.buscar(1, "bolo")[0][0] == 1
+
+    # Leitor com o índice antigo em cache vê a versão nova inteira após a troca
+    for n in range(3):
+        radar_index.construir_indice(1, [5, 6, 7], ["bolo de cenoura", "seo para blogs", "python rápido"])
+    assert radar_index.buscar(1, "bolo")[0][0] == 5
+    versoes = [n for n in os.listdir(radar_index.INDEX_DIR) if n.startswith("blog_1.v")]
+    assert len(versoes) == 2  # Atual + anterior
+
+    # Versão com vetores e ids de tamanhos diferentes é ignorada
+    vec_path, ids_path, _ = radar_index._caminhos(radar_index._versao_atual(1))
+    radar_index.np.save(ids_path, radar_index.np.asarray([5], dtype=radar_index.np.int64))
+    radar_index._cache.clear()
+    assert radar_index.buscar(1, "bolo") == []
+    print("✅ Índice trocado por versão e inconsistências ignoradas.")
+
+def test_reconstrucoes_concorrentes_nao_apagam_a_versao_atual():
+    print("\n=== TESTE DE RECONSTRUÇÕES CONCORRENTES ===")
+    radar_index.INDEX_DIR = tempfile.mkdtemp()
+    radar_index.construir_indice(1, [1], ["receita de bolo"])
+
+    # Outra reconstrução (web ou scheduler) gravou uma versão mais nova no meio:
+    # a limpeza desta só remove versões mais antigas que a dela
+    mais_nova = f"blog_1.v{time.time_ns() + 10**12}"
+    os.makedirs(os.path.join(radar_index.INDEX_DIR, mais_nova))
+    radar_index.construir_indice(1, [2], ["marketing digital"])
+    assert os.path.isdir(os.path.join(radar_index.INDEX_DIR, mais_nova))
+
+    # Ponteiro para diretório apagado conta como "sem índice"
+    shutil.rmtree(os.path.join(radar_index.INDEX_DIR, radar_index._versao_atual(1)))
+    assert radar_index._versao_atual(1) is None
+
+    threads = [threading.Thread(target=radar_index.construir_indice, args=(1, [n], [f"texto {n}"]))
+               for n in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert radar_index._versao_atual(1) is not None
+    print("✅ Troca e limpeza serializadas por blog; ponteiro órfão é reconstruído.")
+
+if __name__ == "__main__":
+    test_busca_por_relevancia()
+    test_reconstrucao_troca_a_versao_inteira()
+    test_reconstrucoes_concorrentes_nao_apagam_a_versao_atual()
@@ -0,0 +1,81 @@
+import sys
+import os
+import time
+
+# Adiciona a raiz do projeto ao path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from collections import Counter
+from datetime import datetime, timedelta
+from flask import Flask
+from models import db, Plan, User, Blog, PostSlot
+from services import slot_service
+from services.slot_service import planejar_slots
+
+def _app_teste():
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite://'
+    db.init_app(app)
+    return app
+
+def test_frota_no_mesmo_horario_e_espalhada():
+    print("\n=== TESTE DO ESPALHAMENTO DE SLOTS ===")
+    slot_service.SLOT_JITTER_MINUTES = 5
+    slot_service.SLOT_TOLERANCE_MINUTES = 30
+    slot_service.SLOT_BUCKET_MINUTES = 5
+    slot_service.SLOT_BUCKET_CAPACITY = 5
+    app = _app_teste()
+    with app.app_context():
+        db.create_all()
+        plano = Plan(name="Pro", posts_per_day=1)
+        db.session.add(plano)
+        db.session.flush()
+        # 60 blogs, todos no padrão 09:00
+        for i in range(60):
+            user = User(name=f"u{i}", email=f"u{i}@example.com", password="x", plan_id=plano.id)
+            db.session.add(user)
+            db.session.flush()
+            db.session.add(Blog(user_id=user.id, site_name=f"b{i}", wp_url="http://b", wp_user="u",
+                                wp_app_password="p", timezone="UTC", schedule_time="09:00", posts_per_day=1))
+        db.session.commit()
+
+        agora = datetime(2026, 3, 10, 6, 0)
+        planejar_slots(agora)
+        dia = PostSlot.query.filter(PostSlot.local_date == agora.date()).all()
+        assert len(dia) == 60
+
+        nominal = datetime(2026, 3, 10, 9, 0)
+        faixas = Counter(slot_service._faixa(s.slot_at) for s in dia)
+        print(f"Faixas de 5 min usadas: {len(faixas)} | pico: {max(faixas.values())}")
+        assert max(faixas.values()) <= 5  # Pico limitado à capacidade (era 60 no mesmo minuto)
+        assert all(abs(s.slot_at - nominal) <= timedelta(minutes=30) for s in dia)
+        assert all(s.nominal_at == nominal for s in dia)
+
+        # Replanejar não mexe em slots já espalhados
+        antes = {s.id: s.slot_at for s in dia}
+        planejar_slots(agora + timedelta(minutes=10))
+        assert {s.id: s.slot_at for s in PostSlot.query.filter(PostSlot.id.in_(antes))} == antes
+    print("✅ Pico achatado dentro da tolerância, estável entre replanejamentos.")
+
+def test_faixas_independem_do_fuso_do_host():
+    slot_service.SLOT_BUCKET_MINUTES = 5
+    tz_original = os.environ.get("TZ")
+    os.environ["TZ"] = "America/Sao_Paulo"
+    time.tzset()
+    try:
+        momento = datetime(2026, 3, 10, 9, 3)
+        inicio = slot_service._inicio_faixa(slot_service._faixa(momento))
+        print(f"Faixa de {momento:%H:%M} UTC com TZ do host em São Paulo começa às {inicio:%H:%M}")
+        assert inicio == datetime(2026, 3, 10, 9, 0)
+        assert slot_service._faixa(datetime(2026, 3, 10, 9, 5)) == slot_service._faixa(momento) + 1
+    finally:
+        if tz_original is None:
+            del os.environ["TZ"]
+        else:
+            os.environ["TZ"] = tz_original
+        time.tzset()
+    print("✅ Faixas calculadas em UTC mesmo com o host em outro fuso.")
+
+if __name__ == "__main__":
+    test_frota_no_mesmo_horario_e_espalhada()
+    test_faixas_independem_do_fuso_do_host()
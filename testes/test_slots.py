@@ -0,0 +1,73 @@
+import sys
+import os
+
+# Adiciona a raiz do projeto ao path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from datetime import datetime, date, timedelta
+from flask import Flask
+from models import db, Plan, User, Blog, ContentIdea, PostSlot
+from services import slot_service
+from services.slot_service import planejar_slots, enfileirar_slots_vencidos, horarios_do_dia
+
+def _app_teste():
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite://'
+    db.init_app(app)
+    return app
+
+def test_slots_no_fuso_do_blog_com_recuperacao():
+    print("\n=== TESTE DO PLANEJADOR DE SLOTS ===")
+    slot_service.SLOT_JITTER_MINUTES = 0  # Horários exatos neste teste (espalhamento tem teste próprio)
+    app = _app_teste()
+    with app.app_context():
+        db.create_all()
+        plano = Plan(name="Pro", posts_per_day=3)
+        db.session.add(plano)
+        db.session.flush()
+        user = User(name="t", email="t@example.com", password="x", plan_id=plano.id)
+        db.session.add(user)
+        db.session.flush()
+        blog = Blog(user_id=user.id, site_name="b", wp_url="http://b", wp_user="u", wp_app_password="p",
+                    timezone="America/Sao_Paulo", schedule_time="09:00", posts_per_day=5)
+        db.session.add(blog)
+        db.session.flush()
+        for i in range(4):
+            db.session.add(ContentIdea(blog_id=blog.id, title=f"Ideia {i}", created_at=datetime(2026, 3, 1, 0, i)))
+        db.session.commit()
+
+        # 09:00 em São Paulo = 12:00 UTC; plano limita a 3 por dia, espaçados em 8h
+        horarios = horarios_do_dia(blog, date(2026, 3, 10))
+        print(f"Horários UTC: {[h.strftime('%d %H:%M') for h in horarios]}")
+        assert horarios == [datetime(2026, 3, 10, 12), datetime(2026, 3, 10, 20), datetime(2026, 3, 11, 4)]
+
+        agora = datetime(2026, 3, 10, 11, 0)  # 08:00 local
+        criados = planejar_slots(agora)
+        assert criados == planejar_slots(agora) + criados  # Idempotente
+        assert PostSlot.query.filter(PostSlot.slot_at > agora).count() == 6  # hoje e amanhã
+
+        # Nada vence antes das 12:00 UTC
+        assert enfileirar_slots_vencidos(agora) == 0
+        # Scheduler parado das 11h às 17h: o slot das 12:00 é recuperado com atraso
+        assert enfileirar_slots_vencidos(datetime(2026, 3, 10, 17, 0)) == 1
+        assert enfileirar_slots_vencidos(datetime(2026, 3, 10, 20, 0)) == 1
+        pendentes = ContentIdea.query.filter_by(status='pending').order_by(ContentIdea.id).all()
+        assert [i.title for i in pendentes] == ["Ideia 0", "Ideia 1"]
+        # Entrar na fila não reescreve a data de criação da ideia
+        assert pendentes[0].created_at == datetime(2026, 3, 1, 0, 0)
+        assert pendentes[0].enqueued_at is not None
+
+        # Slot das 04:00 vencido além da janela de recuperação: perdido, sem enfileirar
+        assert enfileirar_slots_vencidos(datetime(2026, 3, 11, 11, 0)) == 0
+        assert PostSlot.query.filter_by(status='missed').count() == 1
+
+        # Reduzir posts_per_day remove os slots futuros que sobraram
+        blog.posts_per_day = 1
+        db.session.commit()
+        planejar_slots(datetime(2026, 3, 11, 11, 0))
+        futuros = PostSlot.query.filter(PostSlot.slot_at > datetime(2026, 3, 11, 11, 0), PostSlot.status == 'planned').all()
+        assert [s.slot_at for s in futuros] == [datetime(2026, 3, 11, 12), datetime(2026, 3, 12, 12)]
+    print("✅ Slots em UTC pelo fuso do blog, recuperação e replanejamento.")
+
+if __name__ == "__main__":
+    test_slots_no_fuso_do_blog_com_recuperacao()
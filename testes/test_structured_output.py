@@ -0,0 +1,62 @@
+import sys
+import os
+import tempfile
+
+# Adiciona a raiz do projeto ao path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+os.environ.setdefault("PROMETHEUS_MULTIPROC_DIR", tempfile.mkdtemp(prefix="metrics-teste-"))
+
+from services import ai_service
+from services.metrics_service import STRUCTURED_OUTPUT_TOTAL
+
+def _provedor(respostas):
+    """Substitui a chamada à IA por respostas fixas, guardando os prompts recebidos."""
+    prompts = []
+
+    def generate_text(prompt, **kwargs):
+        prompts.append(prompt)
+        return respostas.pop(0)
+    ai_service.generate_text = generate_text
+    return prompts
+
+def _contador(resultado):
+    return STRUCTURED_OUTPUT_TOTAL.labels(schema="TituloSchema", result=resultado)._value.get()
+
+def test_valida_schema_e_repara_uma_vez():
+    print("\n=== TESTE DA SAÍDA ESTRUTURADA ===")
+    original = ai_service.generate_text
+    try:
+        # JSON válido dentro de cerca de markdown: sem reparo
+        _provedor(['```json\n{"titulo": "Bolo de cenoura"}\n```'])
+        assert ai_service.generate_structured("p", ai_service.TituloSchema).titulo == "Bolo de cenoura"
+
+        # Fora do schema: uma chamada de reparo com os erros e a resposta original
+        reparados = _contador("repaired")
+        prompts = _provedor(['{"title": "errado"}', '{"titulo": "Corrigido"}'])
+        assert ai_service.generate_structured("p", ai_service.TituloSchema).titulo == "Corrigido"
+        assert len(prompts) == 2 and '{"title": "errado"}' in prompts[1]
+        assert _contador("repaired") == reparados + 1
+
+        # Reparo também inválido: desiste sem nova chamada
+        falhas = _contador("failed")
+        prompts = _provedor(["não é json", "ainda não"])
+        assert ai_service.generate_structured("p", ai_service.TituloSchema) is None
+        assert len(prompts) == 2
+        assert _contador("failed") == falhas + 1
+    finally:
+        ai_service.generate_text = original
+    print("✅ JSON validado pelo schema e reparo limitado a uma chamada.")
+
+def test_conta_demo_nao_chama_a_ia():
+    original = (ai_service.generate_text, ai_service._conta_demo)
+    prompts = _provedor([])
+    ai_service._conta_demo = lambda: True
+    try:
+        assert ai_service.generate_structured("p", ai_service.TituloSchema) is None
+        assert prompts == []
+    finally:
+        ai_service.generate_text, ai_service._conta_demo = original
+
+if __name__ == "__main__":
+    test_valida_schema_e_repara_uma_vez()
+    test_conta_demo_nao_chama_a_ia()
@@ -0,0 +1,68 @@
+import sys
+import os
+import time
+import threading
+from http.server import BaseHTTPRequestHandler, HTTPServer
+
+# Adiciona a raiz do projeto ao path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from services import ai_service, image_service
+
+def _chamar_em_paralelo(funcao, n=16):
+    barreira = threading.Barrier(n)
+    resultados = []
+
+    def _rodar():
+        barreira.wait()
+        resultados.append(funcao())
+
+    threads = [threading.Thread(target=_rodar) for _ in range(n)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return resultados
+
+def test_clientes_globais_sao_criados_uma_vez():
+    print("\n=== TESTE DOS CLIENTES COM THREADS ===")
+    criados = []
+
+    class ClienteLento:
+        def __init__(self, **kwargs):
+            time.sleep(0.05)  # Janela em que outra thread veria o global ainda vazio
+            criados.append(self)
+
+    originais = (ai_service.Groq, image_service.OpenAI)
+    ai_service.Groq, ai_service._groq_client = ClienteLento, None
+    image_service.OpenAI, image_service._openai = ClienteLento, None
+    try:
+        assert len({id(c) for c in _chamar_em_paralelo(ai_service.get_groq_client)}) == 1
+        assert len({id(c) for c in _chamar_em_paralelo(image_service._cliente_openai)}) == 1
+        assert len(criados) == 2
+    finally:
+        ai_service.Groq, image_service.OpenAI = originais
+        ai_service._groq_client = image_service._openai = None
+
+def test_sessao_http_compartilhada_nao_guarda_cookies():
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            self.send_response(200)
+            self.send_header("Set-Cookie", "wordpress_logged_in=blog-a; Path=/")
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+
+        def log_message(self, *args):
+            pass
+
+    servidor = HTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=servidor.handle_request, daemon=True).start()
+    resposta = image_service._http.get(f"http://127.0.0.1:{servidor.server_address[1]}/", timeout=5)
+    servidor.server_close()
+
+    assert resposta.status_code == 200
+    assert len(image_service._http.cookies) == 0
+
+if __name__ == "__main__":
+    test_clientes_globais_sao_criados_uma_vez()
+    test_sessao_http_compartilhada_nao_guarda_cookies()
@@ -0,0 +1,39 @@
+import sys
+import os
+
+# Adiciona a raiz do projeto ao path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from services.token_service import truncar_por_tokens, contar_tokens, preparar_prompt
+
+def test_corte_no_fim_de_frase():
+    print("\n=== TESTE DE ORÇAMENTO DE TOKENS ===")
+    texto = "O Radar encontrou uma tendência. Ela fala de SEO local! Vale um post? " * 200
+
+    cortado = truncar_por_tokens(texto, 50)
+    tokens = contar_tokens(cortado)
+    print(f"Texto original: {contar_tokens(texto)} tokens | cortado: {tokens} tokens")
+    assert tokens <= 50
+    assert cortado.rstrip().endswith(('.', '!', '?'))
+
+    curto = "Texto pequeno."
+    assert truncar_por_tokens(curto, 50) == curto
+    print("✅ Corte respeita o orçamento e termina em fim de frase.")
+
+def test_corte_mantem_paragrafos():
+    texto = "Primeiro parágrafo. Tem duas frases.\n\nSegundo parágrafo!\n- item da lista\n" + "Resto longo. " * 500
+    cortado = truncar_por_tokens(texto, 30)
+    assert texto.startswith(cortado)
+    assert "\n\nSegundo parágrafo!\n- item da lista" in cortado
+    print("✅ Corte devolve um prefixo do texto, com as quebras de linha originais.")
+
+def test_prompt_gigante_e_aparado():
+    prompt, total = preparar_prompt("Frase longa de teste. " * 20000, "Sistema.", "llama3-8b-8192")
+    print(f"Prompt final com {total} tokens")
+    assert total <= 8192
+    print("✅ Prompt acima da janela do modelo foi aparado antes do envio.")
+
+if __name__ == "__main__":
+    test_corte_no_fim_de_frase()
+    test_corte_mantem_paragrafos()
+    test_prompt_gigante_e_aparado()
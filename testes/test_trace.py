@@ -0,0 +1,48 @@
+import sys
+import os
+
+# Adiciona a raiz do projeto ao path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from flask import Flask
+from models import db, TraceSpan
+from services.trace_service import iniciar_trace, span, carregar_trace
+
+def _app_teste():
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite://'
+    db.init_app(app)
+    return app
+
+def test_spans_aninhados_sao_gravados():
+    print("\n=== TESTE DE TRACE DA PUBLICAÇÃO ===")
+    app = _app_teste()
+    with app.app_context():
+        db.create_all()
+
+        with iniciar_trace(idea_id=42) as trace_id:
+            with span("publish"):
+                with span("llm.artigo"):
+                    pass
+                try:
+                    with span("wordpress.post"):
+                        raise ConnectionError("timeout")
+                except ConnectionError:
+                    pass
+
+        spans = carregar_trace(trace_id)
+        for s in spans:
+            print(f"{'  ' * s.depth}{s.name} {s.duration_ms}ms {s.status} {s.info or ''}")
+        assert [s.name for s in spans] == ["publish", "llm.artigo", "wordpress.post"]
+        assert [s.depth for s in spans] == [0, 1, 1]
+        assert spans[2].status == "error" and "timeout" in spans[2].info
+        assert all(s.idea_id == 42 for s in spans)
+
+        # Fora de um trace, span não grava nada
+        with span("solto"):
+            pass
+        assert TraceSpan.query.count() == 3
+    print("✅ Spans aninhados gravados com profundidade e status.")
+
+if __name__ == "__main__":
+    test_spans_aninhados_sao_gravados()
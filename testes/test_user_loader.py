@@ -0,0 +1,56 @@
+import sys
+import os
+
+# Adiciona a raiz do projeto ao path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from flask import Flask
+from models import db, Plan, User, Blog, load_user, planos_em_cache, invalidar_cache_planos
+from services.profiler_service import perfilar
+
+def _app_teste():
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite://'
+    db.init_app(app)
+    return app
+
+def test_loader_sem_lazy_loads():
+    print("\n=== TESTE DO USER LOADER ===")
+    app = _app_teste()
+    with app.app_context():
+        db.create_all()
+        plano = Plan(name="Pro", max_sites=2, posts_per_day=3)
+        db.session.add(plano)
+        db.session.flush()
+        user = User(name="t", email="t@example.com", password="x", plan_id=plano.id)
+        db.session.add(user)
+        db.session.flush()
+        db.session.add(Blog(user_id=user.id, site_name="b", wp_url="http://b", wp_user="u", wp_app_password="p"))
+        db.session.commit()
+        user_id = user.id
+        db.session.remove()
+        invalidar_cache_planos()
+        planos_em_cache()  # Aquece o cache de planos
+
+        with perfilar("teste", "load_user") as perfil:
+            carregado = load_user(str(user_id))
+        print(f"load_user: {perfil['queries']} queries")
+        assert perfil["queries"] == 2  # user + sites (plano vem do cache)
+
+        with perfilar("teste", "uso") as perfil:
+            assert carregado.plan_name == "Pro"
+            assert carregado.get_plan_limits()["posts_por_dia"] == 3
+            assert carregado.can_add_site()
+            assert carregado.get_setup_status() in ("no_config", "complete")
+        print(f"plano/sites/limites depois do load: {perfil['queries']} queries")
+        assert perfil["queries"] == 0
+
+        # Edição do plano + invalidação: próxima leitura vê o valor novo
+        db.session.get(Plan, carregado.plan_id).posts_per_day = 10
+        db.session.commit()
+        invalidar_cache_planos()
+        assert planos_em_cache()[carregado.plan_id].posts_per_day == 10
+    print("✅ Loader traz plano e sites sem consultas extras.")
+
+if __name__ == "__main__":
+    test_loader_sem_lazy_loads()